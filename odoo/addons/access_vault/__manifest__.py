@@ -4,7 +4,7 @@
     "category": "Security",
     "summary": "Secure credentials/secrets management with RBAC, audit logs, and temporary sharing",
     "author": "Hypetech",
-    "depends": ["base", "web", "mail"],
+    "depends": ["base", "web", "mail", "cron_runner", "notify_outbox"],
     "data": [
         "security/access_vault_groups.xml",
         "security/ir.model.access.csv",
@@ -14,6 +14,8 @@
         "views/access_vault_credential_views.xml",
         "views/access_vault_share_views.xml",
         "views/access_vault_log_views.xml",
+        "views/access_vault_offboarding_views.xml",
+        "views/access_vault_access_review_views.xml",
         "views/access_vault_menus.xml",
         "data/ir_cron.xml",
     ],
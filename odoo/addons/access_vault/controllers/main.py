@@ -0,0 +1,34 @@
+import os
+
+from werkzeug.wsgi import wrap_file
+
+from odoo import http
+from odoo.http import content_disposition, request
+
+
+class AccessVaultController(http.Controller):
+
+    @http.route("/access_vault/access_review/<int:wizard_id>", type="http", auth="user")
+    def download_access_review(self, wizard_id):
+        """Stream the access review of a wizard from its temporary file."""
+        wizard = request.env["access.vault.access.review.wizard"].browse(wizard_id).exists()
+        if not wizard:
+            raise request.not_found()
+        wizard.check_access("read")
+        filename, path = request.env["access.vault.access.review"]._export(wizard.file_format)
+        handle = open(path, "rb")
+        size = os.fstat(handle.fileno()).st_size
+        # The open handle keeps the data readable until the response is fully sent
+        os.unlink(path)
+        mimetype = (
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            if wizard.file_format == "xlsx" else "text/csv; charset=utf-8"
+        )
+        return request.make_response(
+            wrap_file(request.httprequest.environ, handle),
+            headers=[
+                ("Content-Type", mimetype),
+                ("Content-Length", str(size)),
+                ("Content-Disposition", content_disposition(filename)),
+            ],
+        )
@@ -6,3 +6,6 @@ from . import access_vault_log
 from . import access_vault_wizard
 
 
+from . import access_vault_offboarding
+from . import access_vault_access_review
+from . import access_vault_benchmark
@@ -0,0 +1,238 @@
+import csv
+import os
+import tempfile
+
+import xlsxwriter
+
+from odoo import api, fields, models
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# Access paths of the report ("via" column); each one maps credentials to a user bitset
+VIA_OWNER = "owner"
+VIA_MANAGER = "manager"
+VIA_GROUP_MANAGER = "group_manager"
+VIA_READER = "reader"
+VIA_GROUP_READER = "group_reader"
+VIA_SHARE = "share"
+# Record-rule grants to every internal user (rule_access_vault_credential_read_user)
+VIA_DEVELOPMENT = "development"
+VIA_PUBLIC = "public"
+# Members of group_access_vault_admin see every secret (rule_access_vault_secret_admin)
+VIA_ADMIN = "admin"
+
+MANAGE_VIAS = (VIA_OWNER, VIA_MANAGER, VIA_GROUP_MANAGER)
+READ_VIAS = MANAGE_VIAS + (VIA_READER, VIA_GROUP_READER, VIA_SHARE, VIA_DEVELOPMENT, VIA_PUBLIC, VIA_ADMIN)
+
+# Rows per XLSX worksheet, header included (Excel limit); longer reports continue on new sheets
+XLSX_MAX_ROWS = 1048576
+
+_USER_RELATIONS = {
+    VIA_OWNER: "access_vault_credential_owner_rel",
+    VIA_MANAGER: "access_vault_credential_manager_user_rel",
+    VIA_READER: "access_vault_credential_user_rel",
+}
+_GROUP_RELATIONS = {
+    VIA_GROUP_MANAGER: "access_vault_credential_manager_group_rel",
+    VIA_GROUP_READER: "access_vault_credential_group_rel",
+}
+
+REPORT_HEADER = [
+    "credential_id", "credencial", "ambiente", "unidade", "criticidade",
+    "usuario_id", "login", "usuario", "acesso", "via",
+]
+
+
+def _iter_bits(bitset):
+    """Yield the positions of the set bits of ``bitset`` (an int), lowest first."""
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+class AccessVaultAccessReview(models.AbstractModel):
+    """
+    Access review engine: "who can read/manage what" over all users and credentials.
+
+    Every credential gets one Python int per access path, used as a bitset over
+    the user axis (bit i = i-th internal user). Group grants are expanded by OR-ing
+    the precomputed member bitset of each group (all_group_ids semantics), so the
+    whole matrix is built with a handful of table scans and word-level bit ops
+    instead of evaluating _compute_permissions per user and credential.
+    """
+    _name = "access.vault.access.review"
+    _description = "Access Vault - Access review engine"
+
+    @api.model
+    def _load_users(self):
+        """Return (user rows, {user_id: bit position}) for active internal users."""
+        self.env.cr.execute("""
+            SELECT u.id, u.login, p.name
+              FROM res_users u
+              JOIN res_partner p ON p.id = u.partner_id
+             WHERE u.active AND NOT u.share
+          ORDER BY u.id
+        """)
+        users = self.env.cr.fetchall()
+        return users, {user_id: pos for pos, (user_id, _login, _name) in enumerate(users)}
+
+    @api.model
+    def _load_group_bitsets(self, positions):
+        """
+        Return {group_id: bitset} of members, following implied groups transitively,
+        i.e. the same membership as res.users.all_group_ids.
+        """
+        self.env.cr.execute("""
+            WITH RECURSIVE closure(gid, hid) AS (
+                SELECT id, id FROM res_groups
+                 UNION
+                SELECT c.gid, r.hid
+                  FROM closure c
+                  JOIN res_groups_implied_rel r ON r.gid = c.hid
+            )
+            SELECT c.hid, rel.uid
+              FROM closure c
+              JOIN res_groups_users_rel rel ON rel.gid = c.gid
+        """)
+        bitsets = {}
+        for group_id, user_id in self.env.cr.fetchall():
+            pos = positions.get(user_id)
+            if pos is not None:
+                bitsets[group_id] = bitsets.get(group_id, 0) | (1 << pos)
+        return bitsets
+
+    @api.model
+    def _build_matrix(self):
+        """
+        Return (users, {via: {credential_id: bitset}}).
+
+        Each relation table is read exactly once. Shares count while active, the
+        predicate of the record rules (expired shares are deactivated by
+        _cron_expire_shares).
+        """
+        cr = self.env.cr
+        users, positions = self._load_users()
+        group_bitsets = self._load_group_bitsets(positions)
+        matrix = {via: {} for via in READ_VIAS}
+
+        for via, table in _USER_RELATIONS.items():
+            cr.execute("SELECT credential_id, user_id FROM {}".format(table))
+            column = matrix[via]
+            for credential_id, user_id in cr.fetchall():
+                pos = positions.get(user_id)
+                if pos is not None:
+                    column[credential_id] = column.get(credential_id, 0) | (1 << pos)
+
+        for via, table in _GROUP_RELATIONS.items():
+            cr.execute("SELECT credential_id, group_id FROM {}".format(table))
+            column = matrix[via]
+            for credential_id, group_id in cr.fetchall():
+                members = group_bitsets.get(group_id)
+                if members:
+                    column[credential_id] = column.get(credential_id, 0) | members
+
+        cr.execute("SELECT credential_id, user_id FROM access_vault_share WHERE active")
+        column = matrix[VIA_SHARE]
+        for credential_id, user_id in cr.fetchall():
+            pos = positions.get(user_id)
+            if pos is not None:
+                column[credential_id] = column.get(credential_id, 0) | (1 << pos)
+
+        # Development and public credentials are readable by every internal user,
+        # every credential by the vault admins
+        everyone = (1 << len(users)) - 1
+        admin_group = self.env.ref("access_vault.group_access_vault_admin", raise_if_not_found=False)
+        admins = group_bitsets.get(admin_group.id, 0) if admin_group else 0
+        cr.execute("SELECT id, environment = 'development', privacy = 'public' FROM access_vault_credential")
+        for credential_id, development, public in cr.fetchall():
+            if development:
+                matrix[VIA_DEVELOPMENT][credential_id] = everyone
+            if public:
+                matrix[VIA_PUBLIC][credential_id] = everyone
+            if admins:
+                matrix[VIA_ADMIN][credential_id] = admins
+
+        return users, matrix
+
+    @api.model
+    def _iter_rows(self):
+        """Yield one report row per (credential, user) pair with any access."""
+        users, matrix = self._build_matrix()
+        self.env.cr.execute("""
+            SELECT id, name, environment, business_unit, criticality
+              FROM access_vault_credential
+          ORDER BY criticality DESC, name, id
+        """)
+        for cred_id, name, environment, business_unit, criticality in self.env.cr.fetchall():
+            cells = {via: matrix[via].get(cred_id, 0) for via in READ_VIAS}
+            manage = cells[VIA_OWNER] | cells[VIA_MANAGER] | cells[VIA_GROUP_MANAGER]
+            read = manage
+            for via in READ_VIAS[len(MANAGE_VIAS):]:
+                read |= cells[via]
+            for pos in _iter_bits(read):
+                bit = 1 << pos
+                user_id, login, user_name = users[pos]
+                yield [
+                    cred_id, name, environment, business_unit, criticality,
+                    user_id, login, user_name,
+                    "manage" if manage & bit else "read",
+                    "|".join(via for via in READ_VIAS if cells[via] & bit),
+                ]
+
+    @api.model
+    def _export(self, file_format="csv"):
+        """
+        Write the report to a temporary file and return (filename, path).
+
+        Rows are written as they are produced; the caller streams the file and
+        removes it.
+        """
+        suffix = ".xlsx" if file_format == "xlsx" else ".csv"
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            count = 0
+            if file_format == "xlsx":
+                workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+                sheet, line = None, XLSX_MAX_ROWS
+                for count, row in enumerate(self._iter_rows(), start=1):
+                    if line == XLSX_MAX_ROWS:
+                        sheet = workbook.add_worksheet("Revisão de acessos {}".format(len(workbook.worksheets()) + 1))
+                        sheet.write_row(0, 0, REPORT_HEADER)
+                        line = 1
+                    sheet.write_row(line, 0, row)
+                    line += 1
+                if sheet is None:
+                    workbook.add_worksheet("Revisão de acessos 1").write_row(0, 0, REPORT_HEADER)
+                workbook.close()
+            else:
+                with open(path, "w", newline="", encoding="utf-8") as handle:
+                    writer = csv.writer(handle)
+                    writer.writerow(REPORT_HEADER)
+                    for count, row in enumerate(self._iter_rows(), start=1):
+                        writer.writerow(row)
+            _logger.info("Access Vault access review exported: %s rows (%s)", count, file_format)
+        except Exception:
+            os.unlink(path)
+            raise
+        return "access_review_{}{}".format(fields.Date.today(), suffix), path
+
+
+class AccessVaultAccessReviewWizard(models.TransientModel):
+    _name = "access.vault.access.review.wizard"
+    _description = "Access Vault - Access review export"
+
+    file_format = fields.Selection([("csv", "CSV"), ("xlsx", "Excel (XLSX)")], default="csv", required=True, string="Formato")
+
+    def action_export(self):
+        self.ensure_one()
+        self.check_access("read")
+        # The file is generated and streamed by the controller, never loaded in memory
+        return {
+            "type": "ir.actions.act_url",
+            "url": "/access_vault/access_review/{}".format(self.id),
+            "target": "self",
+        }
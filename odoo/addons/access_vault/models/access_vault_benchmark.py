@@ -0,0 +1,269 @@
+import json
+import time
+import tracemalloc
+
+from odoo import api, models
+from odoo.exceptions import AccessError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+BASELINE_PARAM = "access_vault.benchmark_baseline"
+
+DEFAULT_SIZES = {
+    "credentials": 2000,
+    "secrets_per_credential": 2,
+    "owners": 50,
+    "groups": 10,
+    "shares": 500,
+    "logs": 20000,
+}
+
+
+class AccessVaultBenchmark(models.AbstractModel):
+    """
+    Per-operation benchmark suite for the vault.
+
+    Meant to be run from an Odoo shell against a local database (superuser or
+    system administrator only; not reachable over RPC), e.g.::
+
+        env["access.vault.benchmark"]._run_benchmark(sizes={"credentials": 10000})
+        env["access.vault.benchmark"]._run_benchmark(save_baseline=True)
+
+    The synthetic dataset is inserted with set-based SQL inside a savepoint and
+    rolled back once every operation has been measured, so the database is left
+    untouched. Each operation records wall time, SQL query count and peak Python
+    memory, and is compared against the stored baseline (ir.config_parameter).
+    """
+    _name = "access.vault.benchmark"
+    _description = "Access Vault - Performance benchmark"
+
+    # ------------------------------------------------------------
+    # Synthetic data
+    # ------------------------------------------------------------
+
+    @api.model
+    def _generate_dataset(self, sizes):
+        """Insert a synthetic dataset and return the ids the operations need."""
+        cr = self.env.cr
+        env = self.env
+        tag = "bench-{}".format(int(time.time()))
+
+        groups = env["res.groups"].sudo().create([
+            {"name": "{} group {}".format(tag, i)} for i in range(sizes["groups"])
+        ])
+        owners = env["res.users"].sudo().with_context(no_reset_password=True, mail_create_nolog=True).create([
+            {
+                "name": "{} user {}".format(tag, i),
+                "login": "{}-user-{}".format(tag, i),
+                "group_ids": [(6, 0, [env.ref("base.group_user").id, groups[i % len(groups)].id])],
+            }
+            for i in range(sizes["owners"])
+        ])
+        env.flush_all()
+        params = {
+            "tag": tag,
+            "uid": env.uid,
+            "owners": owners.ids,
+            "groups": groups.ids,
+            "n_creds": sizes["credentials"],
+            "n_secrets": sizes["secrets_per_credential"],
+            "n_shares": sizes["shares"],
+            "n_logs": sizes["logs"],
+            "token": env["access.vault.crypto"].encrypt("benchmark-secret"),
+        }
+
+        cr.execute("""
+            INSERT INTO access_vault_credential (
+                name, access_type, criticality, business_unit, environment, privacy, state,
+                rotation_days, last_rotation_at, create_uid, create_date, write_uid, write_date
+            )
+            SELECT %(tag)s || '-cred-' || g,
+                   (ARRAY['user_password', 'api_key', 'token', 'ssh_key'])[1 + g %% 4],
+                   (ARRAY['low', 'medium', 'high', 'critical'])[1 + g %% 4],
+                   (ARRAY['platform', 'b2b', 'b2c', 'qa_trust', 'management', 'board'])[1 + g %% 6],
+                   (ARRAY['production', 'staging', 'development'])[1 + g %% 3],
+                   (ARRAY['public', 'private'])[1 + g %% 2],
+                   'active',
+                   (ARRAY['7', '15', '30', '60', '90', '180'])[1 + g %% 6],
+                   (now() at time zone 'UTC') - make_interval(days => g %% 200),
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM generate_series(1, %(n_creds)s) AS g
+         RETURNING id
+        """, params)
+        params["credentials"] = [row[0] for row in cr.fetchall()]
+
+        cr.execute("""
+            INSERT INTO access_vault_credential_owner_rel (credential_id, user_id)
+            SELECT c, (%(owners)s::int[])[1 + c %% cardinality(%(owners)s::int[])]
+              FROM unnest(%(credentials)s::int[]) AS c;
+
+            INSERT INTO access_vault_credential_user_rel (credential_id, user_id)
+            SELECT c, (%(owners)s::int[])[1 + (c + 1) %% cardinality(%(owners)s::int[])]
+              FROM unnest(%(credentials)s::int[]) AS c;
+
+            INSERT INTO access_vault_credential_group_rel (credential_id, group_id)
+            SELECT c, (%(groups)s::int[])[1 + c %% cardinality(%(groups)s::int[])]
+              FROM unnest(%(credentials)s::int[]) AS c;
+
+            INSERT INTO access_vault_credential_manager_group_rel (credential_id, group_id)
+            SELECT c, (%(groups)s::int[])[1 + (c + 1) %% cardinality(%(groups)s::int[])]
+              FROM unnest(%(credentials)s::int[]) AS c
+             WHERE c %% 5 = 0;
+
+            INSERT INTO access_vault_secret (
+                credential_id, sequence, name, secret_type, _secret_encrypted, secret_set,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT c, s, 'secret ' || s, 'user_password', %(token)s, TRUE,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM unnest(%(credentials)s::int[]) AS c, generate_series(1, %(n_secrets)s) AS s;
+
+            INSERT INTO access_vault_share (
+                credential_id, user_id, expires_at, active, created_by,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT (%(credentials)s::int[])[1 + g %% cardinality(%(credentials)s::int[])],
+                   (%(owners)s::int[])[1 + (g + 2) %% cardinality(%(owners)s::int[])],
+                   -- half of the shares are already expired
+                   (now() at time zone 'UTC') + make_interval(hours => CASE WHEN g %% 2 = 0 THEN -1 ELSE 24 END),
+                   TRUE, %(uid)s,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM generate_series(1, %(n_shares)s) AS g;
+
+            INSERT INTO access_vault_log (
+                credential_id, user_id, action, timestamp, detail,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT (%(credentials)s::int[])[1 + g %% cardinality(%(credentials)s::int[])],
+                   %(uid)s, 'copy', (now() at time zone 'UTC') - make_interval(mins => g), 'benchmark',
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM generate_series(1, %(n_logs)s) AS g;
+        """, params)
+
+        env.invalidate_all()
+        return {"owners": owners, "credential_ids": params["credentials"]}
+
+    # ------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------
+
+    @api.model
+    def _get_operations(self, dataset):
+        """Return an ordered list of (name, callable) to measure."""
+        env = self.env
+        Credential = env["access.vault.credential"]
+        owner = dataset["owners"][0]
+        owned = Credential.browse(dataset["credential_ids"]).filtered(lambda c: owner in c.owner_ids)
+        secrets = owned.secret_ids[:20]
+
+        def copy_secrets():
+            for secret in secrets[:5]:
+                secret.with_user(owner).action_get_secret_for_copy()
+
+        def set_secrets():
+            for secret in secrets:
+                secret.with_user(owner).set_secret("rotated-benchmark-secret")
+
+        def permissions():
+            creds = Credential.with_user(owner).browse(dataset["credential_ids"])
+            creds.mapped("can_manage")
+            creds.mapped("can_read_secrets")
+
+        return [
+            ("get_dashboard_stats", lambda: Credential.get_dashboard_stats()),
+            ("_cron_rotation_reminders", lambda: Credential._cron_rotation_reminders()),
+            ("_cron_expire_shares", lambda: env["access.vault.share"]._cron_expire_shares()),
+            ("action_get_secret_for_copy", copy_secrets),
+            ("set_secret", set_secrets),
+            ("_compute_permissions", permissions),
+        ]
+
+    @api.model
+    def _measure(self, func):
+        """Time ``func`` and count its queries, then run it again under tracemalloc for the memory peak.
+
+        Tracing slows Python down, so it stays out of the timed run; the timed run is
+        rolled back to a savepoint so that the traced one starts from the same state.
+        """
+        cr = self.env.cr
+        cr.execute("SAVEPOINT access_vault_measure")
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            func()
+            self.env.flush_all()
+        finally:
+            wall = time.perf_counter() - start
+            queries = cr.sql_log_count - queries
+            cr.execute("ROLLBACK TO SAVEPOINT access_vault_measure")
+            self.env["notify.outbox"]._discard_queue()
+            self.env.invalidate_all()
+
+        tracemalloc.start()
+        try:
+            func()
+            self.env.flush_all()
+        finally:
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return {
+            "wall_ms": round(wall * 1000, 2),
+            "queries": queries,
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    # ------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------
+
+    @api.model
+    def _run_benchmark(self, sizes=None, save_baseline=False, tolerance=0.2):
+        """
+        Generate a dataset, measure every operation, compare with the baseline and roll back.
+
+        Returns {"sizes": ..., "results": {op: metrics}, "regressions": [...]}; a
+        metric regresses when it exceeds the baseline by more than ``tolerance``.
+        """
+        # creates users and groups and writes system parameters
+        if not (self.env.is_superuser() or self.env.user._is_system()):
+            raise AccessError("Apenas administradores do sistema podem executar o benchmark.")
+        sizes = dict(DEFAULT_SIZES, **(sizes or {}))
+        cr = self.env.cr
+        cr.execute("SAVEPOINT access_vault_benchmark")
+        # chunked crons must not commit the dataset while measuring (cron_runner, a manifest dependency)
+        bench = self.with_context(cron_runner_no_commit=True)
+        try:
+            dataset = bench._generate_dataset(sizes)
+            results = {}
+            for name, func in bench._get_operations(dataset):
+                results[name] = bench._measure(func)
+                _logger.info("access_vault benchmark %s: %s", name, results[name])
+        finally:
+            cr.execute("ROLLBACK TO SAVEPOINT access_vault_benchmark")
+            self.env["notify.outbox"]._discard_queue()
+            self.env.invalidate_all()
+            self.env.registry.clear_cache()
+
+        params = self.env["ir.config_parameter"].sudo()
+        baseline = json.loads(params.get_param(BASELINE_PARAM) or "{}")
+        regressions = []
+        if baseline.get("sizes") == sizes:
+            for name, metrics in results.items():
+                reference = baseline.get("results", {}).get(name, {})
+                for metric, value in metrics.items():
+                    ref = reference.get(metric)
+                    if ref and value > ref * (1 + tolerance):
+                        regressions.append({"operation": name, "metric": metric, "baseline": ref, "value": value})
+        elif baseline:
+            _logger.warning("access_vault benchmark: baseline was recorded with different sizes, skipping comparison")
+
+        for regression in regressions:
+            _logger.warning("access_vault benchmark regression: %s", regression)
+
+        report = {"sizes": sizes, "results": results, "regressions": regressions}
+        if save_baseline:
+            params.set_param(BASELINE_PARAM, json.dumps({"sizes": sizes, "results": results}))
+        return report
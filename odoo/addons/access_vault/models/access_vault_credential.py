@@ -2,6 +2,7 @@ from datetime import timedelta
 
 from odoo import api, fields, models
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import ormcache
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -188,6 +189,21 @@ class AccessVaultCredential(models.Model):
             }
         )
 
+    @api.model
+    def _vault_log_many(self, entries):
+        """Write several audit rows in one batch. entries: iterable of (credential_id, action, detail)."""
+        vals_list = [
+            {
+                "credential_id": credential_id,
+                "user_id": self.env.user.id,
+                "action": action,
+                "detail": detail,
+            }
+            for credential_id, action, detail in entries
+        ]
+        if vals_list:
+            self.env["access.vault.log"].sudo().create(vals_list)
+
     # ------------------------------------------------------------
     # Rotation status (does NOT auto-expire; only indicates "needs rotation")
     # ------------------------------------------------------------
@@ -197,9 +213,14 @@ class AccessVaultCredential(models.Model):
         self.ensure_one()
         now = now or fields.Datetime.now()
 
-        if self.state != "active" or not self.rotation_days:
+        if self.state != "active":
             return (False, 0, False)
 
+        # secrets flagged as exposed (e.g. offboarding) are due regardless of policy
+        forced = any(self.secret_ids.mapped("rotation_required"))
+        if not self.rotation_days:
+            return (False, 0, forced)
+
         days = int(self.rotation_days)
         if not self.last_rotation_at:
             # never rotated -> due
@@ -208,7 +229,7 @@ class AccessVaultCredential(models.Model):
         next_rotation_at = self.last_rotation_at + timedelta(days=days)
         delta = next_rotation_at - now
         days_to_rotation = int(delta.total_seconds() // 86400)
-        rotation_due = next_rotation_at <= now
+        rotation_due = next_rotation_at <= now or forced
         return (next_rotation_at, days_to_rotation, rotation_due)
 
     @api.depends("owner_ids", "allowed_user_ids", "allowed_manager_user_ids", "allowed_group_ids", "allowed_manager_group_ids")
@@ -226,7 +247,7 @@ class AccessVaultCredential(models.Model):
                 bool(set(rec.allowed_group_ids.ids) & set(user.all_group_ids.ids))
             )
 
-    @api.depends("rotation_days", "last_rotation_at", "state")
+    @api.depends("rotation_days", "last_rotation_at", "state", "secret_ids.rotation_required")
     def _compute_rotation_status(self):
         now = fields.Datetime.now()
         for rec in self:
@@ -244,26 +265,23 @@ class AccessVaultCredential(models.Model):
         """
         Build a domain matching credentials that need rotation.
         - active only
-        - rotation_days set
-        - last_rotation_at missing OR too old for the policy
+        - any secret flagged with rotation_required, OR
+        - rotation_days set and last_rotation_at missing OR too old for the policy
         """
         now = now or fields.Datetime.now()
         # If never rotated -> due (for any policy)
-        base = ["&", ("state", "=", "active"), ("rotation_days", "!=", False)]
-        never_rotated = ("last_rotation_at", "=", False)
+        policy = [("last_rotation_at", "=", False)]
 
-        # (rotation_days = X) AND (last_rotation_at <= now - X days)
-        parts = []
+        # OR-chain: never_rotated OR (rotation_days = X AND last_rotation_at <= now - X days)
         for d in (7, 15, 30, 60, 90, 180):
             cutoff = now - timedelta(days=d)
-            parts.append(["&", ("rotation_days", "=", str(d)), ("last_rotation_at", "<=", cutoff)])
-
-        # OR-chain: never_rotated OR any cutoff match
-        domain = ["|", never_rotated, parts[0]]
-        for p in parts[1:]:
-            domain = ["|", domain, p]
+            policy = ["|"] + policy + ["&", ("rotation_days", "=", str(d)), ("last_rotation_at", "<=", cutoff)]
 
-        return ["&"] + base + [domain]
+        return [
+            "&", ("state", "=", "active"),
+            "|", ("secret_ids.rotation_required", "=", True),
+            "&", ("rotation_days", "!=", False),
+        ] + policy
 
     @api.model
     def _search_rotation_due(self, operator, value):
@@ -302,8 +320,11 @@ class AccessVaultCredential(models.Model):
             SELECT
                 COUNT(*) as total,
                 COUNT(CASE WHEN state = 'active' THEN 1 END) as total_active,
-                COUNT(CASE WHEN state = 'active' AND rotation_days IS NOT NULL THEN 1 END) as rotation_enabled
-            FROM access_vault_credential
+                COUNT(CASE WHEN state = 'active' AND (rotation_days IS NOT NULL OR EXISTS (
+                    SELECT 1 FROM access_vault_secret s
+                    WHERE s.credential_id = c.id AND s.rotation_required
+                )) THEN 1 END) as rotation_enabled
+            FROM access_vault_credential c
         """)
         result = self.env.cr.fetchone()
         total, total_active, rotation_enabled = result
@@ -318,11 +339,18 @@ class AccessVaultCredential(models.Model):
             self.env.cr.execute("""
                 SELECT c.id, c.name, c.environment, c.business_unit, c.criticality,
                        c.last_rotation_at, c.rotation_days,
-                       ARRAY_AGG(u.name) as owner_names
+                       ARRAY_AGG(u.name) as owner_names,
+                       EXISTS (
+                           SELECT 1 FROM access_vault_secret s
+                           WHERE s.credential_id = c.id AND s.rotation_required
+                       ) as forced
                 FROM access_vault_credential c
                 LEFT JOIN access_vault_credential_owner_rel cor ON c.id = cor.credential_id
                 LEFT JOIN res_users u ON cor.user_id = u.id
-                WHERE c.state = 'active' AND c.rotation_days IS NOT NULL
+                WHERE c.state = 'active' AND (c.rotation_days IS NOT NULL OR EXISTS (
+                    SELECT 1 FROM access_vault_secret s
+                    WHERE s.credential_id = c.id AND s.rotation_required
+                ))
                 GROUP BY c.id, c.name, c.environment, c.business_unit, c.criticality,
                          c.last_rotation_at, c.rotation_days
                 ORDER BY c.criticality DESC, c.name
@@ -330,11 +358,12 @@ class AccessVaultCredential(models.Model):
 
             creds_data = self.env.cr.fetchall()
             for cred_data in creds_data:
-                cred_id, name, environment, business_unit, criticality, last_rotation, rotation_days, owner_names = cred_data
+                (cred_id, name, environment, business_unit, criticality, last_rotation, rotation_days,
+                 owner_names, forced) = cred_data
 
                 # Calculate rotation info
                 next_rotation_at, days_to_rotation, rotation_due = self._calculate_rotation_info_single(
-                    last_rotation, rotation_days, now
+                    last_rotation, rotation_days, now, forced=forced
                 )
 
                 # Check if secret exists
@@ -419,10 +448,10 @@ class AccessVaultCredential(models.Model):
         }
 
     @api.model
-    def _calculate_rotation_info_single(self, last_rotation_at, rotation_days, now):
-        """Calculate rotation info for a single credential (optimized version)."""
+    def _calculate_rotation_info_single(self, last_rotation_at, rotation_days, now, forced=False):
+        """Calculate rotation info for a single credential (optimized version, mirrors _get_rotation_info)."""
         if not rotation_days:
-            return (False, 0, False)
+            return (False, 0, forced)
 
         days = int(rotation_days)
         if not last_rotation_at:
@@ -431,16 +460,121 @@ class AccessVaultCredential(models.Model):
         next_rotation_at = last_rotation_at + timedelta(days=days)
         delta = next_rotation_at - now
         days_to_rotation = int(delta.total_seconds() // 86400)
-        rotation_due = next_rotation_at <= now
+        rotation_due = next_rotation_at <= now or forced
         return (next_rotation_at, days_to_rotation, rotation_due)
 
+    # ------------------------------------------------------------
+    # Rotation forecast (heatmap)
+    # ------------------------------------------------------------
+
+    @api.model
+    def get_rotation_forecast(self, days=90):
+        """
+        Per-day / per-business-unit count of rotations coming due in the next ``days`` days.
+
+        Occurrences are expanded in SQL with generate_series over each credential's
+        policy (first due date, then every rotation_days). Overdue / never-rotated
+        credentials and those with a secret flagged rotation_required count on the
+        first day. Only the credentials the user may read (record rules) are
+        counted. The payload is cached per worker and keyed on the visible ids and a
+        cheap fingerprint of the credential and secret tables, so any write
+        invalidates it.
+        """
+        self.check_access("read")
+        days = max(1, min(int(days), 366))
+        credential_ids = None if self.env.su else tuple(self.search([]).ids)
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT (SELECT MAX(write_date) FROM access_vault_credential),
+                   (SELECT COUNT(*) FROM access_vault_credential),
+                   (SELECT MAX(write_date) FROM access_vault_secret),
+                   (SELECT COUNT(*) FROM access_vault_secret)
+        """)
+        stamp = tuple(self.env.cr.fetchone())
+        return self._get_rotation_forecast_cached(days, fields.Date.today(), stamp, credential_ids)
+
+    @api.model
+    @ormcache("days", "today", "stamp", "credential_ids")
+    def _get_rotation_forecast_cached(self, days, today, stamp, credential_ids):
+        stop = today + timedelta(days=days - 1)
+        self.env.cr.execute("""
+            WITH credential AS (
+                SELECT c.business_unit,
+                       c.rotation_days::int AS period,
+                       c.last_rotation_at,
+                       EXISTS (
+                           SELECT 1 FROM access_vault_secret s
+                            WHERE s.credential_id = c.id AND s.rotation_required
+                       ) AS forced
+                  FROM access_vault_credential c
+                 WHERE c.state = 'active'
+                   AND (%(ids)s::int[] IS NULL OR c.id = ANY(%(ids)s::int[]))
+                   AND EXISTS (
+                       SELECT 1 FROM access_vault_secret s
+                        WHERE s.credential_id = c.id AND s._secret_encrypted IS NOT NULL
+                   )
+            ), policy AS (
+                SELECT business_unit,
+                       period,
+                       CASE WHEN forced THEN %(start)s
+                            ELSE GREATEST(
+                                COALESCE((last_rotation_at + make_interval(days => period))::date, %(start)s),
+                                %(start)s
+                            )
+                       END AS first_due
+                  FROM credential
+                 WHERE period IS NOT NULL OR forced
+            )
+            SELECT due::date AS day, p.business_unit, COUNT(*)
+              FROM policy p
+             CROSS JOIN LATERAL generate_series(
+                       p.first_due::timestamp,
+                       -- forced without a policy: a single occurrence
+                       (CASE WHEN p.period IS NULL THEN p.first_due ELSE %(stop)s END)::timestamp,
+                       make_interval(days => COALESCE(p.period, 1))
+                   ) AS due
+          GROUP BY 1, 2
+          ORDER BY 1, 2
+        """, {"start": today, "stop": stop, "ids": list(credential_ids) if credential_ids is not None else None})
+
+        unit_labels = dict(self._fields["business_unit"].selection)
+        by_day = {}
+        for day, business_unit, count in self.env.cr.fetchall():
+            by_day.setdefault(day, {})[business_unit] = count
+
+        series = []
+        for offset in range(days):
+            day = today + timedelta(days=offset)
+            by_unit = by_day.get(day, {})
+            series.append({"date": str(day), "total": sum(by_unit.values()), "by_unit": by_unit})
+
+        return {
+            "start": str(today),
+            "days": days,
+            "business_units": [{"key": key, "label": label} for key, label in unit_labels.items()],
+            "max": max((count for point in series for count in point["by_unit"].values()), default=0),
+            "series": series,
+        }
+
     @api.model
     def _cron_rotation_reminders(self):
-        """Notify owners 1 day before and on due day. No auto-expire. Idempotent per day."""
-        now = fields.Datetime.now()
-        today = fields.Date.today()
-        creds = self.search([("state", "=", "active"), ("rotation_days", "!=", False)])
-        for c in creds:
+        """Notify owners 1 day before and on due day. No auto-expire. Idempotent per day.
+
+        Runs in committed chunks through cron.runner, resuming after a timeout.
+        """
+        return self.env["cron.runner"]._run_search(
+            "access_vault.rotation_reminders",
+            self,
+            # policy-driven reminders plus secrets flagged as exposed (e.g. offboarding)
+            [("state", "=", "active"),
+             "|", ("rotation_days", "!=", False), ("secret_ids.rotation_required", "=", True)],
+            lambda creds, run_at: creds._send_rotation_reminders(run_at),
+            cron_xmlid="access_vault.ir_cron_access_vault_rotation_reminders",
+        )
+
+    def _send_rotation_reminders(self, now):
+        today = now.date()
+        for c in self:
             # only if at least one secret has been set
             if not c.secret_ids.filtered(lambda s: s._secret_encrypted):
                 continue
@@ -469,31 +603,15 @@ class AccessVaultCredential(models.Model):
                 msg = "Senha/segredo precisa ser rotacionado AMANHÃ: {}".format(c.name)
                 sticky = False
 
-            # Send to each owner
-            for user in c.owner_ids:
-                partner = user.partner_id
-                # Toast notification
-                self.env["bus.bus"]._sendone(
-                    partner,
-                    "simple_notification",
-                    {"type": "danger", "title": title, "message": msg, "sticky": sticky},
-                )
-
-                # Discuss chat message (DM)
-                try:
-                    channel = self.env["discuss.channel"].with_user(self.env.ref("base.user_admin"))._get_or_create_chat(
-                        partners_to=[partner.id],
-                        pin=True,
-                    )
-                    channel.message_post(
-                        body=msg,
-                        message_type="comment",
-                        subtype_xmlid="mail.mt_comment",
-                        partner_ids=[partner.id],
-                    )
-                except Exception as e:
-                    # Log error but keep cron robust
-                    _logger.warning("Falha ao enviar notificação de rotação para usuário %s: %s", user.name, str(e))
+            # Toast + DM to each owner, delivered by the notification outbox
+            self.env["notify.outbox"]._enqueue([{
+                "partner_id": user.partner_id.id,
+                "title": title,
+                "message": msg,
+                "toast_type": "danger",
+                "sticky": sticky,
+                "chat_body": msg,
+            } for user in c.owner_ids])
 
             if send_day1:
                 c.sudo().write({"rotation_reminder_day1_at": now})
@@ -17,6 +17,7 @@ class AccessVaultLog(models.Model):
             ("share_grant", "Compartilhamento temporário concedido"),
             ("share_revoke", "Compartilhamento temporário revogado"),
             ("share_expire", "Compartilhamento temporário expirou"),
+            ("offboarding", "Desligamento de usuário"),
         ],
         required=True,
     )
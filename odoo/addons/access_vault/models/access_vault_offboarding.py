@@ -0,0 +1,235 @@
+import base64
+import csv
+import io
+
+from odoo import api, fields, models
+from odoo.exceptions import AccessError, UserError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# (reason, relation table) for every path through which a user may reach a credential
+_USER_RELATIONS = [
+    ("owner", "access_vault_credential_owner_rel"),
+    ("reader", "access_vault_credential_user_rel"),
+    ("manager", "access_vault_credential_manager_user_rel"),
+]
+_GROUP_RELATIONS = [
+    ("group_reader", "access_vault_credential_group_rel"),
+    ("group_manager", "access_vault_credential_manager_group_rel"),
+]
+
+
+class AccessVaultOffboardingWizard(models.TransientModel):
+    _name = "access.vault.offboarding.wizard"
+    _description = "Access Vault - User offboarding"
+
+    user_id = fields.Many2one("res.users", string="Usuário desligado", required=True)
+    new_owner_id = fields.Many2one(
+        "res.users",
+        string="Novo dono",
+        required=True,
+        help="Assume a propriedade das credenciais do usuário desligado.",
+    )
+    state = fields.Selection([("draft", "Rascunho"), ("done", "Concluído")], default="draft", required=True)
+
+    credential_count = fields.Integer(string="Credenciais expostas", readonly=True)
+    owned_count = fields.Integer(string="Credenciais reatribuídas", readonly=True)
+    share_count = fields.Integer(string="Compartilhamentos revogados", readonly=True)
+    secret_count = fields.Integer(string="Segredos marcados p/ rotação", readonly=True)
+
+    report_file = fields.Binary(string="Relatório de exposição", readonly=True, attachment=False)
+    report_filename = fields.Char(readonly=True)
+
+    @api.constrains("user_id", "new_owner_id")
+    def _check_new_owner(self):
+        for wizard in self:
+            if wizard.user_id == wizard.new_owner_id:
+                raise UserError("O novo dono deve ser diferente do usuário desligado.")
+
+    # ------------------------------------------------------------
+    # Exposure set (SQL over the relation tables)
+    # ------------------------------------------------------------
+
+    def _get_exposure(self):
+        """
+        Return {credential_id: set(reasons)} for every credential the user owns,
+        manages, reads directly or through a group, or holds an active share on.
+        """
+        self.ensure_one()
+        user = self.user_id
+        group_ids = user.all_group_ids.ids
+
+        queries = []
+        params = []
+        for reason, table in _USER_RELATIONS:
+            queries.append("SELECT credential_id, %s FROM {} WHERE user_id = %s".format(table))
+            params += [reason, user.id]
+        for reason, table in _GROUP_RELATIONS:
+            queries.append("SELECT credential_id, %s FROM {} WHERE group_id = ANY(%s)".format(table))
+            params += [reason, group_ids]
+        queries.append("SELECT credential_id, %s FROM access_vault_share WHERE user_id = %s AND active")
+        params += ["share", user.id]
+
+        self.env.cr.execute(" UNION ".join(queries), params)
+        exposure = {}
+        for credential_id, reason in self.env.cr.fetchall():
+            exposure.setdefault(credential_id, set()).add(reason)
+        return exposure
+
+    def action_preview(self):
+        self.ensure_one()
+        self._check_admin()
+        exposure = self._get_exposure()
+        self.write({
+            "credential_count": len(exposure),
+            "owned_count": sum(1 for reasons in exposure.values() if "owner" in reasons),
+            "share_count": sum(1 for reasons in exposure.values() if "share" in reasons),
+        })
+        return self._reopen()
+
+    # ------------------------------------------------------------
+    # Apply (bulk UPDATE / INSERT / DELETE)
+    # ------------------------------------------------------------
+
+    def action_apply(self):
+        self.ensure_one()
+        self._check_admin()
+        if self.state == "done":
+            raise UserError("Este desligamento já foi executado.")
+
+        cr = self.env.cr
+        user = self.user_id
+        exposure = self._get_exposure()
+        if not exposure:
+            raise UserError("Nenhuma credencial exposta para {}.".format(user.name))
+        credential_ids = list(exposure)
+
+        # 1) revoke active shares
+        cr.execute(
+            """
+            UPDATE access_vault_share
+               SET active = FALSE, write_uid = %s, write_date = (now() at time zone 'UTC')
+             WHERE user_id = %s AND active
+         RETURNING credential_id
+            """,
+            (self.env.uid, user.id),
+        )
+        revoked_credential_ids = [row[0] for row in cr.fetchall()]
+
+        # 2) reassign ownership (insert the new owner before dropping the old one,
+        #    so the "at least one owner" invariant holds at every step)
+        cr.execute(
+            """
+            INSERT INTO access_vault_credential_owner_rel (credential_id, user_id)
+                 SELECT credential_id, %s
+                   FROM access_vault_credential_owner_rel
+                  WHERE user_id = %s
+            ON CONFLICT DO NOTHING
+            """,
+            (self.new_owner_id.id, user.id),
+        )
+        for _reason, table in _USER_RELATIONS:
+            cr.execute("DELETE FROM {} WHERE user_id = %s".format(table), (user.id,))
+        owned_ids = [cid for cid, reasons in exposure.items() if "owner" in reasons]
+
+        # 3) every secret the user could see must be rotated
+        cr.execute(
+            """
+            UPDATE access_vault_secret
+               SET rotation_required = TRUE, write_uid = %s, write_date = (now() at time zone 'UTC')
+             WHERE credential_id = ANY(%s) AND _secret_encrypted IS NOT NULL
+            """,
+            (self.env.uid, credential_ids),
+        )
+        secret_count = cr.rowcount
+
+        cr.execute(
+            """
+            UPDATE access_vault_credential
+               SET write_uid = %s, write_date = (now() at time zone 'UTC')
+             WHERE id = ANY(%s)
+            """,
+            (self.env.uid, credential_ids),
+        )
+
+        self.env["access.vault.share"].invalidate_model(["active"])
+        self.env["access.vault.secret"].invalidate_model(["rotation_required"])
+        self.env["access.vault.credential"].invalidate_model(
+            ["owner_ids", "allowed_user_ids", "allowed_manager_user_ids", "share_ids"]
+        )
+
+        # 4) batched audit trail
+        Credential = self.env["access.vault.credential"]
+        entries = [
+            (cid, "share_revoke", "Acesso temporário revogado para {} (desligamento)".format(user.name))
+            for cid in revoked_credential_ids
+        ]
+        entries += [
+            (
+                cid,
+                "offboarding",
+                "Desligamento de {}: acesso via {} removido; propriedade transferida para {}; segredos marcados para rotação".format(
+                    user.name, ", ".join(sorted(reasons)), self.new_owner_id.name
+                )
+                if "owner" in reasons
+                else "Desligamento de {}: acesso via {} removido; segredos marcados para rotação".format(
+                    user.name, ", ".join(sorted(reasons))
+                ),
+            )
+            for cid, reasons in exposure.items()
+        ]
+        Credential._vault_log_many(entries)
+
+        self.write({
+            "state": "done",
+            "credential_count": len(credential_ids),
+            "owned_count": len(owned_ids),
+            "share_count": len(revoked_credential_ids),
+            "secret_count": secret_count,
+            "report_file": self._build_report(exposure),
+            "report_filename": "offboarding_{}_{}.csv".format(user.login, fields.Date.today()),
+        })
+        _logger.info(
+            "Access Vault offboarding of user %s: %s credentials, %s shares revoked, %s secrets flagged",
+            user.id, len(credential_ids), len(revoked_credential_ids), secret_count,
+        )
+        return self._reopen()
+
+    def _build_report(self, exposure):
+        """CSV exposure report (base64), one row per credential."""
+        self.env.cr.execute(
+            """
+            SELECT c.id, c.name, c.environment, c.business_unit, c.criticality,
+                   COUNT(s.id) FILTER (WHERE s.rotation_required) AS secrets_to_rotate
+              FROM access_vault_credential c
+         LEFT JOIN access_vault_secret s ON s.credential_id = c.id
+             WHERE c.id = ANY(%s)
+          GROUP BY c.id
+          ORDER BY c.criticality DESC, c.name
+            """,
+            (list(exposure),),
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "credencial", "ambiente", "unidade", "criticidade", "acesso", "segredos_a_rotacionar"])
+        for cred_id, name, environment, business_unit, criticality, secrets_to_rotate in self.env.cr.fetchall():
+            writer.writerow([
+                cred_id, name, environment, business_unit, criticality,
+                "|".join(sorted(exposure[cred_id])), secrets_to_rotate,
+            ])
+        return base64.b64encode(buffer.getvalue().encode("utf-8"))
+
+    def _check_admin(self):
+        if not self.env.user.has_group("access_vault.group_access_vault_admin"):
+            raise AccessError("Apenas administradores do Access Vault podem executar desligamentos.")
+
+    def _reopen(self):
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
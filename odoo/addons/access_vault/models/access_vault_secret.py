@@ -32,6 +32,12 @@ class AccessVaultSecret(models.Model):
     _secret_encrypted = fields.Text(string="Segredo (criptografado)", readonly=True)
     secret_set = fields.Boolean(compute="_compute_secret_set", store=True)
     last_rotation_at = fields.Datetime(string="Última rotação", readonly=True)
+    rotation_required = fields.Boolean(
+        string="Rotação obrigatória",
+        readonly=True,
+        index=True,
+        help="Marcado quando o segredo foi exposto (ex.: desligamento de usuário) e precisa ser rotacionado.",
+    )
 
     @api.depends("_secret_encrypted")
     def _compute_secret_set(self):
@@ -70,6 +76,7 @@ class AccessVaultSecret(models.Model):
         crypto = self.env["access.vault.crypto"]
         self._secret_encrypted = crypto.encrypt(plaintext)
         self.last_rotation_at = fields.Datetime.now()
+        self.rotation_required = False
         self.credential_id.last_rotation_at = self.last_rotation_at
         self.credential_id._vault_log("rotate", "Segredo rotacionado ({})".format(self.name))
 
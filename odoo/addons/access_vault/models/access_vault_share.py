@@ -53,33 +53,15 @@ class AccessVaultShare(models.Model):
         title = "Access Vault - Compartilhamento de Acesso"
         message = "Você recebeu acesso temporário à credencial '{}' até {}.".format(credential.name, self.expires_at.strftime('%d/%m/%Y %H:%M'))
 
-        # Toast notification
-        self.env["bus.bus"]._sendone(
-            partner,
-            "simple_notification",
-            {
-                "type": "success",
-                "title": title,
-                "message": message,
-                "sticky": True
-            },
-        )
-
-        # Discuss chat message (DM)
-        try:
-            channel = self.env["discuss.channel"].with_user(self.env.ref("base.user_admin"))._get_or_create_chat(
-                partners_to=[partner.id],
-                pin=True,
-            )
-            channel.message_post(
-                body="{}\n\nConcedido por: {}".format(message, self.created_by.name),
-                message_type="comment",
-                subtype_xmlid="mail.mt_comment",
-                partner_ids=[partner.id],
-            )
-        except Exception as e:
-            # Log error but don't fail the operation
-            _logger.warning("Falha ao enviar notificação de chat para usuário %s: %s", self.user_id.name, str(e))
+        # Toast + DM, delivered after commit by the notification outbox
+        self.env["notify.outbox"]._enqueue([{
+            "partner_id": partner.id,
+            "title": title,
+            "message": message,
+            "toast_type": "success",
+            "sticky": True,
+            "chat_body": "{}\n\nConcedido por: {}".format(message, self.created_by.name),
+        }])
 
     def action_revoke(self):
         for rec in self:
@@ -88,10 +70,18 @@ class AccessVaultShare(models.Model):
 
     @api.model
     def _cron_expire_shares(self):
-        now = fields.Datetime.now()
-        shares = self.search([("active", "=", True), ("expires_at", "<=", now)])
-        for share in shares:
-            share.active = False
-            share.credential_id._vault_log("share_expire", "Acesso temporário expirou para {}".format(share.user_id.name))
-
+        """Deactivate expired shares, in committed chunks (see cron.runner)"""
+        return self.env["cron.runner"]._run_search(
+            "access_vault.expire_shares",
+            self,
+            lambda run_at: [("active", "=", True), ("expires_at", "<=", run_at)],
+            lambda shares, run_at: shares._expire(),
+            cron_xmlid="access_vault.ir_cron_access_vault_expire_shares",
+        )
 
+    def _expire(self):
+        self.write({"active": False})
+        self.env["access.vault.credential"]._vault_log_many(
+            (share.credential_id.id, "share_expire", "Acesso temporário expirou para {}".format(share.user_id.name))
+            for share in self
+        )
@@ -12,6 +12,7 @@ export class AccessVaultDashboard extends Component {
             loading: true,
             tab: "overview",
             stats: null,
+            forecast: null,
         });
 
         onWillStart(async () => {
@@ -21,10 +22,24 @@ export class AccessVaultDashboard extends Component {
 
     async reload() {
         this.state.loading = true;
-        this.state.stats = await this.orm.call("access.vault.credential", "get_dashboard_stats", [], {});
+        const [stats, forecast] = await Promise.all([
+            this.orm.call("access.vault.credential", "get_dashboard_stats", [], {}),
+            this.orm.call("access.vault.credential", "get_rotation_forecast", [], { days: 90 }),
+        ]);
+        this.state.stats = stats;
+        this.state.forecast = forecast;
         this.state.loading = false;
     }
 
+    forecastCellStyle(count) {
+        const max = (this.state.forecast && this.state.forecast.max) || 0;
+        if (!count || !max) {
+            return "";
+        }
+        const alpha = 0.15 + 0.85 * (count / max);
+        return `background-color: rgba(220, 53, 69, ${alpha.toFixed(2)});`;
+    }
+
     setTab(tab) {
         this.state.tab = tab;
     }
@@ -0,0 +1,14 @@
+{
+    "name": "Cron Runner (Chunked / Resumable Scheduled Jobs)",
+    "version": "19.0.1.0.0",
+    "category": "Hidden/Tools",
+    "summary": "Keyset-chunked, resumable execution of scheduled jobs with checkpoints, time budgets and run metrics",
+    "author": "Hypetech",
+    "depends": ["base"],
+    "data": [
+        "security/ir.model.access.csv",
+        "views/cron_runner_views.xml",
+    ],
+    "application": False,
+    "license": "LGPL-3",
+}
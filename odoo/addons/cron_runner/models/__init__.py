@@ -0,0 +1,3 @@
+
+from . import cron_runner_checkpoint
+from . import cron_runner
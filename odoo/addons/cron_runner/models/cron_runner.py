@@ -0,0 +1,154 @@
+import time
+
+from odoo import api, fields, models
+import logging
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 200
+# Seconds of work per run before the job re-queues itself (below the cron time limit)
+DEFAULT_TIME_BUDGET = 60
+
+
+class CronRunner(models.AbstractModel):
+    """
+    Chunked, resumable execution of scheduled jobs.
+
+    A job walks its records by ascending id (keyset cursor), ``chunk_size`` at a
+    time, and commits after every chunk together with its checkpoint. Once the
+    wall-time budget is spent, the job re-queues its cron through ir.cron triggers
+    and the next run resumes after the last committed id, with a fresh reference
+    time (``run_at``, so date-based domains see the current day). A chunk that
+    raises is rolled back and retried record by record: the failing records are
+    logged, counted and skipped, so one bad record cannot block the job.
+
+    With ``cron_runner_no_commit`` in the context nothing is committed and the whole
+    job stays in the caller's transaction (benchmarks, shell sessions). The
+    access_vault benchmark (access.vault.benchmark._run_benchmark) relies on it to
+    measure the chunked crons inside its rolled-back savepoint.
+    """
+    _name = "cron.runner"
+    _description = "Cron Runner"
+
+    @api.model
+    def _run_search(self, job, model, domain, process, **kwargs):
+        """
+        Run ``process(records, run_at)`` over the records of ``model`` matching ``domain``.
+
+        ``domain`` may be a callable(run_at) for time-dependent selections. Keyword
+        arguments are passed to _run_chunked.
+        """
+        Model = self.env[model] if isinstance(model, str) else model
+
+        def fetch(after_id, run_at, limit):
+            base = domain(run_at) if callable(domain) else domain
+            return Model.search(list(base) + [("id", ">", after_id)], order="id", limit=limit)
+
+        return self._run_chunked(job, fetch, process, **kwargs)
+
+    @api.model
+    def _run_chunked(self, job, fetch, process, chunk_size=DEFAULT_CHUNK_SIZE,
+                     time_budget=DEFAULT_TIME_BUDGET, cron_xmlid=None):
+        """
+        Run ``job`` from its checkpoint.
+
+        ``fetch(after_id, run_at, limit)`` returns the next records with id > after_id,
+        ordered by id; ``process(records, run_at)`` handles one chunk. Returns the run
+        metrics; ``finished`` is False when the pass was cut by the time budget.
+        """
+        checkpoint = self.env["cron.runner.checkpoint"]._get(job)
+        run_at = fields.Datetime.now()
+        if checkpoint.state == "running" and checkpoint.pass_started_at:
+            after_id = checkpoint.last_id
+            _logger.info("Cron runner %s: resuming pass of %s after id %s",
+                         job, checkpoint.pass_started_at, after_id)
+        else:
+            after_id = 0
+            checkpoint.write({"state": "running", "last_id": 0, "pass_started_at": run_at, "pass_rows": 0})
+
+        started_at = fields.Datetime.now()
+        start = time.monotonic()
+        chunk_times = []
+        rows = 0
+        failed = 0
+        finished = False
+        while True:
+            chunk_start = time.monotonic()
+            records = fetch(after_id, run_at, chunk_size)
+            if not records:
+                finished = True
+                break
+            failed += self._process_chunk(job, process, records, run_at)
+            after_id = max(records.ids)
+            rows += len(records)
+            checkpoint.write({"last_id": after_id, "pass_rows": checkpoint.pass_rows + len(records)})
+            self._commit_chunk()
+            chunk_times.append(time.monotonic() - chunk_start)
+            if len(records) < chunk_size:
+                finished = True
+                break
+            if time.monotonic() - start >= time_budget:
+                break
+
+        if finished:
+            checkpoint.write({
+                "state": "idle",
+                "last_id": 0,
+                "pass_started_at": False,
+                "pass_count": checkpoint.pass_count + 1,
+                "last_pass_finished_at": fields.Datetime.now(),
+            })
+        elif cron_xmlid:
+            cron = self.env.ref(cron_xmlid, raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+
+        metrics = {
+            "job": job,
+            "rows": rows,
+            "chunks": len(chunk_times),
+            "duration": round(time.monotonic() - start, 3),
+            "chunk_avg_ms": round(1000 * sum(chunk_times) / len(chunk_times), 1) if chunk_times else 0.0,
+            "chunk_max_ms": round(1000 * max(chunk_times), 1) if chunk_times else 0.0,
+            "failed": failed,
+            "finished": finished,
+        }
+        self.env["cron.runner.run"].sudo().create({
+            "checkpoint_id": checkpoint.id,
+            "started_at": started_at,
+            **{key: value for key, value in metrics.items() if key != "job"},
+        })
+        self._commit_chunk()
+        _logger.info("Cron runner %s: %s", job, metrics)
+        return metrics
+
+    @api.model
+    def _process_chunk(self, job, process, records, run_at):
+        """Process ``records`` in a savepoint; on error, retry them one by one. Return the number of failures"""
+        try:
+            with self.env.cr.savepoint():
+                process(records, run_at)
+            return 0
+        except Exception:
+            _logger.warning("Cron runner %s: chunk %s-%s failed, retrying record by record",
+                            job, min(records.ids), max(records.ids), exc_info=True)
+            self.env.invalidate_all(flush=False)
+        failed = 0
+        for record in records:
+            try:
+                with self.env.cr.savepoint():
+                    process(record, run_at)
+            except Exception:
+                _logger.exception("Cron runner %s: skipping %s", job, record)
+                self.env.invalidate_all(flush=False)
+                failed += 1
+        return failed
+
+    @api.model
+    def _commit_chunk(self):
+        """Commit the work done so far and start the next chunk with an empty cache"""
+        if self.env.context.get("cron_runner_no_commit") or self.env.registry.in_test_mode():
+            self.env.flush_all()
+            return
+        self.env.cr.commit()
+        self.env.invalidate_all()
@@ -0,0 +1,64 @@
+from odoo import api, fields, models
+
+# Run history kept by the autovacuum
+RUN_RETENTION_DAYS = 30
+
+
+class CronRunnerCheckpoint(models.Model):
+    _name = "cron.runner.checkpoint"
+    _description = "Cron Runner - Job checkpoint"
+    _order = "job"
+
+    job = fields.Char(required=True, readonly=True, string="Job")
+
+    # Keyset cursor of the pass in progress (0 / empty when idle)
+    state = fields.Selection([
+        ("idle", "Ocioso"),
+        ("running", "Em andamento"),
+    ], default="idle", required=True, readonly=True, string="Status")
+    last_id = fields.Integer(readonly=True, string="Último ID processado")
+    pass_started_at = fields.Datetime(readonly=True, string="Passagem iniciada em")
+    pass_rows = fields.Integer(readonly=True, string="Linhas na passagem")
+
+    # Totals
+    pass_count = fields.Integer(readonly=True, string="Passagens concluídas")
+    last_pass_finished_at = fields.Datetime(readonly=True, string="Última passagem concluída em")
+
+    run_ids = fields.One2many("cron.runner.run", "checkpoint_id", string="Execuções")
+
+    _job_unique = models.Constraint("UNIQUE(job)", "Já existe um checkpoint para este job.")
+
+    @api.model
+    def _get(self, job):
+        """Return the checkpoint of ``job``, created on first use"""
+        checkpoint = self.sudo().search([("job", "=", job)], limit=1)
+        if not checkpoint:
+            checkpoint = self.sudo().create({"job": job})
+        return checkpoint
+
+    def action_reset(self):
+        """Drop the pass in progress; the next run starts over"""
+        self.write({"state": "idle", "last_id": 0, "pass_started_at": False, "pass_rows": 0})
+
+
+class CronRunnerRun(models.Model):
+    _name = "cron.runner.run"
+    _description = "Cron Runner - Run metrics"
+    _order = "started_at desc, id desc"
+
+    checkpoint_id = fields.Many2one("cron.runner.checkpoint", required=True, ondelete="cascade", index=True)
+    job = fields.Char(related="checkpoint_id.job", store=True, string="Job")
+    started_at = fields.Datetime(required=True, string="Início")
+    duration = fields.Float(string="Duração (s)", digits=(16, 3))
+    rows = fields.Integer(string="Linhas processadas")
+    chunks = fields.Integer(string="Lotes")
+    chunk_avg_ms = fields.Float(string="Tempo médio por lote (ms)", digits=(16, 1))
+    chunk_max_ms = fields.Float(string="Tempo máximo por lote (ms)", digits=(16, 1))
+    failed = fields.Integer(string="Falhas", help="Registros que falharam e foram ignorados nesta execução.")
+    finished = fields.Boolean(string="Passagem concluída",
+                              help="Falso quando a execução parou pelo orçamento de tempo e foi reagendada.")
+
+    @api.autovacuum
+    def _gc_runs(self):
+        limit = fields.Datetime.subtract(fields.Datetime.now(), days=RUN_RETENTION_DAYS)
+        self.search([("started_at", "<", limit)]).unlink()
@@ -0,0 +1,15 @@
+{
+    "name": "Notification Outbox (Async Toasts / Discuss DMs)",
+    "version": "19.0.1.0.0",
+    "category": "Hidden/Tools",
+    "summary": "Transactional outbox for bus toasts and Discuss direct messages, delivered in batches by a background job",
+    "author": "Hypetech",
+    "depends": ["base", "bus", "mail", "cron_runner"],
+    "data": [
+        "security/ir.model.access.csv",
+        "data/ir_cron.xml",
+        "views/notify_outbox_views.xml",
+    ],
+    "application": False,
+    "license": "LGPL-3",
+}
@@ -0,0 +1,213 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models
+import logging
+
+_logger = logging.getLogger(__name__)
+
+PRECOMMIT_KEY = "notify.outbox"
+MAX_ATTEMPTS = 5
+SENT_RETENTION_DAYS = 7
+
+TOAST_TYPES = [
+    ("info", "Informação"),
+    ("success", "Sucesso"),
+    ("warning", "Aviso"),
+    ("danger", "Perigo"),
+]
+# Severity order used when several toasts of a partner are merged
+TOAST_SEVERITY = [key for key, _label in TOAST_TYPES]
+
+# Per-worker cache of DM channel ids: {(dbname, author_id, partner_id): channel_id}.
+# Kept out of the registry ormcaches so a stale entry is evicted on its own.
+_CHAT_CHANNEL_IDS = {}
+
+
+class NotifyOutbox(models.Model):
+    """
+    Transactional outbox for user notifications (bus toast + optional Discuss DM).
+
+    Producers call _enqueue() inside their transaction: rows are buffered in memory
+    and inserted in one statement when the transaction commits (nothing is queued
+    if it rolls back), and the delivery job is triggered. The job drains the outbox
+    in chunks (cron.runner), merges the toasts and DMs of each partner into one bus
+    message and one chat post, reuses cached chat channels, and retries failed
+    partners with exponential backoff.
+    """
+    _name = "notify.outbox"
+    _description = "Notification Outbox"
+    _order = "id"
+
+    partner_id = fields.Many2one("res.partner", required=True, ondelete="cascade", string="Destinatário")
+    title = fields.Char(required=True, string="Título")
+    message = fields.Text(required=True, string="Mensagem")
+    toast_type = fields.Selection(TOAST_TYPES, default="info", required=True, string="Tipo")
+    sticky = fields.Boolean(string="Fixa")
+    chat_body = fields.Text(string="Mensagem no Discuss", help="Vazio: apenas a notificação (toast).")
+
+    state = fields.Selection([
+        ("pending", "Pendente"),
+        ("sent", "Enviada"),
+        ("failed", "Falhou"),
+    ], default="pending", required=True, string="Status")
+    attempts = fields.Integer(string="Tentativas")
+    next_attempt_at = fields.Datetime(string="Próxima tentativa", default=fields.Datetime.now)
+    sent_at = fields.Datetime(string="Enviada em")
+    last_error = fields.Text(string="Último erro")
+
+    _pending_idx = models.Index("(next_attempt_at, id) WHERE state = 'pending'")
+
+    # ------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------
+
+    @api.model
+    def _enqueue(self, vals_list):
+        """Queue notifications; they are written when the current transaction commits."""
+        vals_list = [vals for vals in vals_list if vals.get("partner_id")]
+        if not vals_list:
+            return
+        precommit = self.env.cr.precommit
+        queue = precommit.data.get(PRECOMMIT_KEY)
+        if queue is None:
+            queue = precommit.data[PRECOMMIT_KEY] = []
+            precommit.add(self._flush_queue)
+            # the trigger row is part of this transaction, the worker wake-up is post-commit
+            cron = self.env.ref("notify_outbox.ir_cron_notify_outbox_drain", raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+        queue.extend(vals_list)
+
+    @api.model
+    def _discard_queue(self):
+        """Forget the notifications queued by this transaction (after a rollback to a savepoint)"""
+        self.env.cr.precommit.data.pop(PRECOMMIT_KEY, None)
+
+    def _flush_queue(self):
+        queue = self.env.cr.precommit.data.pop(PRECOMMIT_KEY, [])
+        if not queue:
+            return
+        self.env.cr.execute("""
+            INSERT INTO notify_outbox (
+                partner_id, title, message, toast_type, sticky, chat_body,
+                state, attempts, next_attempt_at,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT q.partner_id, q.title, q.message, q.toast_type, q.sticky, q.chat_body,
+                   'pending', 0, now() at time zone 'UTC',
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM unnest(%(partners)s::int[], %(titles)s::varchar[], %(messages)s::text[],
+                          %(types)s::varchar[], %(stickies)s::bool[], %(bodies)s::text[])
+                   AS q(partner_id, title, message, toast_type, sticky, chat_body)
+        """, {
+            "uid": self.env.uid,
+            "partners": [vals["partner_id"] for vals in queue],
+            "titles": [vals["title"] for vals in queue],
+            "messages": [vals["message"] for vals in queue],
+            "types": [vals.get("toast_type", "info") for vals in queue],
+            "stickies": [bool(vals.get("sticky")) for vals in queue],
+            "bodies": [vals.get("chat_body") or None for vals in queue],
+        })
+
+    # ------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------
+
+    @api.model
+    def _cron_drain(self):
+        return self.env["cron.runner"]._run_search(
+            "notify_outbox.drain",
+            self,
+            lambda run_at: [("state", "=", "pending"), ("next_attempt_at", "<=", run_at)],
+            lambda rows, run_at: rows._deliver(),
+            cron_xmlid="notify_outbox.ir_cron_notify_outbox_drain",
+        )
+
+    def _deliver(self):
+        """Deliver self: one chat post and one bus message per partner"""
+        now = fields.Datetime.now()
+        by_partner = defaultdict(lambda: self.browse())
+        for row in self:
+            by_partner[row.partner_id] |= row
+
+        bus_messages = []
+        delivered = self.browse()
+        for partner, rows in by_partner.items():
+            chat_rows = rows.filtered("chat_body")
+            if chat_rows:
+                try:
+                    with self.env.cr.savepoint():
+                        self._post_chat(partner, "\n\n".join(chat_rows.mapped("chat_body")))
+                except Exception as e:
+                    # Keep the job robust: only this partner is retried later
+                    _logger.warning("Falha ao enviar notificação de chat para %s: %s", partner.name, str(e))
+                    rows._schedule_retry(str(e), now)
+                    continue
+            bus_messages.append((partner, "simple_notification", rows._toast_payload()))
+            delivered |= rows
+
+        if bus_messages:
+            self.env["bus.bus"]._sendmany(bus_messages)
+        delivered.write({"state": "sent", "sent_at": now, "last_error": False})
+
+    def _toast_payload(self):
+        if len(self) == 1:
+            return {"type": self.toast_type, "title": self.title, "message": self.message, "sticky": self.sticky}
+        titles = set(self.mapped("title"))
+        return {
+            "type": max(self.mapped("toast_type"), key=TOAST_SEVERITY.index),
+            "title": "{} ({})".format(titles.pop(), len(self)) if len(titles) == 1
+                     else "{} novas notificações".format(len(self)),
+            "message": "\n".join(self.mapped("message")),
+            "sticky": any(self.mapped("sticky")),
+        }
+
+    @api.model
+    def _post_chat(self, partner, body):
+        author = self.env.ref("base.user_admin")
+        channel = self._get_chat_channel(author, partner)
+        channel.with_user(author).message_post(
+            body=body,
+            message_type="comment",
+            subtype_xmlid="mail.mt_comment",
+            partner_ids=[partner.id],
+        )
+
+    @api.model
+    def _get_chat_channel(self, author, partner):
+        """Return the DM channel between an author user and a partner (per-worker cache)"""
+        key = (self.env.cr.dbname, author.id, partner.id)
+        channel = self.env["discuss.channel"].browse(_CHAT_CHANNEL_IDS.get(key)).exists()
+        if channel:
+            return channel
+        # missing, or removed since it was cached
+        _CHAT_CHANNEL_IDS.pop(key, None)
+        channel = self.env["discuss.channel"].with_user(author)._get_or_create_chat(
+            partners_to=[partner.id],
+            pin=True,
+        )
+        # A channel created by this transaction may still be rolled back (the caller's
+        # savepoint or chunk): only cache channels that already existed
+        if channel.create_date != self.env.cr.now():
+            _CHAT_CHANNEL_IDS[key] = channel.id
+        return channel.with_env(self.env)
+
+    def _schedule_retry(self, error, now):
+        for row in self:
+            attempts = row.attempts + 1
+            row.write({
+                "attempts": attempts,
+                "last_error": error,
+                "state": "failed" if attempts >= MAX_ATTEMPTS else "pending",
+                "next_attempt_at": now + timedelta(minutes=2 ** attempts),
+            })
+
+    def action_retry(self):
+        self.write({"state": "pending", "attempts": 0, "next_attempt_at": fields.Datetime.now()})
+        self.env.ref("notify_outbox.ir_cron_notify_outbox_drain").sudo()._trigger()
+
+    @api.autovacuum
+    def _gc_sent(self):
+        limit = fields.Datetime.subtract(fields.Datetime.now(), days=SENT_RETENTION_DAYS)
+        self.search([("state", "=", "sent"), ("sent_at", "<", limit)]).unlink()
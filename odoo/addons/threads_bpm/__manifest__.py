@@ -1,22 +1,29 @@
 {
     "name": "Threads BPM - Business Process Management",
-    "version": "19.0.1.0.0",
+    "version": "19.0.1.1.0",
     "category": "Productivity",
     "summary": "Visual BPM system for Threads (one-time processes) and recurring Processes with SLAs, checklists, and project integration",
     "author": "Hypetech",
-    "depends": ["base", "web", "mail", "project"],
+    "depends": ["base", "web", "mail", "project", "resource", "cron_runner", "notify_outbox"],
+    "external_dependencies": {"python": ["numpy"]},
+    "post_init_hook": "post_init_hook",
     "data": [
         "security/threads_bpm_groups.xml",
         "security/ir.model.access.csv",
         "security/threads_bpm_record_rules.xml",
         "data/user_data.xml",
         "data/threads_bpm_cron.xml",
+        "views/threads_bpm_sla_simulation_views.xml",
         "views/threads_bpm_template_views.xml",
         "views/threads_bpm_execution_views.xml",
         "views/threads_bpm_step_views.xml",
         "views/threads_bpm_checklist_views.xml",
         "views/threads_bpm_dashboard_views.xml",
+        "views/threads_bpm_execution_archive_views.xml",
+        "views/threads_bpm_step_rollup_views.xml",
+        "views/threads_bpm_reassign_views.xml",
         "views/threads_bpm_menus.xml",
+        "views/res_config_settings_views.xml",
         "data/mail_templates.xml",
     ],
     "assets": {
@@ -0,0 +1,16 @@
+from odoo import http
+from odoo.http import request
+
+
+class ThreadsBPMController(http.Controller):
+
+    @http.route("/threads_bpm/steps/transition", type="jsonrpc", auth="user")
+    def transition_steps(self, step_ids, action, versions=None):
+        """Start / complete / skip many steps in one request.
+
+        Params: ``step_ids`` (list of ids), ``action`` ('start', 'complete' or 'skip'),
+        optional ``versions`` ({step_id: lock_version}) to reject stale transitions.
+        Returns the new state and lock_version of every step; access rights and record
+        rules apply.
+        """
+        return request.env["threads_bpm.step"].transition_steps(step_ids, action, versions)
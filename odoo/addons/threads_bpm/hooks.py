@@ -0,0 +1,16 @@
+def repair_stored_data(env):
+    """Backfill / repair the denormalized counters and schedules.
+
+    Runs once every table of the module exists: after install (post_init_hook)
+    and after upgrades (migrations), never from a model's init().
+    """
+    env['threads_bpm.execution']._rebuild_step_aggregates()
+    env['threads_bpm.step']._rebuild_checklist_counters()
+    env['threads_bpm.step']._rebuild_blocking_counts()
+    env['threads_bpm.step']._close_skipped_steps()
+    env['threads_bpm.step.rollup']._backfill()
+    env['threads_bpm.template']._backfill_next_run()
+
+
+def post_init_hook(env):
+    repair_stored_data(env)
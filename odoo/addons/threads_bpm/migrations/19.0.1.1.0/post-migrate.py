@@ -0,0 +1,8 @@
+from odoo import SUPERUSER_ID, api
+
+from odoo.addons.threads_bpm.hooks import repair_stored_data
+
+
+def migrate(cr, version):
+    # The repairs used to run from init(), before every table of the module existed
+    repair_stored_data(api.Environment(cr, SUPERUSER_ID, {}))
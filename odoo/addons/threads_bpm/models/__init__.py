@@ -1,6 +1,17 @@
 from . import threads_bpm_template
+from . import threads_bpm_template_version
 from . import threads_bpm_execution
+from . import threads_bpm_execution_archive
+from . import threads_bpm_execution_refresh
 from . import threads_bpm_step
+from . import threads_bpm_step_rollup
+from . import threads_bpm_eta
+from . import threads_bpm_sla_simulation
 from . import threads_bpm_checklist
 from . import threads_bpm_log
+from . import threads_bpm_sla_notification
+from . import threads_bpm_calendar
+from . import threads_bpm_task_sync
+from . import threads_bpm_reassign
+from . import res_config_settings
 # from . import res_users_extension  # Temporariamente desabilitado para resolver problema de coluna inexistente
\ No newline at end of file
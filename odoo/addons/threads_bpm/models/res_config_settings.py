@@ -0,0 +1,40 @@
+from odoo import fields, models
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = "res.config.settings"
+
+    threads_bpm_sla_digest = fields.Boolean(
+        string="Resumo de alertas de SLA",
+        config_parameter="threads_bpm.sla_digest",
+        help="Agrupa os alertas de SLA de cada usuário em uma única mensagem por intervalo.",
+    )
+    threads_bpm_sla_digest_hours = fields.Integer(
+        string="Intervalo do resumo (horas)",
+        config_parameter="threads_bpm.sla_digest_hours",
+        default=4,
+    )
+    threads_bpm_sla_digest_bypass = fields.Selection([
+        ("overdue", "Etapas atrasadas"),
+        ("none", "Nenhum"),
+    ], string="Alertas enviados imediatamente",
+        config_parameter="threads_bpm.sla_digest_bypass",
+        default="overdue",
+        help="Alertas urgentes que não aguardam o resumo.")
+
+    threads_bpm_archive_retention_days = fields.Integer(
+        string="Arquivar execuções após (dias)",
+        config_parameter="threads_bpm.archive_retention_days",
+        default=365,
+        help="Execuções concluídas ou canceladas há mais tempo são movidas para o arquivo. 0 desativa.",
+    )
+
+    def set_values(self):
+        super().set_values()
+        # The digest job runs once per interval
+        cron = self.env.ref("threads_bpm.ir_cron_threads_bpm_sla_digests", raise_if_not_found=False)
+        if cron:
+            cron.sudo().write({
+                "interval_number": max(self.threads_bpm_sla_digest_hours or 1, 1),
+                "interval_type": "hours",
+            })
@@ -0,0 +1,172 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from odoo import api, fields, models
+from odoo.tools import ormcache
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Horizon covered by a working-time index, relative to the day it is built
+INDEX_DAYS_BEFORE = 400
+INDEX_DAYS_AFTER = 730
+
+
+class WorkingTimeIndex:
+    """Cumulative working-seconds index over the work intervals of a calendar.
+
+    ``starts``/``stops`` are the sorted, disjoint working intervals (naive UTC) and
+    ``cumulative[i]`` is the working time elapsed before ``starts[i]``. Adding N
+    working seconds or measuring elapsed working time is then a binary search
+    instead of a day-by-day walk over the calendar.
+    """
+
+    __slots__ = ("starts", "stops", "cumulative", "cumulative_end")
+
+    def __init__(self, intervals):
+        self.starts = []
+        self.stops = []
+        self.cumulative = []
+        self.cumulative_end = []
+        total = 0.0
+        for start, stop in intervals:
+            if stop <= start:
+                continue
+            if self.stops and start < self.stops[-1]:
+                # merge overlapping attendances
+                start = self.stops[-1]
+                if stop <= start:
+                    continue
+            self.starts.append(start)
+            self.stops.append(stop)
+            self.cumulative.append(total)
+            total += (stop - start).total_seconds()
+            self.cumulative_end.append(total)
+
+    def covers(self, dt):
+        return bool(self.starts) and self.starts[0] <= dt <= self.stops[-1]
+
+    def offset(self, dt):
+        """Working seconds between the start of the index and ``dt``."""
+        i = bisect_right(self.starts, dt) - 1
+        if i < 0:
+            return 0.0
+        return self.cumulative[i] + (min(dt, self.stops[i]) - self.starts[i]).total_seconds()
+
+    def add(self, dt, seconds):
+        """Return the instant ``seconds`` of working time after ``dt`` (None if past the horizon)."""
+        target = self.offset(dt) + seconds
+        j = bisect_left(self.cumulative_end, target)
+        if j >= len(self.starts):
+            return None
+        return self.starts[j] + timedelta(seconds=target - self.cumulative[j])
+
+    def elapsed(self, start, end):
+        """Working seconds between ``start`` and ``end``."""
+        return max(0.0, self.offset(end) - self.offset(start))
+
+
+class ResourceCalendar(models.Model):
+    _inherit = "resource.calendar"
+
+    def _get_sla_working_index(self):
+        """Return the (per-worker cached) WorkingTimeIndex of this calendar, holidays excluded"""
+        self.ensure_one()
+        self.env.cr.execute("""
+            SELECT MAX(write_date), COUNT(*)
+              FROM resource_calendar_leaves
+             WHERE resource_id IS NULL AND (calendar_id = %s OR calendar_id IS NULL)
+        """, (self.id,))
+        leaves_stamp = tuple(self.env.cr.fetchone())
+        self.env.cr.execute("SELECT MAX(write_date) FROM resource_calendar_attendance WHERE calendar_id = %s", (self.id,))
+        stamp = (self.write_date, self.env.cr.fetchone()[0]) + leaves_stamp
+        return self._get_sla_working_index_cached(self.id, fields.Date.today(), stamp)
+
+    @api.model
+    @ormcache("calendar_id", "today", "stamp")
+    def _get_sla_working_index_cached(self, calendar_id, today, stamp):
+        calendar = self.browse(calendar_id)
+        start = datetime.combine(today - timedelta(days=INDEX_DAYS_BEFORE), time.min).replace(tzinfo=pytz.utc)
+        stop = datetime.combine(today + timedelta(days=INDEX_DAYS_AFTER), time.max).replace(tzinfo=pytz.utc)
+        # global leaves (holidays) are removed from the intervals by the calendar itself
+        intervals = calendar._work_intervals_batch(start, stop)[False]
+        return WorkingTimeIndex(
+            (interval_start.astimezone(pytz.utc).replace(tzinfo=None), interval_stop.astimezone(pytz.utc).replace(tzinfo=None))
+            for interval_start, interval_stop, _meta in intervals
+        )
+
+    def _sla_add_working_time(self, start, seconds, index=None):
+        """Return start + ``seconds`` of working time (None if outside the indexed horizon).
+
+        Batch callers resolve ``index`` once per calendar and pass it in.
+        """
+        index = index or self._get_sla_working_index()
+        if not index.covers(start):
+            return None
+        return index.add(start, seconds)
+
+    def _sla_working_seconds(self, start, end):
+        """Return the working seconds elapsed between start and end"""
+        return self._get_sla_working_index().elapsed(start, end)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'attendance_ids', 'hours_per_day', 'tz', 'global_leave_ids', 'leave_ids'} & set(vals):
+            self._recompute_bpm_sla_deadlines()
+        return res
+
+    def _recompute_bpm_sla_deadlines(self):
+        """Recompute the deadlines of all open BPM steps using these calendars, in bulk"""
+        Step = self.env['threads_bpm.step']
+        domain = [
+            ('completed_at', '=', False),
+            ('sla_enabled', '=', True),
+            ('execution_id.started_at', '!=', False),
+        ]
+        if self:
+            domain.append(('execution_id.sla_calendar_id', 'in', self.ids))
+        else:
+            domain.append(('execution_id.sla_calendar_id', '!=', False))
+        steps = Step.search(domain)
+        if not steps:
+            return
+        self.env.add_to_compute(Step._fields['sla_deadline'], steps)
+        steps.flush_recordset()
+        _logger.info("Threads BPM: recomputed %s SLA deadlines after calendar change", len(steps))
+
+
+class ResourceCalendarLeaves(models.Model):
+    _inherit = "resource.calendar.leaves"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        leaves = super().create(vals_list)
+        leaves._recompute_bpm_sla_deadlines()
+        return leaves
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._recompute_bpm_sla_deadlines()
+        return res
+
+    def unlink(self):
+        calendars = self.filtered(lambda l: not l.resource_id).calendar_id
+        has_shared = any(not l.resource_id and not l.calendar_id for l in self)
+        res = super().unlink()
+        if has_shared:
+            self.env['resource.calendar']._recompute_bpm_sla_deadlines()
+        elif calendars:
+            calendars._recompute_bpm_sla_deadlines()
+        return res
+
+    def _recompute_bpm_sla_deadlines(self):
+        holidays = self.filtered(lambda l: not l.resource_id)
+        if not holidays:
+            return
+        if any(not leave.calendar_id for leave in holidays):
+            # leave shared by every calendar
+            self.env['resource.calendar']._recompute_bpm_sla_deadlines()
+        else:
+            holidays.calendar_id._recompute_bpm_sla_deadlines()
@@ -1,4 +1,4 @@
-from odoo import fields, models
+from odoo import api, fields, models
 
 
 class ThreadsBPMChecklist(models.Model):
@@ -17,31 +17,88 @@ class ThreadsBPMChecklist(models.Model):
     completed_at = fields.Datetime(string="Concluído em", readonly=True)
     completed_by = fields.Many2one("res.users", string="Concluído por", readonly=True)
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        items = super().create(vals_list)
+        items.step_id._compile_templates()
+        items._update_step_counters({}, items._get_counter_snapshot())
+        return items
+
+    def write(self, vals):
+        before = self._get_counter_snapshot() if {'step_id', 'is_completed'} & set(vals) else None
+        res = super().write(vals)
+        if {'name', 'sequence', 'is_required', 'step_id'} & set(vals):
+            self.step_id._compile_templates()
+        if before is not None:
+            self._update_step_counters(before, self._get_counter_snapshot())
+        return res
+
+    def unlink(self):
+        steps = self.step_id
+        before = self._get_counter_snapshot()
+        res = super().unlink()
+        self.env['threads_bpm.checklist']._update_step_counters(before, {})
+        steps.exists()._compile_templates()
+        return res
+
+    def _get_counter_snapshot(self):
+        """Return {item_id: (step_id, is_completed)}"""
+        return {item.id: (item.step_id.id, item.is_completed) for item in self}
+
+    @api.model
+    def _update_step_counters(self, before, after):
+        deltas = {}
+        for snapshot, sign in ((before, -1), (after, 1)):
+            for step_id, is_completed in snapshot.values():
+                delta = deltas.setdefault(step_id, [0, 0])
+                delta[0] += sign
+                delta[1] += sign * is_completed
+        deltas = {step_id: delta for step_id, delta in deltas.items() if any(delta)}
+        self.env['threads_bpm.step']._apply_checklist_deltas(deltas)
+
     def action_toggle_completed(self):
         """Toggle the completion status of this checklist item"""
         self.ensure_one()
+        self._set_completed(not self.is_completed)
 
-        if self.is_completed:
-            # Mark as not completed
-            self.write({
-                'is_completed': False,
-                'completed_at': False,
-                'completed_by': False
-            })
-        else:
-            # Mark as completed
-            self.write({
+    def action_mark_completed(self):
+        """Mark all the items in self as done (one statement, one log row per execution)"""
+        self._set_completed(True)
+
+    def action_mark_pending(self):
+        """Mark all the items in self as not done"""
+        self._set_completed(False)
+
+    def _set_completed(self, completed):
+        self.step_id._lock_for_transition()
+        items = self.filtered(lambda item: item.is_completed != completed)
+        if not items:
+            return
+        if completed:
+            items.write({
                 'is_completed': True,
                 'completed_at': fields.Datetime.now(),
                 'completed_by': self.env.user.id
             })
+        else:
+            items.write({
+                'is_completed': False,
+                'completed_at': False,
+                'completed_by': False
+            })
 
-        # Log the action
-        action = "checklist_completed" if self.is_completed else "checklist_uncompleted"
-        detail = "Item '%s' marcado como %s" % (self.name, "concluído" if self.is_completed else "pendente")
-        self.step_id.execution_id._log_action(action, detail)
-
-        # Check if step can be auto-completed
-        if self.is_completed and self.step_id.checklist_progress >= 100:
-            # All checklist items completed, check if we can complete the step
-            pass  # The step completion is handled by the step logic
+        # Log the action: one entry per execution listing every item changed
+        action = "checklist_completed" if completed else "checklist_uncompleted"
+        status = "concluído" if completed else "pendente"
+        by_execution = {}
+        for item in items.filtered('step_id.execution_id'):
+            by_execution.setdefault(item.step_id.execution_id, []).append(item.name)
+        if not by_execution:
+            return
+        self.env['threads_bpm.log'].sudo().create([{
+            'execution_id': execution.id,
+            'user_id': self.env.user.id,
+            'action': action,
+            'detail': "Item '%s' marcado como %s" % (names[0], status) if len(names) == 1
+                      else "%s itens marcados como %s: %s" % (len(names), status, ", ".join(names)),
+        } for execution, names in by_execution.items()])
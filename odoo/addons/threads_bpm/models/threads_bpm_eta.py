@@ -0,0 +1,191 @@
+from datetime import timezone
+
+import numpy as np
+
+from odoo import api, fields, models
+import logging
+
+from .threads_bpm_step_rollup import SKETCH_GAMMA, SKETCH_ZERO_BUCKET
+
+_logger = logging.getLogger(__name__)
+
+# History used for the step duration statistics
+ETA_HISTORY_DAYS = 180
+# One-sided z-score of the 90th percentile (normal approximation of the remaining work)
+Z_P90 = 1.2816
+
+
+class ThreadsBPMEta(models.AbstractModel):
+    """
+    Completion time prediction of in-progress executions.
+
+    Step duration statistics (mean and variance per template step) come from the
+    cycle-time rollup sketches; the open steps of the executions are loaded as
+    NumPy arrays and reduced per execution with bincount, so a refresh costs a few
+    queries and array operations whatever the number of executions. The remaining
+    work of a sequential execution is the sum of its open steps (less the time
+    already spent on the started ones); for an execution with step dependencies it
+    is the longest dependency path, as parallel branches run at the same time. The
+    P90 uses the normal approximation of the sum along that path.
+    """
+    _name = "threads_bpm.eta"
+    _description = "Threads BPM - Completion time prediction"
+
+    @api.model
+    def _load_step_stats(self, step_keys=None):
+        """Return (keys, means, variances) in seconds, keys sorted, from the rollups of the history window"""
+        rows = self.env['threads_bpm.step.rollup']._get_sketch_rows(
+            step_keys, fields.Date.subtract(fields.Date.today(), days=ETA_HISTORY_DAYS))
+        if not rows:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty
+        step_col, bucket_col, count_col = zip(*rows)
+        buckets = np.array([0 if bucket == SKETCH_ZERO_BUCKET else int(bucket) for bucket in bucket_col], dtype=np.float64)
+        values = np.where(
+            np.array(bucket_col) == SKETCH_ZERO_BUCKET, 0.0, 2 * SKETCH_GAMMA ** buckets / (SKETCH_GAMMA + 1),
+        )
+        counts = np.array(count_col, dtype=np.float64)
+        keys, index = np.unique(np.array(step_col, dtype=np.int64), return_inverse=True)
+        totals = np.bincount(index, weights=counts)
+        means = np.bincount(index, weights=counts * values) / totals
+        variances = np.bincount(index, weights=counts * values ** 2) / totals - means ** 2
+        return keys, means, np.maximum(variances, 0.0)
+
+    @api.model
+    def _refresh(self, executions=None):
+        """Recompute the ETA of ``executions`` (all in-progress executions when None)"""
+        Execution = self.env['threads_bpm.execution']
+        self.env.flush_all()
+        scope = "AND e.id = ANY(%(ids)s)" if executions is not None else ""
+        ids = executions.ids if executions is not None else None
+        if ids is not None and not ids:
+            return
+
+        # Finished / cancelled executions lose their prediction
+        self.env.cr.execute("""
+            UPDATE threads_bpm_execution e
+               SET eta_expected_at = NULL, eta_p90_at = NULL, eta_delay_hours = NULL
+             WHERE e.state != 'in_progress' AND e.eta_expected_at IS NOT NULL {scope}
+        """.format(scope=scope), {'ids': ids})
+
+        self.env.cr.execute("""
+            SELECT s.execution_id,
+                   s.id,
+                   COALESCE(s.template_step_id, 0),
+                   s.state = 'in_progress',
+                   s.state IN ('pending', 'in_progress'),
+                   COALESCE(EXTRACT(EPOCH FROM s.started_at), 0)::float8,
+                   EXTRACT(EPOCH FROM COALESCE(e.started_at, e.create_date))::float8,
+                   COALESCE(e.uses_dependencies, FALSE)
+              FROM threads_bpm_step s
+              JOIN threads_bpm_execution e ON e.id = s.execution_id
+             WHERE e.state = 'in_progress' {scope}
+        """.format(scope=scope), {'ids': ids})
+        rows = self.env.cr.fetchall()
+        if rows:
+            self._write_predictions(*(np.array(column) for column in zip(*rows)))
+        Execution.invalidate_model(['eta_expected_at', 'eta_p90_at', 'eta_delay_hours'])
+
+    @api.model
+    def _write_predictions(self, execution_col, step_col, key_col, started_col, open_col, step_start_col,
+                           execution_start_col, dependencies_col):
+        keys, means, variances = self._load_step_stats(np.unique(key_col).tolist())
+        # Steps without history: average of the known steps (0 without any history)
+        fallback_mean = means.mean() if len(means) else 0.0
+        fallback_var = variances.mean() if len(variances) else 0.0
+        if len(keys):
+            position = np.minimum(np.searchsorted(keys, key_col), len(keys) - 1)
+            known = keys[position] == key_col
+            step_mean = np.where(known, means[position], fallback_mean)
+            step_var = np.where(known, variances[position], fallback_var)
+        else:
+            step_mean = np.full(len(key_col), fallback_mean)
+            step_var = np.full(len(key_col), fallback_var)
+
+        # Datetimes are naive UTC, as the epochs extracted in SQL
+        now = fields.Datetime.now().replace(tzinfo=timezone.utc).timestamp()
+        elapsed = np.where(started_col, now - step_start_col, 0.0)
+        remaining = np.where(open_col, np.maximum(step_mean - elapsed, 0.0), 0.0)
+        remaining_var = np.where(open_col, step_var, 0.0)
+
+        execution_ids, first, index = np.unique(execution_col, return_index=True, return_inverse=True)
+        expected = np.bincount(index, weights=remaining)
+        spread = np.sqrt(np.bincount(index, weights=remaining_var))
+        planned = np.bincount(index, weights=step_mean)
+        if dependencies_col.any():
+            self._apply_critical_paths(
+                dependencies_col[first], index, step_col, remaining, remaining_var, step_mean, expected, spread, planned)
+
+        expected_at = now + expected
+        p90_at = expected_at + Z_P90 * spread
+        delay_hours = (p90_at - (execution_start_col[first] + planned)) / 3600
+
+        self.env.cr.execute("""
+            UPDATE threads_bpm_execution e
+               SET eta_expected_at = to_timestamp(d.expected_at) AT TIME ZONE 'UTC',
+                   eta_p90_at = to_timestamp(d.p90_at) AT TIME ZONE 'UTC',
+                   eta_delay_hours = d.delay_hours
+              FROM unnest(%s::int[], %s::float8[], %s::float8[], %s::float8[])
+                   AS d(id, expected_at, p90_at, delay_hours)
+             WHERE e.id = d.id
+        """, (execution_ids.tolist(), expected_at.tolist(), p90_at.tolist(), np.round(delay_hours, 2).tolist()))
+
+    @api.model
+    def _apply_critical_paths(self, dag_executions, index, step_col, remaining, remaining_var, step_mean,
+                              expected, spread, planned):
+        """Replace the sums of the executions flagged in ``dag_executions`` by their longest dependency path.
+
+        ``index`` maps every step row to its execution; ``expected``, ``spread`` and
+        ``planned`` (one entry per execution) are updated in place.
+        """
+        rows = np.flatnonzero(dag_executions[index])
+        position = {int(step_col[row]): int(row) for row in rows}
+        self.env.cr.execute("""
+            SELECT step_id, depends_on_id FROM threads_bpm_step_dependency_rel WHERE step_id = ANY(%s)
+        """, (list(position),))
+        depends_on = {}
+        dependent = {}
+        for step_id, depends_on_id in self.env.cr.fetchall():
+            if depends_on_id in position:
+                depends_on.setdefault(step_id, []).append(depends_on_id)
+                dependent.setdefault(depends_on_id, []).append(step_id)
+
+        # Kahn's order: every step after its dependencies (cycles are rejected on write)
+        waiting = {step_id: len(depends_on.get(step_id, ())) for step_id in position}
+        ready = [step_id for step_id, count in waiting.items() if not count]
+        finish, finish_var, planned_finish = {}, {}, {}
+        while ready:
+            step_id = ready.pop()
+            row = position[step_id]
+            dependencies = depends_on.get(step_id)
+            if dependencies:
+                critical = max(dependencies, key=finish.__getitem__)
+                start, start_var = finish[critical], finish_var[critical]
+                planned_start = max(planned_finish[dependency] for dependency in dependencies)
+            else:
+                start = start_var = planned_start = 0.0
+            finish[step_id] = start + remaining[row]
+            finish_var[step_id] = start_var + remaining_var[row]
+            planned_finish[step_id] = planned_start + step_mean[row]
+            for next_id in dependent.get(step_id, ()):
+                waiting[next_id] -= 1
+                if not waiting[next_id]:
+                    ready.append(next_id)
+
+        dag_indexes = np.flatnonzero(dag_executions)
+        expected[dag_indexes] = 0.0
+        spread[dag_indexes] = 0.0
+        planned[dag_indexes] = 0.0
+        for step_id, row in position.items():
+            if step_id not in finish:
+                continue
+            execution = index[row]
+            if finish[step_id] > expected[execution]:
+                expected[execution] = finish[step_id]
+                spread[execution] = np.sqrt(finish_var[step_id])
+            planned[execution] = max(planned[execution], planned_finish[step_id])
+
+    @api.model
+    def _cron_refresh(self):
+        # Time moves on for the started steps: refresh every in-progress execution
+        self._refresh()
@@ -1,10 +1,14 @@
 from datetime import timedelta
 from odoo import api, fields, models
-from odoo.exceptions import ValidationError
+from odoo.exceptions import AccessError, ValidationError
+from odoo.tools import str2bool
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# First key of the transaction-level advisory locks taken per execution (second key: execution id)
+EXECUTION_LOCK_KEY = 0x42504D  # "BPM"
+
 
 class ThreadsBPMExecution(models.Model):
     _name = "threads_bpm.execution"
@@ -16,6 +20,10 @@ class ThreadsBPMExecution(models.Model):
     description = fields.Text(string="Descrição")
 
     template_id = fields.Many2one("threads_bpm.template", string="Modelo", required=True, ondelete="restrict")
+    template_version_id = fields.Many2one("threads_bpm.template.version", string="Versão do Modelo",
+                                          readonly=True, ondelete="restrict", index=True)
+    sla_calendar_id = fields.Many2one("resource.calendar", string="Calendário de SLA", readonly=True,
+                                      help="Calendário de trabalho usado nos prazos de SLA (copiado do modelo).")
 
     # Inherited from template
     template_type = fields.Selection(related="template_id.template_type", store=True)
@@ -30,24 +38,48 @@ class ThreadsBPMExecution(models.Model):
     ], default="draft", string="Status")
 
     # Current step
-    current_step_id = fields.Many2one("threads_bpm.step", compute="_compute_current_step", string="Etapa Atual")
+    # Step aggregates below are plain stored columns: SQL deltas when steps are created
+    # or removed (see _apply_step_deltas), a deferred refresh after step transitions
+    # (threads_bpm.execution.refresh); never recomputed on read
+    current_step_id = fields.Many2one("threads_bpm.step", string="Etapa Atual", readonly=True)
 
     # Dates
+    scheduled_for = fields.Datetime(string="Ocorrência", readonly=True, copy=False,
+                                    help="Ocorrência da recorrência do processo que gerou esta execução.")
     started_at = fields.Datetime(string="Iniciada em", readonly=True)
     completed_at = fields.Datetime(string="Concluída em", readonly=True)
 
     # Steps
     step_ids = fields.One2many("threads_bpm.step", "execution_id", string="Etapas")
+    uses_dependencies = fields.Boolean(string="Etapas com Dependências", readonly=True,
+                                       help="As etapas seguem o grafo de dependências do modelo em vez da sequência.")
 
     # SLA and risk tracking
-    has_overdue_steps = fields.Boolean(compute="_compute_risk_status", string="Tem Etapas Atrasadas")
-    has_at_risk_steps = fields.Boolean(compute="_compute_risk_status", string="Tem Etapas em Risco")
+    has_overdue_steps = fields.Boolean(compute="_compute_risk_status", store=True, index=True,
+                                       string="Tem Etapas Atrasadas")
+    has_at_risk_steps = fields.Boolean(compute="_compute_risk_status", store=True, index=True,
+                                       string="Tem Etapas em Risco")
 
     # Progress
-    progress_percentage = fields.Float(compute="_compute_progress", string="Progresso (%)")
+    total_step_count = fields.Integer(string="Etapas", readonly=True, default=0)
+    completed_step_count = fields.Integer(string="Etapas Concluídas", readonly=True, default=0)
+    progress_percentage = fields.Float(string="Progresso (%)", readonly=True, default=0.0)
+
+    # Completion prediction: plain stored columns written in bulk by threads_bpm.eta
+    eta_expected_at = fields.Datetime(string="Conclusão Prevista", readonly=True, copy=False)
+    eta_p90_at = fields.Datetime(string="Conclusão Prevista (P90)", readonly=True, copy=False)
+    eta_delay_hours = fields.Float(string="Atraso Previsto (h)", readonly=True, copy=False,
+                                   help="Quanto a previsão P90 excede a duração histórica típica das etapas da execução.")
+
+    # Optimistic concurrency: bumped in SQL by execution transitions and counter refreshes
+    lock_version = fields.Integer(string="Versão", readonly=True, copy=False, default=0)
 
     # Participants (all users involved)
-    participant_ids = fields.Many2many("res.users", compute="_compute_participants", string="Participantes")
+    # Stored so that "my executions" is an indexed lookup on the relation table;
+    # kept up to date by the ORM whenever step assignees or the creator change
+    participant_ids = fields.Many2many("res.users", relation="threads_bpm_execution_participant_rel",
+                                       column1="execution_id", column2="user_id",
+                                       compute="_compute_participants", store=True, string="Participantes")
 
     # Creator
     creator_id = fields.Many2one("res.users", string="Criador", default=lambda self: self.env.user, readonly=True)
@@ -55,48 +87,153 @@ class ThreadsBPMExecution(models.Model):
     # Logs
     log_ids = fields.One2many("threads_bpm.log", "execution_id", string="Histórico")
 
+    # Keyset pagination of the dashboard buckets follows _order
+    _create_date_id_idx = models.Index("(create_date DESC, id DESC)")
+    # Dashboard sort by predicted lateness
+    _eta_delay_idx = models.Index("(eta_delay_hours DESC) WHERE state = 'in_progress'")
+    # One execution per recurrence occurrence
+    _template_occurrence_uniq = models.UniqueIndex("(template_id, scheduled_for) WHERE scheduled_for IS NOT NULL")
+
     @api.model_create_multi
     def create(self, vals_list):
+        # Pin every new execution to the template's current compiled version
+        Template = self.env['threads_bpm.template']
+        for vals in vals_list:
+            if vals.get('template_id') and not vals.get('template_version_id'):
+                template = Template.browse(vals['template_id'])
+                vals['template_version_id'] = template._get_current_version().id
+                vals.setdefault('sla_calendar_id', template.resource_calendar_id.id)
         records = super().create(vals_list)
-        for rec in records:
-            rec._initialize_steps()
-            rec._log_action("created", "Execução criada")
+        if self.env.context.get('threads_bpm_restore'):
+            # Restored from the archive: steps and log come from the snapshot
+            return records
+        records._initialize_steps()
+        records._log_action("created", "Execução criada")
         return records
 
-    def _initialize_steps(self):
-        """Create steps from template"""
-        self.ensure_one()
-        if not self.template_id:
+    def write(self, vals):
+        res = super().write(vals)
+        if 'state' in vals:
+            self._bump_lock_version()
+        return res
+
+    def _bump_lock_version(self):
+        if not self:
             return
+        self.env.cr.execute(
+            "UPDATE threads_bpm_execution SET lock_version = lock_version + 1 WHERE id = ANY(%s)",
+            (self.ids,),
+        )
+        self.invalidate_recordset(['lock_version'])
 
-        # Create steps from template
-        for template_step in self.template_id.step_ids:
-            step_vals = {
-                'execution_id': self.id,
-                'name': template_step.name,
-                'sequence': template_step.sequence,
-                'user_ids': [(6, 0, template_step.user_ids.ids)],
-                'sla_enabled': template_step.sla_enabled,
-                'sla_hours': template_step.sla_hours,
-                'sla_days': template_step.sla_days,
-                'is_required': template_step.is_required,
-            }
-            new_step = self.env['threads_bpm.step'].create(step_vals)
-
-            # Create checklist items
-            for checklist_item in template_step.checklist_ids:
-                self.env['threads_bpm.checklist'].create({
-                    'step_id': new_step.id,
-                    'name': checklist_item.name,
-                    'sequence': checklist_item.sequence,
-                    'is_required': checklist_item.is_required,
+    def _lock_for_update(self):
+        """Serialize the execution-level transitions (start, complete, cancel) on self.
+
+        One advisory lock per execution, taken in id order so that transitions spanning
+        several executions cannot deadlock, then a row lock. Step transitions never
+        take it: they do not write the execution row (see threads_bpm.execution.refresh).
+        """
+        ids = sorted(set(self.ids))
+        if not ids:
+            return
+        self.env.cr.execute(
+            "SELECT pg_advisory_xact_lock(%s, id) FROM unnest(%s::int[]) AS id",
+            (EXECUTION_LOCK_KEY, ids),
+        )
+        self.env.cr.execute(
+            "SELECT id FROM threads_bpm_execution WHERE id = ANY(%s) ORDER BY id FOR NO KEY UPDATE",
+            (ids,),
+        )
+
+    @api.model
+    def create_executions(self, template_id, count, vals=None):
+        """Create ``count`` executions of a template in one batch (steps and checklists included)"""
+        template = self.env['threads_bpm.template'].browse(int(template_id)).exists()
+        if not template:
+            raise ValidationError("Modelo não encontrado.")
+        if count < 1:
+            return self.browse()
+
+        base_vals = {'name': template.name, 'template_id': template.id}
+        base_vals.update(vals or {})
+        vals_list = []
+        for index in range(count):
+            execution_vals = dict(base_vals)
+            if count > 1:
+                execution_vals['name'] = '%s #%s' % (base_vals['name'], index + 1)
+            vals_list.append(execution_vals)
+        return self.create(vals_list)
+
+    def _initialize_steps(self):
+        """Create steps from the pinned template version.
+
+        The plan comes from the per-worker cache of the immutable version, so no
+        template relation is read. All steps of all executions in ``self`` are
+        inserted with a single multi-create, followed by a single multi-create
+        for their checklist items and a single INSERT of their dependency edges.
+        """
+        Version = self.env['threads_bpm.template.version']
+        step_vals_list = []
+        plan_steps = []
+        for execution in self.filtered('template_version_id'):
+            for plan_step in Version._get_plan(execution.template_version_id.id):
+                step_vals_list.append({
+                    'execution_id': execution.id,
+                    'template_step_id': plan_step['key'],
+                    'name': plan_step['name'],
+                    'sequence': plan_step['sequence'],
+                    'user_ids': [(6, 0, plan_step['user_ids'])],
+                    'sla_enabled': plan_step['sla_enabled'],
+                    'sla_hours': plan_step['sla_hours'],
+                    'sla_days': plan_step['sla_days'],
+                    'is_required': plan_step['is_required'],
+                    'blocking_count': len(plan_step.get('depends_on', [])),
                 })
+                plan_steps.append(plan_step)
 
-    @api.depends("step_ids", "step_ids.state")
-    def _compute_current_step(self):
-        for rec in self:
-            pending_steps = rec.step_ids.filtered(lambda s: s.state in ['pending', 'in_progress'])
-            rec.current_step_id = pending_steps.sorted('sequence')[:1] if pending_steps else False
+        if not step_vals_list:
+            return
+
+        # Template steps deleted after compilation lose their back-reference
+        keys = {vals['template_step_id'] for vals in step_vals_list}
+        existing_keys = set(self.env['threads_bpm.step'].browse(keys).exists().ids)
+        for vals in step_vals_list:
+            if vals['template_step_id'] not in existing_keys:
+                vals['template_step_id'] = False
+
+        new_steps = self.env['threads_bpm.step'].create(step_vals_list)
+
+        # Create checklist items
+        checklist_vals_list = [
+            {
+                'step_id': new_step.id,
+                'name': name,
+                'sequence': sequence,
+                'is_required': is_required,
+            }
+            for new_step, plan_step in zip(new_steps, plan_steps)
+            for name, sequence, is_required in plan_step['checklist']
+        ]
+        if checklist_vals_list:
+            self.env['threads_bpm.checklist'].create(checklist_vals_list)
+
+        # Copy the dependency edges, mapping template step keys to the new steps
+        new_step_ids = {}
+        for new_step, plan_step in zip(new_steps, plan_steps):
+            new_step_ids[new_step.execution_id.id, plan_step['key']] = new_step.id
+        edges = [
+            (new_step.id, new_step_ids[new_step.execution_id.id, key])
+            for new_step, plan_step in zip(new_steps, plan_steps)
+            for key in plan_step.get('depends_on', [])
+        ]
+        if edges:
+            self.env.cr.execute("""
+                INSERT INTO threads_bpm_step_dependency_rel (step_id, depends_on_id)
+                SELECT * FROM unnest(%s::int[], %s::int[])
+            """, ([edge[0] for edge in edges], [edge[1] for edge in edges]))
+            new_steps.invalidate_recordset(['depends_on_ids', 'dependent_ids'])
+            dag_steps = self.env['threads_bpm.step'].browse({edge[0] for edge in edges})
+            dag_steps.execution_id.write({'uses_dependencies': True})
 
     @api.depends("step_ids", "step_ids.is_overdue", "step_ids.is_at_risk")
     def _compute_risk_status(self):
@@ -104,16 +241,101 @@ class ThreadsBPMExecution(models.Model):
             rec.has_overdue_steps = any(rec.step_ids.mapped('is_overdue'))
             rec.has_at_risk_steps = any(rec.step_ids.mapped('is_at_risk'))
 
-    @api.depends("step_ids", "step_ids.state")
-    def _compute_progress(self):
-        for rec in self:
-            if not rec.step_ids:
-                rec.progress_percentage = 0.0
-                continue
+    _STEP_AGGREGATE_FIELDS = ['total_step_count', 'completed_step_count', 'progress_percentage', 'current_step_id',
+                              'lock_version']
+
+    # Current step: first open step by (sequence, id), as the step _order
+    _CURRENT_STEP_SQL = """
+        (SELECT s.id FROM threads_bpm_step s
+          WHERE s.execution_id = e.id AND s.state IN ('pending', 'in_progress')
+       ORDER BY s.sequence, s.id
+          LIMIT 1)
+    """
+
+    @api.model
+    def _apply_step_deltas(self, deltas):
+        """Apply step count deltas {execution_id: [total_delta, completed_delta]} in one UPDATE.
+
+        The current step of every listed execution is re-resolved at the same time
+        (one indexed lookup each), so pass a [0, 0] delta for executions whose
+        steps only changed order or open state.
+        """
+        if not deltas:
+            return
+        ids = list(deltas)
+        self.env.cr.execute("""
+            UPDATE threads_bpm_execution e
+               SET total_step_count = e.total_step_count + d.total_delta,
+                   completed_step_count = e.completed_step_count + d.completed_delta,
+                   progress_percentage = CASE WHEN e.total_step_count + d.total_delta > 0
+                       THEN 100.0 * (e.completed_step_count + d.completed_delta) / (e.total_step_count + d.total_delta)
+                       ELSE 0.0 END,
+                   current_step_id = {current_step},
+                   lock_version = e.lock_version + 1
+              FROM unnest(%s::int[], %s::int[], %s::int[]) AS d(id, total_delta, completed_delta)
+             WHERE e.id = d.id
+        """.format(current_step=self._CURRENT_STEP_SQL),
+            (ids, [deltas[i][0] for i in ids], [deltas[i][1] for i in ids]))
+        executions = self.browse(ids)
+        executions.invalidate_recordset(self._STEP_AGGREGATE_FIELDS)
+        executions.modified(self._STEP_AGGREGATE_FIELDS)
+
+    def _update_step_aggregates_sql(self, scope=""):
+        """Recompute the step aggregates of the executions matching ``scope`` from their steps.
+
+        Returns the ids of the executions whose aggregates changed.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE threads_bpm_execution e
+               SET total_step_count = agg.total,
+                   completed_step_count = agg.completed,
+                   progress_percentage = agg.progress,
+                   current_step_id = agg.current_step_id,
+                   lock_version = e.lock_version + 1
+              FROM (
+                    SELECT x.id,
+                           COUNT(s.id) AS total,
+                           COUNT(s.id) FILTER (WHERE s.state IN ('completed', 'skipped')) AS completed,
+                           CASE WHEN COUNT(s.id) > 0
+                                THEN 100.0 * COUNT(s.id) FILTER (WHERE s.state IN ('completed', 'skipped')) / COUNT(s.id)
+                                ELSE 0.0 END::float8 AS progress,
+                           (ARRAY_AGG(s.id ORDER BY s.sequence, s.id)
+                               FILTER (WHERE s.state IN ('pending', 'in_progress')))[1] AS current_step_id
+                      FROM threads_bpm_execution x
+                 LEFT JOIN threads_bpm_step s ON s.execution_id = x.id
+                     WHERE TRUE {scope}
+                  GROUP BY x.id
+                   ) agg
+             WHERE e.id = agg.id
+               AND (e.total_step_count IS DISTINCT FROM agg.total
+                    OR e.completed_step_count IS DISTINCT FROM agg.completed
+                    OR e.progress_percentage IS DISTINCT FROM agg.progress
+                    OR e.current_step_id IS DISTINCT FROM agg.current_step_id)
+         RETURNING e.id
+        """.format(scope=scope), {'ids': self.ids})
+        changed = [row[0] for row in self.env.cr.fetchall()]
+        if changed:
+            executions = self.browse(changed)
+            executions.invalidate_recordset(self._STEP_AGGREGATE_FIELDS)
+            executions.modified(self._STEP_AGGREGATE_FIELDS)
+        return changed
+
+    def _refresh_step_aggregates(self):
+        """Fold the step transitions of self into their aggregates (refresh queue)"""
+        if not self:
+            return []
+        return self._update_step_aggregates_sql("AND x.id = ANY(%(ids)s)")
 
-            total_steps = len(rec.step_ids)
-            completed_steps = len(rec.step_ids.filtered(lambda s: s.state in ['completed', 'skipped']))
-            rec.progress_percentage = (completed_steps / total_steps) * 100
+    @api.model
+    def _rebuild_step_aggregates(self):
+        """Recompute every step aggregate from scratch in one pass; return the drifted execution ids"""
+        # a pending refresh is not a drift
+        self.env['threads_bpm.execution.refresh']._process()
+        drifted = self.browse()._update_step_aggregates_sql()
+        if drifted:
+            _logger.warning("Threads BPM: rebuilt step aggregates of %s executions", len(drifted))
+        return drifted
 
     @api.depends("step_ids", "step_ids.user_ids", "creator_id")
     def _compute_participants(self):
@@ -124,26 +346,40 @@ class ThreadsBPMExecution(models.Model):
             rec.participant_ids = participants
 
     def action_start_execution(self):
-        """Start the execution"""
-        self.ensure_one()
-        if self.state == 'draft':
-            self.write({
-                'state': 'in_progress',
-                'started_at': fields.Datetime.now()
-            })
-            self._log_action("started", "Execução iniciada")
+        """Start the draft executions in self (their first steps and tasks in one batch)"""
+        self._lock_for_update()
+        executions = self.filtered(lambda e: e.state == 'draft')
+        if not executions:
+            return
+        executions.write({
+            'state': 'in_progress',
+            'started_at': fields.Datetime.now()
+        })
+        executions._log_action("started", "Execução iniciada")
+
+        # Start the first step, or every unblocked step of a dependency graph
+        first_steps = self.env['threads_bpm.step']
+        for execution in executions:
+            if execution.uses_dependencies:
+                first_steps |= execution.step_ids.filtered(lambda s: s.state == 'pending' and not s.blocking_count)
+            else:
+                first_steps |= execution.step_ids.sorted('sequence')[:1]
+        first_steps.action_start_step()
 
-            # Start first step if exists
-            first_step = self.step_ids.sorted('sequence')[:1]
-            if first_step:
-                first_step.action_start_step()
+        self.env['threads_bpm.eta']._refresh(executions)
 
-            # Notify participants
-            self._notify_participants("execution_started")
+        # Deadlines are now known: wake the SLA scheduler at the first threshold
+        if executions.step_ids:
+            executions.step_ids._schedule_sla_reminders()
+
+        # Notify participants
+        for execution in executions:
+            execution._notify_participants("execution_started")
 
     def action_complete_execution(self):
         """Complete the execution"""
         self.ensure_one()
+        self._lock_for_update()
         if self.state == 'in_progress':
             # Check if all required steps are completed
             required_steps = self.step_ids.filtered(lambda s: s.is_required)
@@ -161,29 +397,26 @@ class ThreadsBPMExecution(models.Model):
     def action_cancel_execution(self):
         """Cancel the execution"""
         self.ensure_one()
+        self._lock_for_update()
         self.write({'state': 'cancelled'})
         self._log_action("cancelled", "Execução cancelada")
 
     def _check_completion(self):
-        """Check if execution is complete and auto-complete if needed"""
-        self.ensure_one()
-        if self.state != 'in_progress':
-            return
-
-        # Check if all steps are completed or skipped
-        incomplete_steps = self.step_ids.filtered(lambda s: s.state not in ['completed', 'skipped'])
-        if not incomplete_steps:
-            self.action_complete_execution()
+        """Auto-complete the in-progress executions whose steps are all completed or skipped"""
+        for execution in self:
+            if execution.state == 'in_progress' and execution.completed_step_count >= execution.total_step_count:
+                execution.action_complete_execution()
 
     def _log_action(self, action, detail=""):
-        """Log an action"""
-        self.ensure_one()
-        self.env['threads_bpm.log'].sudo().create({
-            'execution_id': self.id,
+        """Log an action (one row per execution in self, in a single create)"""
+        if not self:
+            return
+        self.env['threads_bpm.log'].sudo().create([{
+            'execution_id': rec.id,
             'user_id': self.env.user.id,
             'action': action,
             'detail': detail,
-        })
+        } for rec in self])
 
     def _notify_participants(self, notification_type):
         """Send notifications to all participants"""
@@ -205,163 +438,362 @@ class ThreadsBPMExecution(models.Model):
 
         msg = messages[notification_type]
 
-        # Send to all participants
-        for user in self.participant_ids:
-            if user == self.env.user:  # Don't notify the current user
-                continue
-
-            partner = user.partner_id
-
-            # Toast notification
-            self.env["bus.bus"]._sendone(
-                partner,
-                "simple_notification",
-                {
-                    "type": "info",
-                    "title": msg["title"],
-                    "message": msg["body"],
-                    "sticky": True
-                },
-            )
-
-            # Discuss chat message
-            try:
-                channel = self.env["discuss.channel"].with_user(self.env.ref("base.user_admin"))._get_or_create_chat(
-                    partners_to=[partner.id],
-                    pin=True,
-                )
-                channel.message_post(
-                    body="%s\n\n<a href=\"/web#id=%s&model=threads_bpm.execution&view_type=form\" target=\"_blank\">Abrir Execução</a>" % (msg["body"], self.id),
-                    message_type="comment",
-                    subtype_xmlid="mail.mt_comment",
-                    partner_ids=[partner.id],
-                )
-            except Exception as e:
-                _logger.warning("Failed to send chat notification to user %s: %s", user.name, str(e))
+        # Toast + DM to all participants, delivered after commit by the notification outbox
+        self.env["notify.outbox"]._enqueue([{
+            "partner_id": user.partner_id.id,
+            "title": msg["title"],
+            "message": msg["body"],
+            "toast_type": "info",
+            "sticky": True,
+            "chat_body": "%s\n\n<a href=\"/web#id=%s&model=threads_bpm.execution&view_type=form\" target=\"_blank\">Abrir Execução</a>" % (msg["body"], self.id),
+        } for user in self.participant_ids if user != self.env.user])  # Don't notify the current user
+
+    # Dashboard buckets: SQL expression over threads_bpm_execution "e"
+    _DASHBOARD_BUCKET_SQL = """
+        CASE WHEN e.state = 'completed' THEN 'completed'
+             WHEN e.has_overdue_steps THEN 'overdue'
+             WHEN e.has_at_risk_steps THEN 'at_risk'
+             ELSE 'on_track'
+        END
+    """
+    _DASHBOARD_BUCKETS = ('on_track', 'at_risk', 'overdue', 'completed')
+    # Largest page a dashboard client may request
+    _DASHBOARD_MAX_LIMIT = 100
+    _DASHBOARD_FIELDS = [
+        'id', 'name', 'state', 'template_type', 'business_unit',
+        'started_at', 'completed_at', 'has_overdue_steps', 'has_at_risk_steps',
+        'progress_percentage', 'current_step_id', 'eta_expected_at', 'eta_p90_at', 'eta_delay_hours',
+    ]
+
+    def _dashboard_limit(self, limit):
+        return max(1, min(int(limit or 0), self._DASHBOARD_MAX_LIMIT))
+
+    def _dashboard_user_id(self, user_id):
+        if user_id is None or user_id == self.env.uid:
+            return self.env.uid
+        if not self.env.user.has_group('threads_bpm.threads_bpm_group_manager'):
+            raise AccessError("Você só pode consultar o seu próprio painel.")
+        return int(user_id)
+
+    def _dashboard_scope_sql(self):
+        """Executions the user created or participates in (indexed lookups only)"""
+        return """
+            SELECT e.id, e.create_date, {bucket} AS bucket
+              FROM threads_bpm_execution e
+             WHERE e.id IN (
+                    SELECT id FROM threads_bpm_execution WHERE creator_id = %(uid)s
+                     UNION
+                    SELECT execution_id FROM threads_bpm_execution_participant_rel WHERE user_id = %(uid)s
+               )
+        """.format(bucket=self._DASHBOARD_BUCKET_SQL)
 
     @api.model
-    def get_user_executions(self, user_id=None):
-        """Get executions for a specific user (dashboard data)"""
-        if user_id is None:
-            user_id = self.env.user.id
-
-        domain = [
-            '|', '|',
-            ('creator_id', '=', user_id),  # Created by user
-            ('step_ids.user_ids', 'in', [user_id]),  # Assigned to user
-            ('participant_ids', 'in', [user_id])  # Involved in execution
-        ]
-
-        executions = self.search_read(domain, [
-            'id', 'name', 'state', 'template_type', 'business_unit',
-            'started_at', 'completed_at', 'has_overdue_steps', 'has_at_risk_steps',
-            'progress_percentage', 'current_step_id'
-        ], limit=50)
-
-        # Categorize by status
-        result = {
-            'on_track': [],
-            'at_risk': [],
-            'overdue': [],
-            'completed': []
-        }
-
-        for exec_data in executions:
-            if exec_data['state'] == 'completed':
-                result['completed'].append(exec_data)
-            elif exec_data['has_overdue_steps']:
-                result['overdue'].append(exec_data)
-            elif exec_data['has_at_risk_steps']:
-                result['at_risk'].append(exec_data)
-            else:
-                result['on_track'].append(exec_data)
+    def get_user_executions(self, user_id=None, limit=20):
+        """Get executions for a specific user (dashboard data).
+
+        Returns the per-bucket counts plus the first page of every bucket, from two
+        queries. Further pages come from get_user_executions_page with the
+        returned keyset cursors.
+        """
+        uid = self._dashboard_user_id(user_id)
+        limit = self._dashboard_limit(limit)
+        scope = self._dashboard_scope_sql()
+
+        self.env.cr.execute("""
+            SELECT scope.bucket, COUNT(*) FROM ({}) scope GROUP BY scope.bucket
+        """.format(scope), {'uid': uid})
+        counts = dict.fromkeys(self._DASHBOARD_BUCKETS, 0)
+        counts.update(dict(self.env.cr.fetchall()))
+
+        self.env.cr.execute("""
+            SELECT ranked.bucket, ranked.id, ranked.create_date
+              FROM (
+                    SELECT scope.*, ROW_NUMBER() OVER (
+                               PARTITION BY scope.bucket ORDER BY scope.create_date DESC, scope.id DESC
+                           ) AS position
+                      FROM ({}) scope
+                   ) ranked
+             WHERE ranked.position <= %(limit)s
+          ORDER BY ranked.create_date DESC, ranked.id DESC
+        """.format(scope), {'uid': uid, 'limit': limit})
+        rows = self.env.cr.fetchall()
+
+        result = self._dashboard_pages(rows, {bucket for bucket, count in counts.items() if count > limit})
+        result['counts'] = counts
+        return result
 
+    @api.model
+    def get_user_executions_page(self, bucket, cursor=None, limit=20, user_id=None):
+        """Next page of one dashboard bucket, after ``cursor`` = [create_date, id]"""
+        if bucket not in self._DASHBOARD_BUCKETS:
+            raise ValidationError("Categoria inválida: %s" % bucket)
+        uid = self._dashboard_user_id(user_id)
+        limit = self._dashboard_limit(limit)
+        # one extra row tells whether another page follows
+        params = {'uid': uid, 'bucket': bucket, 'limit': limit + 1}
+        keyset = ""
+        if cursor:
+            keyset = "AND (scope.create_date, scope.id) < (%(cursor_date)s::timestamp, %(cursor_id)s)"
+            params.update(cursor_date=cursor[0], cursor_id=cursor[1])
+        self.env.cr.execute("""
+            SELECT scope.bucket, scope.id, scope.create_date
+              FROM ({}) scope
+             WHERE scope.bucket = %(bucket)s {}
+          ORDER BY scope.create_date DESC, scope.id DESC
+             LIMIT %(limit)s
+        """.format(self._dashboard_scope_sql(), keyset), params)
+        rows = self.env.cr.fetchall()
+        page = self._dashboard_pages(rows[:limit], {bucket} if len(rows) > limit else set())
+        return {'records': page[bucket], 'cursor': page['cursors'].get(bucket)}
+
+    def _dashboard_pages(self, rows, more_buckets):
+        """Read display fields for the page rows and split them by bucket.
+
+        Only the buckets in ``more_buckets`` (with rows after this page) get a cursor.
+        """
+        records = {rec['id']: rec for rec in self.browse([row[1] for row in rows]).read(self._DASHBOARD_FIELDS)}
+        result = {bucket: [] for bucket in self._DASHBOARD_BUCKETS}
+        last = {}
+        for bucket, execution_id, create_date in rows:
+            if execution_id in records:
+                result[bucket].append(records[execution_id])
+            # full precision: executions created in one transaction share their create_date
+            last[bucket] = [create_date.isoformat(), execution_id]
+        result['cursors'] = {bucket: last[bucket] for bucket in last if bucket in more_buckets}
         return result
 
     @api.model
     def _cron_auto_recreate_processes(self):
-        """Auto-recreate recurring processes"""
-        now = fields.Datetime.now()
-
-        # Find active process templates with auto-recreate enabled
-        templates = self.env['threads_bpm.template'].search([
-            ('template_type', '=', 'process'),
-            ('active', '=', True),
-            ('auto_recreate', '=', True)
-        ])
-
-        for template in templates:
-            # Check if we need to create a new execution
-            last_execution = self.search([
-                ('template_id', '=', template.id)
-            ], order='create_date desc', limit=1)
-
-            if not last_execution:
-                # No executions yet, create first one
-                self._create_auto_execution(template)
-                continue
-
-            # Calculate next execution date
-            interval_delta = self._get_interval_delta(template)
-            next_execution_date = last_execution.create_date + interval_delta
-
-            if now >= next_execution_date:
-                self._create_auto_execution(template)
-
-    def _get_interval_delta(self, template):
-        """Get timedelta for auto-recreation interval"""
-        amount = template.recreate_interval or 1
-        unit = template.recreate_unit or 'days'
-
-        if unit == 'days':
-            return timedelta(days=amount)
-        elif unit == 'weeks':
-            return timedelta(weeks=amount)
-        elif unit == 'months':
-            return timedelta(days=amount * 30)  # Approximation
-        else:
-            return timedelta(days=amount)
-
-    def _create_auto_execution(self, template):
-        """Create an automatic execution for a recurring process"""
-        execution = self.create({
-            'name': '%s - %s' % (template.name, fields.Date.today().strftime('%Y-%m-%d')),
+        """Create the executions of every recurring process that is due, missed occurrences included.
+
+        Cost depends on the number of due templates only: they are selected on the
+        indexed next_run_at and processed in committed chunks through cron.runner.
+        """
+        return self.env['cron.runner']._run_search(
+            'threads_bpm.auto_recreate_processes',
+            'threads_bpm.template',
+            lambda run_at: [
+                ('auto_recreate', '=', True),
+                ('active', '=', True),
+                ('template_type', '=', 'process'),
+                ('next_run_at', '<=', run_at),
+            ],
+            self._create_recurring_executions,
+            cron_xmlid='threads_bpm.ir_cron_threads_bpm_auto_recreate',
+        )
+
+    @api.model
+    def _create_recurring_executions(self, templates, now):
+        """Instantiate every occurrence of ``templates`` due at ``now`` in one batch"""
+        due = templates._get_missed_occurrences(now)
+
+        # Occurrences already instantiated (e.g. a run interrupted after its commit)
+        self.env.cr.execute("""
+            SELECT template_id, scheduled_for
+              FROM threads_bpm_execution
+             WHERE template_id = ANY(%s) AND scheduled_for IS NOT NULL
+        """, (templates.ids,))
+        existing = set(self.env.cr.fetchall())
+
+        vals_list = [{
+            'name': '%s - %s' % (template.name, occurrence.strftime('%Y-%m-%d')),
             'template_id': template.id,
-            'state': 'in_progress',
-            'started_at': fields.Datetime.now(),
-        })
+            'scheduled_for': occurrence,
+        } for template, occurrences in due.items()
+            for occurrence in occurrences
+            if (template.id, occurrence) not in existing]
+
+        executions = self.create(vals_list)
+        executions.action_start_execution()
+        templates._schedule_next_run(after=now, inclusive=False)
+        _logger.info("Threads BPM: auto-created %s executions for %s recurring templates",
+                     len(executions), len(templates))
+        return executions
+
+    # Pending SLA reminders: (step, assignee, threshold) crossed and not yet sent.
+    # {scope} narrows the steps considered.
+    _SLA_DUE_SQL = """
+        SELECT due.step_id, due.user_id, due.threshold
+          FROM (
+                SELECT s.id AS step_id, rel.user_id,
+                       CASE WHEN s.sla_deadline < %(now)s THEN 'overdue' ELSE 'at_risk' END AS threshold
+                  FROM threads_bpm_step s
+                  JOIN threads_bpm_execution e ON e.id = s.execution_id AND e.state = 'in_progress'
+                  JOIN threads_bpm_step_user_rel rel ON rel.step_id = s.id
+                 WHERE s.completed_at IS NULL
+                   AND s.sla_deadline IS NOT NULL
+                   AND s.sla_deadline < %(horizon)s
+                   AND s.state IN ('pending', 'in_progress')
+                   AND rel.user_id != %(uid)s
+                   {scope}
+               ) due
+         WHERE NOT EXISTS (
+                SELECT 1 FROM threads_bpm_sla_notification n
+                 WHERE n.step_id = due.step_id AND n.user_id = due.user_id AND n.threshold = due.threshold
+               )
+    """
 
-        # Auto-start the execution
-        execution.action_start_execution()
+    @api.model
+    def _cron_sla_reminders(self):
+        """Send SLA reminders for overdue and at-risk steps.
+
+        Each threshold (24h before the deadline, and the deadline itself) fires
+        once per step and assignee: sent notifications are recorded in
+        threads_bpm.sla.notification. The work done is proportional to the
+        thresholds crossed since the last run, processed by step in committed
+        chunks (cron.runner); once a pass is complete the cron is re-triggered
+        for the next upcoming threshold.
+        """
+        # Bring stored SLA flags up to date before selecting on them
+        self.env['threads_bpm.step']._cron_sla_transitions()
+
+        def fetch(after_id, run_at, limit):
+            self.env.cr.execute("""
+                SELECT DISTINCT pending.step_id
+                  FROM ({}) pending
+              ORDER BY pending.step_id
+                 LIMIT %(limit)s
+            """.format(self._SLA_DUE_SQL.format(scope="AND s.id > %(after_id)s")),
+                dict(self._sla_due_params(run_at), after_id=after_id, limit=limit))
+            return self.env['threads_bpm.step'].browse([row[0] for row in self.env.cr.fetchall()])
+
+        metrics = self.env['cron.runner']._run_chunked(
+            'threads_bpm.sla_reminders',
+            fetch,
+            self._send_sla_reminders,
+            cron_xmlid='threads_bpm.ir_cron_threads_bpm_sla_reminders',
+        )
+        if metrics['finished']:
+            self.env['threads_bpm.step']._schedule_sla_reminders()
+        return metrics
 
-        _logger.info("Auto-created execution %s for template %s", execution.name, template.name)
+    def _sla_due_params(self, now):
+        return {'now': now, 'horizon': now + timedelta(hours=24), 'uid': self.env.uid}
 
     @api.model
-    def _cron_sla_reminders(self):
-        """Send SLA reminders for overdue and at-risk steps"""
-        now = fields.Datetime.now()
+    def _send_sla_reminders(self, steps, now):
+        """Record and send the pending reminders of ``steps``"""
+        self.env.cr.execute(
+            self._SLA_DUE_SQL.format(scope="AND s.id = ANY(%(step_ids)s)") + " ORDER BY due.step_id, due.user_id",
+            dict(self._sla_due_params(now), step_ids=steps.ids),
+        )
+        due = self.env.cr.fetchall()
+        if not due:
+            return
 
-        # Find executions with overdue or at-risk steps
-        executions = self.search([
-            ('state', '=', 'in_progress'),
-            '|', ('has_overdue_steps', '=', True), ('has_at_risk_steps', '=', True)
-        ])
+        # Alerts that do not bypass the digest are only recorded; _cron_sla_digests sends them
+        immediate = self._get_sla_immediate_thresholds()
+        self.env['threads_bpm.sla.notification'].sudo().create([{
+            'step_id': step_id,
+            'user_id': user_id,
+            'threshold': threshold,
+            'state': 'sent' if threshold in immediate else 'pending',
+            'sent_at': now if threshold in immediate else False,
+        } for step_id, user_id, threshold in due])
+
+        due = [row for row in due if row[2] in immediate]
+        steps = self.env['threads_bpm.step'].browse([row[0] for row in due])
+        users = self.env['res.users'].browse([row[1] for row in due])
+        for step, user, (_step_id, _user_id, threshold) in zip(steps, users, due):
+            self._notify_step_sla(user, step, threshold)
 
-        for execution in executions:
-            overdue_steps = execution.step_ids.filtered(lambda s: s.is_overdue and not s.completed_at)
-            at_risk_steps = execution.step_ids.filtered(lambda s: s.is_at_risk and not s.completed_at)
+    @api.model
+    def _get_sla_immediate_thresholds(self):
+        """SLA thresholds notified right away; the others wait for the user's digest"""
+        params = self.env['ir.config_parameter'].sudo()
+        if not str2bool(params.get_param('threads_bpm.sla_digest', 'False')):
+            return {'at_risk', 'overdue'}
+        if params.get_param('threads_bpm.sla_digest_bypass', 'overdue') == 'none':
+            return set()
+        return {'overdue'}
+
+    @api.model
+    def _cron_sla_digests(self):
+        """Send every user one message with all their pending SLA alerts.
+
+        Alerts that no longer apply (step done, execution closed, at-risk superseded
+        by an overdue alert) are dropped first; users are then processed in chunks,
+        each chunk built from one grouped query over alerts, steps and executions.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE threads_bpm_sla_notification n
+               SET state = 'dropped'
+              FROM threads_bpm_step s
+              JOIN threads_bpm_execution e ON e.id = s.execution_id
+             WHERE n.state = 'pending'
+               AND s.id = n.step_id
+               AND (s.completed_at IS NOT NULL
+                    OR s.state NOT IN ('pending', 'in_progress')
+                    OR e.state != 'in_progress'
+                    OR (n.threshold = 'at_risk' AND EXISTS (
+                            SELECT 1 FROM threads_bpm_sla_notification o
+                             WHERE o.step_id = n.step_id AND o.user_id = n.user_id AND o.threshold = 'overdue')))
+        """)
+        self.env['threads_bpm.sla.notification'].invalidate_model(['state'])
+
+        def fetch(after_id, run_at, limit):
+            self.env.cr.execute("""
+                SELECT DISTINCT user_id
+                  FROM threads_bpm_sla_notification
+                 WHERE state = 'pending' AND user_id > %s
+              ORDER BY user_id
+                 LIMIT %s
+            """, (after_id, limit))
+            return self.env['res.users'].browse([row[0] for row in self.env.cr.fetchall()])
+
+        return self.env['cron.runner']._run_chunked(
+            'threads_bpm.sla_digests',
+            fetch,
+            self._send_sla_digests,
+            cron_xmlid='threads_bpm.ir_cron_threads_bpm_sla_digests',
+        )
 
-            # Notify assignees of overdue steps
-            for step in overdue_steps:
-                for user in step.user_ids:
-                    if user != self.env.user:  # Don't notify current user
-                        self._notify_step_sla(user, step, "overdue")
+    @api.model
+    def _send_sla_digests(self, users, now):
+        self.env.cr.execute("""
+            SELECT n.user_id,
+                   ARRAY_AGG(n.id),
+                   COUNT(*) FILTER (WHERE n.threshold = 'overdue'),
+                   COUNT(*) FILTER (WHERE n.threshold = 'at_risk'),
+                   JSON_AGG(JSON_BUILD_ARRAY(n.threshold, s.name, e.name, e.id, s.sla_deadline)
+                            ORDER BY n.threshold DESC, s.sla_deadline, s.id)
+              FROM threads_bpm_sla_notification n
+              JOIN threads_bpm_step s ON s.id = n.step_id
+              JOIN threads_bpm_execution e ON e.id = s.execution_id
+             WHERE n.state = 'pending' AND n.user_id = ANY(%s)
+          GROUP BY n.user_id
+        """, (users.ids,))
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return
+
+        labels = {'overdue': "Atrasada", 'at_risk': "Em risco"}
+        partners = {user.id: user.partner_id.id for user in self.env['res.users'].browse([row[0] for row in rows])}
+        notifications = []
+        notification_ids = []
+        for user_id, ids, overdue, at_risk, items in rows:
+            summary = "%s etapa(s) atrasada(s) e %s em risco." % (overdue, at_risk)
+            lines = [
+                "- [%s] %s - %s (prazo: %s) <a href=\"/web#id=%s&model=threads_bpm.execution&view_type=form\" target=\"_blank\">Abrir</a>"
+                % (labels[threshold], step_name, execution_name, (deadline or '')[:16].replace('T', ' '), execution_id)
+                for threshold, step_name, execution_name, execution_id, deadline in items
+            ]
+            notifications.append({
+                'partner_id': partners[user_id],
+                'title': "Threads BPM - Resumo de SLA",
+                'message': summary,
+                'toast_type': 'danger' if overdue else 'warning',
+                'sticky': bool(overdue),
+                'chat_body': "Resumo de SLA: %s\n\n%s" % (summary, "\n".join(lines)),
+            })
+            notification_ids += ids
+        self.env['notify.outbox']._enqueue(notifications)
 
-            # Notify assignees of at-risk steps
-            for step in at_risk_steps:
-                for user in step.user_ids:
-                    if user != self.env.user:  # Don't notify current user
-                        self._notify_step_sla(user, step, "at_risk")
+        self.env.cr.execute("""
+            UPDATE threads_bpm_sla_notification SET state = 'sent', sent_at = %s WHERE id = ANY(%s)
+        """, (now, notification_ids))
+        self.env['threads_bpm.sla.notification'].invalidate_model(['state', 'sent_at'])
 
     def _notify_step_sla(self, user, step, sla_type):
         """Send SLA notification for a specific step"""
@@ -382,31 +814,11 @@ class ThreadsBPMExecution(models.Model):
         if not msg:
             return
 
-        partner = user.partner_id
-
-        # Toast notification
-        self.env["bus.bus"]._sendone(
-            partner,
-            "simple_notification",
-            {
-                "type": msg["type"],
-                "title": msg["title"],
-                "message": msg["body"],
-                "sticky": True
-            },
-        )
-
-        # Discuss chat message
-        try:
-            channel = self.env["discuss.channel"].with_user(self.env.ref("base.user_admin"))._get_or_create_chat(
-                partners_to=[partner.id],
-                pin=True,
-            )
-            channel.message_post(
-                body="%s\n\n<a href=\"/web#id=%s&model=threads_bpm.execution&view_type=form\" target=\"_blank\">Abrir Execução</a>" % (msg["body"], step.execution_id.id),
-                message_type="comment",
-                subtype_xmlid="mail.mt_comment",
-                partner_ids=[partner.id],
-            )
-        except Exception as e:
-            _logger.warning("Failed to send SLA chat notification to user %s: %s", user.name, str(e))
+        self.env["notify.outbox"]._enqueue([{
+            "partner_id": user.partner_id.id,
+            "title": msg["title"],
+            "message": msg["body"],
+            "toast_type": msg["type"],
+            "sticky": True,
+            "chat_body": "%s\n\n<a href=\"/web#id=%s&model=threads_bpm.execution&view_type=form\" target=\"_blank\">Abrir Execução</a>" % (msg["body"], step.execution_id.id),
+        }])
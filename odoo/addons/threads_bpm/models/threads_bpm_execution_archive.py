@@ -0,0 +1,319 @@
+import base64
+import json
+import zlib
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 365
+# 2: activities and message attachments
+SNAPSHOT_VERSION = 2
+
+ARCHIVED_STATES = ('completed', 'cancelled')
+EXECUTION_FIELDS = [
+    'name', 'description', 'template_id', 'template_version_id', 'sla_calendar_id', 'state',
+    'scheduled_for', 'started_at', 'completed_at', 'creator_id', 'uses_dependencies',
+]
+STEP_FIELDS = [
+    'name', 'sequence', 'template_step_id', 'state', 'is_required', 'sla_enabled', 'sla_hours',
+    'sla_days', 'started_at', 'completed_at', 'blocking_count', 'task_id',
+]
+CHECKLIST_FIELDS = ['name', 'sequence', 'is_required', 'is_completed', 'completed_at', 'completed_by']
+MESSAGE_FIELDS = ['body', 'subject', 'date', 'author_id', 'email_from', 'message_type', 'subtype_id', 'attachment_ids']
+ACTIVITY_FIELDS = ['activity_type_id', 'summary', 'note', 'date_deadline', 'user_id']
+
+
+def _dump_value(record, name):
+    """JSON-friendly value of a field: ids for relations, strings for dates and datetimes"""
+    field = record._fields[name]
+    value = record[name]
+    if field.type == 'many2one':
+        return value.id or False
+    if field.type in ('one2many', 'many2many'):
+        return value.ids
+    if field.type == 'datetime':
+        return fields.Datetime.to_string(value) if value else False
+    if field.type == 'date':
+        return fields.Date.to_string(value) if value else False
+    if field.type == 'html':
+        return str(value) if value else False
+    return value
+
+
+class ThreadsBPMExecutionArchive(models.Model):
+    """
+    Cold storage of finished executions.
+
+    Each row holds one zlib-compressed JSON snapshot of an execution with its steps,
+    checklist items, audit log, chatter messages, activities and followers, next to
+    the few columns needed to find it again (template, business unit, dates).
+    Attachments keep their files and are moved onto the archive row. Archiving
+    deletes the hot rows with set-based SQL; restoring recreates them on demand.
+    """
+    _name = "threads_bpm.execution.archive"
+    _description = "Threads BPM Archived Execution"
+    _order = "completed_at desc, id desc"
+
+    name = fields.Char(required=True, readonly=True, string="Execução")
+    original_id = fields.Integer(readonly=True, string="ID Original")
+    template_id = fields.Many2one("threads_bpm.template", readonly=True, ondelete="set null", string="Modelo")
+    template_name = fields.Char(readonly=True, string="Nome do Modelo")
+    business_unit = fields.Selection(
+        selection=lambda self: self.env['threads_bpm.template']._fields['business_unit'].selection,
+        readonly=True, string="Unidade de Negócio",
+    )
+    state = fields.Selection([
+        ("completed", "Concluída"),
+        ("cancelled", "Cancelada"),
+    ], readonly=True, string="Status")
+    started_at = fields.Datetime(readonly=True, string="Iniciada em")
+    completed_at = fields.Datetime(readonly=True, string="Concluída em")
+    archived_at = fields.Datetime(readonly=True, default=fields.Datetime.now, string="Arquivada em")
+
+    step_count = fields.Integer(readonly=True, string="Etapas")
+    snapshot = fields.Binary(attachment=False, readonly=True, string="Snapshot")
+    snapshot_size = fields.Integer(readonly=True, string="Tamanho (bytes)")
+    snapshot_preview = fields.Text(compute="_compute_snapshot_preview", string="Conteúdo")
+
+    _template_completed_idx = models.Index("(template_id, completed_at)")
+    _business_unit_completed_idx = models.Index("(business_unit, completed_at)")
+
+    def _compute_snapshot_preview(self):
+        for rec in self:
+            rec.snapshot_preview = json.dumps(rec._load_snapshot(), indent=2, ensure_ascii=False) if rec.snapshot else False
+
+    # ------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------
+
+    @api.model
+    def _pack(self, data):
+        return base64.b64encode(zlib.compress(json.dumps(data, separators=(',', ':')).encode(), 9))
+
+    def _load_snapshot(self):
+        self.ensure_one()
+        return json.loads(zlib.decompress(base64.b64decode(self.snapshot)))
+
+    @api.model
+    def _build_snapshots(self, executions):
+        """Return {execution_id: snapshot dict}; every relation is read once for the whole batch"""
+        model = executions._name
+        messages = self.env['mail.message'].sudo().search(
+            [('model', '=', model), ('res_id', 'in', executions.ids)], order='id')
+        followers = self.env['mail.followers'].sudo().search(
+            [('res_model', '=', model), ('res_id', 'in', executions.ids)])
+        activities = self.env['mail.activity'].sudo().search(
+            [('res_model', '=', model), ('res_id', 'in', executions.ids)], order='id')
+        messages_by_execution = {}
+        for message in messages:
+            messages_by_execution.setdefault(message.res_id, []).append(
+                {name: _dump_value(message, name) for name in MESSAGE_FIELDS})
+        followers_by_execution = {}
+        for follower in followers:
+            followers_by_execution.setdefault(follower.res_id, []).append(follower.partner_id.id)
+        activities_by_execution = {}
+        for activity in activities:
+            activities_by_execution.setdefault(activity.res_id, []).append(
+                {name: _dump_value(activity, name) for name in ACTIVITY_FIELDS})
+
+        snapshots = {}
+        for execution in executions:
+            steps = execution.step_ids
+            snapshots[execution.id] = {
+                'version': SNAPSHOT_VERSION,
+                'execution': {name: _dump_value(execution, name) for name in EXECUTION_FIELDS},
+                'steps': [dict(
+                    {name: _dump_value(step, name) for name in STEP_FIELDS},
+                    id=step.id,
+                    user_ids=step.user_ids.ids,
+                    depends_on=step.depends_on_ids.ids,
+                    checklist=[{name: _dump_value(item, name) for name in CHECKLIST_FIELDS}
+                               for item in step.checklist_ids],
+                ) for step in steps],
+                'logs': [{
+                    'user_id': log.user_id.id,
+                    'timestamp': fields.Datetime.to_string(log.timestamp),
+                    'action': log.action,
+                    'detail': log.detail or False,
+                } for log in execution.log_ids.sorted('id')],
+                'messages': messages_by_execution.get(execution.id, []),
+                'followers': followers_by_execution.get(execution.id, []),
+                'activities': activities_by_execution.get(execution.id, []),
+            }
+        return snapshots
+
+    # ------------------------------------------------------------
+    # Archival
+    # ------------------------------------------------------------
+
+    @api.model
+    def _cron_archive_executions(self):
+        params = self.env['ir.config_parameter'].sudo()
+        retention = int(params.get_param('threads_bpm.archive_retention_days', DEFAULT_RETENTION_DAYS) or 0)
+        if retention <= 0:
+            return
+
+        def domain(run_at):
+            limit = run_at - timedelta(days=retention)
+            return [
+                ('state', 'in', ARCHIVED_STATES),
+                '|', ('completed_at', '<', limit),
+                '&', ('completed_at', '=', False), ('write_date', '<', limit),
+            ]
+
+        return self.env['cron.runner']._run_search(
+            "threads_bpm.archive_executions",
+            self.env['threads_bpm.execution'].sudo(),
+            domain,
+            lambda executions, run_at: self._archive_executions(executions),
+            cron_xmlid="threads_bpm.ir_cron_threads_bpm_archive_executions",
+        )
+
+    @api.model
+    def _archive_executions(self, executions):
+        """Snapshot ``executions`` into the archive and delete their hot rows in bulk"""
+        executions = executions.filtered(lambda e: e.state in ARCHIVED_STATES)
+        if not executions:
+            return self.browse()
+        self.env.flush_all()
+        snapshots = self._build_snapshots(executions)
+        vals_list = []
+        for execution in executions:
+            packed = self._pack(snapshots[execution.id])
+            vals_list.append({
+                'name': execution.name,
+                'original_id': execution.id,
+                'template_id': execution.template_id.id,
+                'template_name': execution.template_id.name,
+                'business_unit': execution.business_unit,
+                'state': execution.state,
+                'started_at': execution.started_at,
+                'completed_at': execution.completed_at or execution.write_date,
+                'step_count': execution.total_step_count,
+                'snapshot': packed,
+                'snapshot_size': len(base64.b64decode(packed)),
+            })
+        archives = self.sudo().create(vals_list)
+
+        # Attachments carry files in the filestore: they move to the archive row, not into the snapshot
+        model = executions._name
+        self.env.cr.execute("""
+            UPDATE ir_attachment a
+               SET res_model = %(archive_model)s, res_id = m.archive_id
+              FROM unnest(%(ids)s::int[], %(archive_ids)s::int[]) AS m(execution_id, archive_id)
+             WHERE a.res_model = %(model)s AND a.res_id = m.execution_id
+        """, {'archive_model': self._name, 'model': model, 'ids': executions.ids, 'archive_ids': archives.ids})
+        # Steps, checklist items, SLA notifications and relation rows follow by FK cascade
+        self.env.cr.execute("""
+            DELETE FROM mail_message WHERE model = %(model)s AND res_id = ANY(%(ids)s);
+            DELETE FROM mail_followers WHERE res_model = %(model)s AND res_id = ANY(%(ids)s);
+            DELETE FROM mail_activity WHERE res_model = %(model)s AND res_id = ANY(%(ids)s);
+            DELETE FROM threads_bpm_log WHERE execution_id = ANY(%(ids)s);
+            DELETE FROM threads_bpm_execution WHERE id = ANY(%(ids)s);
+        """, {'model': model, 'ids': executions.ids})
+        self.env.invalidate_all()
+        _logger.info("Threads BPM: archived %s executions", len(archives))
+        return archives
+
+    # ------------------------------------------------------------
+    # Restore
+    # ------------------------------------------------------------
+
+    def action_restore(self):
+        """Recreate the archived execution in the hot tables and drop the archive row"""
+        self.ensure_one()
+        if not self.template_id:
+            raise UserError("O modelo desta execução foi removido; não é possível restaurá-la.")
+        data = self._load_snapshot()
+        env = self.env
+        # Records referenced by the snapshot may have been deleted since: drop those links
+        existing = {
+            model: set(env[model].browse(ids - {False}).exists().ids)
+            for model, ids in (
+                ('res.users', {uid for step in data['steps'] for uid in step['user_ids']}
+                 | {log['user_id'] for log in data['logs']}
+                 | {activity['user_id'] for activity in data.get('activities', [])}
+                 | {data['execution']['creator_id']}),
+                ('threads_bpm.step', {step['template_step_id'] for step in data['steps'] if step['template_step_id']}),
+                ('project.task', {step['task_id'] for step in data['steps'] if step['task_id']}),
+                ('res.partner', set(data['followers'])
+                 | {message['author_id'] for message in data['messages'] if message['author_id']}),
+                ('ir.attachment', {aid for message in data['messages'] for aid in message.get('attachment_ids', [])}),
+                ('mail.activity.type', {activity['activity_type_id'] for activity in data.get('activities', [])}),
+            )
+        }
+
+        def ref(model, value):
+            return value if value in existing[model] else False
+
+        execution_vals = dict(data['execution'])
+        execution_vals['creator_id'] = ref('res.users', execution_vals['creator_id'])
+        execution_vals['template_id'] = self.template_id.id
+        for name, model in (('template_version_id', 'threads_bpm.template.version'),
+                            ('sla_calendar_id', 'resource.calendar')):
+            if execution_vals[name] and not env[model].browse(execution_vals[name]).exists():
+                execution_vals[name] = False
+        execution = env['threads_bpm.execution'].with_context(
+            threads_bpm_restore=True, mail_create_nolog=True, tracking_disable=True,
+        ).create(execution_vals)
+
+        step_vals_list = []
+        for step in data['steps']:
+            vals = {name: step[name] for name in STEP_FIELDS}
+            vals.update({
+                'execution_id': execution.id,
+                'template_step_id': ref('threads_bpm.step', step['template_step_id']),
+                'task_id': ref('project.task', step['task_id']),
+                'user_ids': [(6, 0, [uid for uid in step['user_ids'] if uid in existing['res.users']])],
+                'checklist_ids': [(0, 0, dict(item, completed_by=ref('res.users', item['completed_by'])))
+                                  for item in step['checklist']],
+            })
+            step_vals_list.append(vals)
+        steps = env['threads_bpm.step'].create(step_vals_list)
+
+        new_ids = {step['id']: new_step.id for step, new_step in zip(data['steps'], steps)}
+        edges = [(new_ids[step['id']], new_ids[dep]) for step in data['steps'] for dep in step['depends_on']]
+        if edges:
+            env.cr.execute("""
+                INSERT INTO threads_bpm_step_dependency_rel (step_id, depends_on_id)
+                SELECT * FROM unnest(%s::int[], %s::int[])
+            """, ([edge[0] for edge in edges], [edge[1] for edge in edges]))
+            steps.invalidate_recordset(['depends_on_ids', 'dependent_ids'])
+
+        env['threads_bpm.log'].sudo().create([
+            dict(log, execution_id=execution.id, user_id=ref('res.users', log['user_id']) or env.uid)
+            for log in data['logs']
+        ])
+        # The attachments moved to this archive row go back to the execution
+        env.cr.execute("""
+            UPDATE ir_attachment SET res_model = %s, res_id = %s WHERE res_model = %s AND res_id = %s
+        """, (execution._name, execution.id, self._name, self.id))
+        env['ir.attachment'].invalidate_model(['res_model', 'res_id'])
+        env['mail.message'].sudo().create([
+            dict(message, model=execution._name, res_id=execution.id,
+                 author_id=ref('res.partner', message['author_id']),
+                 attachment_ids=[(6, 0, [aid for aid in message.get('attachment_ids', [])
+                                         if aid in existing['ir.attachment']])])
+            for message in data['messages']
+        ])
+        execution.message_subscribe(partner_ids=[pid for pid in data['followers'] if pid in existing['res.partner']])
+        res_model_id = env['ir.model']._get_id(execution._name)
+        env['mail.activity'].sudo().with_context(mail_activity_quick_update=True).create([
+            dict(activity, res_model_id=res_model_id, res_id=execution.id,
+                 user_id=ref('res.users', activity['user_id']) or env.uid)
+            for activity in data.get('activities', [])
+            if activity['activity_type_id'] in existing['mail.activity.type']
+        ])
+
+        self.unlink()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'threads_bpm.execution',
+            'res_id': execution.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
@@ -0,0 +1,51 @@
+from odoo import api, fields, models
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ThreadsBPMExecutionRefresh(models.Model):
+    """
+    Queue of executions whose step aggregates must be refreshed.
+
+    Step transitions only append rows here (no foreign key, no unique index), so
+    concurrent transitions on the steps of one execution never write the same row.
+    The refresh job folds them into the execution: counters, current step,
+    completion and ETA, in one pass per batch.
+    """
+    _name = "threads_bpm.execution.refresh"
+    _description = "Threads BPM - Execution refresh queue"
+    _log_access = False
+
+    execution_id = fields.Integer(required=True, index=True, readonly=True)
+
+    @api.model
+    def _enqueue(self, execution_ids):
+        execution_ids = [execution_id for execution_id in set(execution_ids) if execution_id]
+        if not execution_ids:
+            return
+        self.env.cr.execute(
+            "INSERT INTO threads_bpm_execution_refresh (execution_id) SELECT unnest(%s::int[])",
+            (execution_ids,),
+        )
+        self.env.ref('threads_bpm.ir_cron_threads_bpm_refresh_executions').sudo()._trigger()
+
+    @api.model
+    def _process(self):
+        """Refresh every queued execution; rows queued after our snapshot wait for the next run"""
+        self.env.flush_all()
+        self.env.cr.execute("DELETE FROM threads_bpm_execution_refresh RETURNING execution_id")
+        ids = {row[0] for row in self.env.cr.fetchall()}
+        executions = self.env['threads_bpm.execution'].browse(ids).exists()
+        if not executions:
+            return 0
+        executions._refresh_step_aggregates()
+        executions._check_completion()
+        self.env['threads_bpm.eta']._refresh(executions)
+        return len(executions)
+
+    @api.model
+    def _cron_process(self):
+        count = self._process()
+        if count:
+            _logger.info("Threads BPM: refreshed %s executions", count)
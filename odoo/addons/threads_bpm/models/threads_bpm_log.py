@@ -20,6 +20,7 @@ class ThreadsBPMLog(models.Model):
         ("step_skipped", "Etapa Pulada"),
         ("checklist_completed", "Checklist Item Concluído"),
         ("checklist_uncompleted", "Checklist Item Desmarcado"),
+        ("reassigned", "Responsáveis Reatribuídos"),
     ], required=True, string="Ação")
 
     detail = fields.Text(string="Detalhes")
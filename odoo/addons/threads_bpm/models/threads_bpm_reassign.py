@@ -0,0 +1,146 @@
+from odoo import api, fields, models
+from odoo.exceptions import UserError, ValidationError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Open steps of open executions: the only ones whose assignees still matter
+_OPEN_STEPS_SQL = """
+    SELECT s.id
+      FROM threads_bpm_step s
+      JOIN threads_bpm_step_user_rel rel ON rel.step_id = s.id AND rel.user_id = %(from_user)s
+      JOIN threads_bpm_execution e ON e.id = s.execution_id
+     WHERE s.state = ANY(%(states)s)
+       AND e.state IN ('draft', 'in_progress')
+       {filters}
+  ORDER BY s.id
+"""
+
+
+class ThreadsBPMReassignWizard(models.TransientModel):
+    _name = "threads_bpm.reassign.wizard"
+    _description = "Threads BPM - Bulk step reassignment"
+
+    from_user_id = fields.Many2one("res.users", string="Responsável atual", required=True)
+    to_user_id = fields.Many2one("res.users", string="Novo responsável", required=True)
+    template_ids = fields.Many2many("threads_bpm.template", string="Modelos",
+                                    help="Vazio: execuções de todos os modelos.")
+    business_unit = fields.Selection(
+        selection=lambda self: self.env['threads_bpm.template']._fields['business_unit'].selection,
+        string="Unidade de Negócio",
+    )
+    step_state = fields.Selection([
+        ("open", "Pendentes e em andamento"),
+        ("pending", "Somente pendentes"),
+        ("in_progress", "Somente em andamento"),
+    ], default="open", required=True, string="Etapas")
+    include_templates = fields.Boolean(string="Atualizar também as etapas dos modelos",
+                                       help="As próximas execuções já nascem com o novo responsável.")
+    state = fields.Selection([("draft", "Rascunho"), ("done", "Concluído")], default="draft", required=True)
+
+    step_count = fields.Integer(string="Etapas", readonly=True)
+    execution_count = fields.Integer(string="Execuções", readonly=True)
+    task_count = fields.Integer(string="Tarefas", readonly=True)
+
+    @api.constrains("from_user_id", "to_user_id")
+    def _check_users(self):
+        for wizard in self:
+            if wizard.from_user_id == wizard.to_user_id:
+                raise ValidationError("O novo responsável deve ser diferente do atual.")
+
+    def _get_step_ids(self):
+        self.ensure_one()
+        filters = []
+        params = {
+            'from_user': self.from_user_id.id,
+            'states': ['pending', 'in_progress'] if self.step_state == 'open' else [self.step_state],
+        }
+        if self.template_ids:
+            filters.append("AND e.template_id = ANY(%(templates)s)")
+            params['templates'] = self.template_ids.ids
+        if self.business_unit:
+            filters.append("AND e.business_unit = %(business_unit)s")
+            params['business_unit'] = self.business_unit
+        self.env.flush_all()
+        self.env.cr.execute(_OPEN_STEPS_SQL.format(filters="\n       ".join(filters)), params)
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def action_preview(self):
+        self.ensure_one()
+        steps = self.env['threads_bpm.step'].browse(self._get_step_ids())
+        self.write({
+            'step_count': len(steps),
+            'execution_count': len(steps.execution_id),
+            'task_count': len(steps.task_id),
+        })
+        return self._reopen()
+
+    def action_apply(self):
+        """Move the matching open steps (and their tasks) to the new assignee in a few set-based statements"""
+        self.ensure_one()
+        if self.state == 'done':
+            raise UserError("Esta reatribuição já foi executada.")
+        Step = self.env['threads_bpm.step']
+        steps = Step.browse(self._get_step_ids())
+        steps._lock_for_transition()
+        from_user, to_user = self.from_user_id.id, self.to_user_id.id
+
+        if steps:
+            self.env.cr.execute("""
+                INSERT INTO threads_bpm_step_user_rel (step_id, user_id)
+                SELECT step_id, %(to_user)s FROM unnest(%(steps)s::int[]) AS step_id
+                ON CONFLICT DO NOTHING;
+
+                DELETE FROM threads_bpm_step_user_rel
+                 WHERE user_id = %(from_user)s AND step_id = ANY(%(steps)s);
+
+                UPDATE threads_bpm_step SET lock_version = lock_version + 1 WHERE id = ANY(%(steps)s);
+
+                -- Alerts waiting for the digest of the former assignee are no longer theirs
+                UPDATE threads_bpm_sla_notification SET state = 'dropped'
+                 WHERE user_id = %(from_user)s AND step_id = ANY(%(steps)s) AND state = 'pending';
+            """, {'from_user': from_user, 'to_user': to_user, 'steps': steps.ids})
+            # One pass: the stored participants of every execution are recomputed at flush
+            steps.invalidate_recordset(['user_ids', 'lock_version'])
+            steps.modified(['user_ids'])
+            self.env['threads_bpm.sla.notification'].invalidate_model(['state'])
+
+            tasks = steps.task_id.filtered(lambda task: from_user in task.user_ids.ids)
+            tasks.with_context(mail_auto_subscribe_no_notify=True).write({
+                'user_ids': [(3, from_user), (4, to_user)],
+            })
+
+            steps.execution_id._log_action(
+                'reassigned',
+                "Etapas reatribuídas de %s para %s" % (self.from_user_id.name, self.to_user_id.name),
+            )
+            # The new assignee has SLA thresholds to be reminded of
+            steps.filtered(lambda s: s.state == 'in_progress')._schedule_sla_reminders()
+        else:
+            tasks = self.env['project.task']
+
+        if self.include_templates:
+            template_steps = Step.search([
+                ('execution_id', '=', False),
+                ('user_ids', 'in', from_user),
+            ] + ([('template_id', 'in', self.template_ids.ids)] if self.template_ids else [])
+              + ([('template_id.business_unit', '=', self.business_unit)] if self.business_unit else []))
+            template_steps.write({'user_ids': [(3, from_user), (4, to_user)]})
+
+        self.write({
+            'state': 'done',
+            'step_count': len(steps),
+            'execution_count': len(steps.execution_id),
+            'task_count': len(tasks),
+        })
+        _logger.info("Threads BPM: reassigned %s steps from user %s to user %s", len(steps), from_user, to_user)
+        return self._reopen()
+
+    def _reopen(self):
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
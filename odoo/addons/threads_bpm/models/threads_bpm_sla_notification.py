@@ -0,0 +1,27 @@
+from odoo import fields, models
+
+
+class ThreadsBPMSLANotification(models.Model):
+    _name = "threads_bpm.sla.notification"
+    _description = "Threads BPM SLA Notification Sent"
+    _order = "sent_at desc, id desc"
+
+    step_id = fields.Many2one("threads_bpm.step", string="Etapa", required=True, ondelete="cascade", index=True)
+    user_id = fields.Many2one("res.users", string="Usuário", required=True, ondelete="cascade")
+    threshold = fields.Selection([
+        ("at_risk", "Em Risco (24h)"),
+        ("overdue", "Atrasada"),
+    ], required=True, string="Limite")
+    # Alerts not urgent enough to bypass the digest wait for the next per-user digest
+    state = fields.Selection([
+        ("pending", "Aguardando Resumo"),
+        ("sent", "Enviada"),
+        ("dropped", "Descartada"),
+    ], default="sent", required=True, string="Status")
+    sent_at = fields.Datetime(string="Enviado em", default=fields.Datetime.now)
+
+    _step_user_threshold_unique = models.Constraint(
+        "UNIQUE(step_id, user_id, threshold)",
+        "Esta notificação de SLA já foi enviada.",
+    )
+    _pending_user_idx = models.Index("(user_id) WHERE state = 'pending'")
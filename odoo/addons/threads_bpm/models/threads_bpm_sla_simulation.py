@@ -0,0 +1,251 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import config
+import logging
+
+from .threads_bpm_step_rollup import SKETCH_GAMMA, SKETCH_ZERO_BUCKET, sketch_quantile
+
+_logger = logging.getLogger(__name__)
+
+# Simulated executions per batch (bounds the memory of one batch to steps x CHUNK_SIZE floats)
+CHUNK_SIZE = 10000
+MAX_SIMULATIONS = 2000000
+# Default of the threads_bpm.sla_simulation_max_workers parameter
+DEFAULT_MAX_WORKERS = 4
+# Bucket index standing for the sketch zero bucket (durations under one second)
+ZERO_BUCKET_INDEX = -(10 ** 6)
+
+
+def _simulate(buckets, probs, thresholds, parents, size, seed):
+    """Run ``size`` simulated executions of a template; pure NumPy, runs in worker processes.
+
+    ``buckets[i]`` / ``probs[i]``: sketch buckets of step i and their probabilities;
+    ``thresholds[i]``: SLA of step i in seconds (0: none); ``parents[i]``: steps that
+    finish before step i starts (steps are in topological order). Returns the breach
+    count of every step, the end-to-end durations and the number of simulated
+    executions with at least one step breach.
+    """
+    rng = np.random.default_rng(seed)
+    finish = np.zeros((len(buckets), size))
+    step_breaches = np.zeros(len(buckets), dtype=np.int64)
+    any_breach = np.zeros(size, dtype=bool)
+    for i in range(len(buckets)):
+        picked = rng.choice(buckets[i], size=size, p=probs[i])
+        # Uniform within the bucket: (gamma^(b-1), gamma^b], zero bucket [0, 1)
+        zero = picked == ZERO_BUCKET_INDEX
+        duration = rng.uniform(
+            np.where(zero, 0.0, SKETCH_GAMMA ** (picked - 1.0)),
+            np.where(zero, 1.0, SKETCH_GAMMA ** picked.astype(np.float64)),
+        )
+        if thresholds[i]:
+            breached = duration > thresholds[i]
+            step_breaches[i] = breached.sum()
+            any_breach |= breached
+        start = finish[parents[i]].max(axis=0) if parents[i] else 0.0
+        finish[i] = start + duration
+    return step_breaches, finish.max(axis=0), int(any_breach.sum())
+
+
+class ThreadsBPMSlaSimulation(models.TransientModel):
+    """
+    Monte Carlo simulation of the SLAs of a template.
+
+    Step durations are sampled from the cycle-time sketches of each template step
+    (threads_bpm.step.rollup), the executions are walked along the step
+    dependency graph (or the sequence) and the proposed SLAs are checked per step
+    and end to end. Batches are vectorized with NumPy and can be spread over a
+    process pool.
+    """
+    _name = "threads_bpm.sla.simulation"
+    _description = "Threads BPM - SLA simulation"
+
+    template_id = fields.Many2one("threads_bpm.template", string="Modelo", required=True, ondelete="cascade")
+    simulation_count = fields.Integer(string="Execuções simuladas", default=20000, required=True)
+    history_days = fields.Integer(string="Histórico (dias)", default=365, required=True)
+    workers = fields.Integer(string="Processos paralelos", default=0,
+                             help="0 ou 1: simula no próprio processo do servidor. Limitado pelo número de "
+                                  "CPUs e pelo parâmetro threads_bpm.sla_simulation_max_workers; ignorado "
+                                  "quando o servidor não roda em modo multiprocesso.")
+    target_hours = fields.Float(string="Meta ponta a ponta (h)",
+                                help="Vazio: caminho crítico dos SLAs propostos.")
+    line_ids = fields.One2many("threads_bpm.sla.simulation.line", "simulation_id", string="Etapas")
+
+    state = fields.Selection([("draft", "Rascunho"), ("done", "Simulado")], default="draft", required=True)
+    end_to_end_breach = fields.Float(string="Violação ponta a ponta (%)", readonly=True)
+    any_step_breach = fields.Float(string="Alguma etapa violada (%)", readonly=True)
+    end_to_end_p50_hours = fields.Float(string="Duração P50 (h)", readonly=True)
+    end_to_end_p90_hours = fields.Float(string="Duração P90 (h)", readonly=True)
+    elapsed_seconds = fields.Float(string="Tempo de simulação (s)", readonly=True, digits=(16, 2))
+
+    @api.onchange('template_id')
+    def _onchange_template_id(self):
+        self.line_ids = [(5, 0, 0)] + [(0, 0, {
+            'template_step_id': step.id,
+            'current_hours': step._get_sla_total_hours(),
+            'proposed_hours': step._get_sla_total_hours(),
+        }) for step in self.template_id.step_ids.sorted(lambda s: (s.sequence, s.id))]
+        self.state = 'draft'
+
+    def _get_topology(self):
+        """Return the lines in topological order and the parent indexes of each one"""
+        lines = self.line_ids.sorted(lambda l: (l.template_step_id.sequence, l.template_step_id.id))
+        steps = lines.template_step_id
+        if not any(steps.mapped('depends_on_ids')):
+            return lines, [[index - 1] if index else [] for index in range(len(lines))]
+        ordered = self.env['threads_bpm.sla.simulation.line']
+        done = set()
+        while len(ordered) < len(lines):
+            ready = lines.filtered(
+                lambda l: l not in ordered and set(l.template_step_id.depends_on_ids.ids) <= done)
+            if not ready:
+                raise UserError("As dependências entre etapas formam um ciclo.")
+            ordered |= ready
+            done.update(ready.template_step_id.ids)
+        position = {line.template_step_id.id: index for index, line in enumerate(ordered)}
+        parents = [[position[dep.id] for dep in line.template_step_id.depends_on_ids if dep.id in position]
+                   for line in ordered]
+        return ordered, parents
+
+    def _load_distributions(self, lines):
+        """Return ([bucket arrays], [probability arrays], {step_id: sketch}) from the rollups"""
+        rows = self.env['threads_bpm.step.rollup']._get_sketch_rows(
+            lines.template_step_id.ids,
+            fields.Date.subtract(fields.Date.today(), days=self.history_days) if self.history_days else None,
+        )
+        sketches = {}
+        for step_key, bucket, count in rows:
+            sketches.setdefault(step_key, {})[bucket] = count
+        buckets, probs = [], []
+        for line in lines:
+            # No history: the step is assumed instantaneous (flagged on the line)
+            sketch = sketches.get(line.template_step_id.id) or {SKETCH_ZERO_BUCKET: 1}
+            keys = np.array([ZERO_BUCKET_INDEX if key == SKETCH_ZERO_BUCKET else int(key) for key in sketch])
+            counts = np.array(list(sketch.values()), dtype=np.float64)
+            buckets.append(keys)
+            probs.append(counts / counts.sum())
+        return buckets, probs, sketches
+
+    def _get_worker_count(self):
+        """Processes the simulation may fork: bounded by the CPUs and a system parameter.
+
+        Only prefork servers (--workers) fork: forking a threaded server is unsafe.
+        """
+        if not config.get('workers'):
+            return 1
+        limit = int(self.env['ir.config_parameter'].sudo().get_param(
+            'threads_bpm.sla_simulation_max_workers', DEFAULT_MAX_WORKERS) or 1)
+        return max(1, min(self.workers, os.cpu_count() or 1, limit))
+
+    def action_run(self):
+        self.ensure_one()
+        if not self.line_ids:
+            raise UserError("O modelo não possui etapas.")
+        if not 0 < self.simulation_count <= MAX_SIMULATIONS:
+            raise UserError("Informe entre 1 e %s execuções simuladas." % MAX_SIMULATIONS)
+        start = time.perf_counter()
+        lines, parents = self._get_topology()
+        buckets, probs, sketches = self._load_distributions(lines)
+        thresholds = [line.proposed_hours * 3600 for line in lines]
+
+        target_hours = self.target_hours
+        if not target_hours:
+            # Critical path of the proposed SLAs
+            finish = []
+            for index, line in enumerate(lines):
+                finish.append(max((finish[p] for p in parents[index]), default=0.0) + line.proposed_hours)
+            target_hours = max(finish, default=0.0)
+
+        sizes = [CHUNK_SIZE] * (self.simulation_count // CHUNK_SIZE)
+        if self.simulation_count % CHUNK_SIZE:
+            sizes.append(self.simulation_count % CHUNK_SIZE)
+        seeds = np.random.SeedSequence().spawn(len(sizes))
+        args = [(buckets, probs, thresholds, parents, size, seed) for size, seed in zip(sizes, seeds)]
+        workers = self._get_worker_count()
+        if workers > 1 and len(args) > 1:
+            # fork: the children only run NumPy code, never the ORM or the cursor
+            with ProcessPoolExecutor(max_workers=min(workers, len(args)),
+                                     mp_context=multiprocessing.get_context("fork")) as pool:
+                results = list(pool.map(_simulate, *zip(*args)))
+        else:
+            results = [_simulate(*arg) for arg in args]
+
+        step_breaches = sum(result[0] for result in results)
+        totals = np.concatenate([result[1] for result in results])
+        any_breach = sum(result[2] for result in results)
+        count = float(self.simulation_count)
+        p50, p90 = np.percentile(totals, [50, 90]) / 3600
+
+        for index, line in enumerate(lines):
+            sketch = sketches.get(line.template_step_id.id)
+            line.write({
+                'history_count': sum(sketch.values()) if sketch else 0,
+                'p50_hours': sketch_quantile(sketch, 0.5) / 3600 if sketch else 0.0,
+                'p90_hours': sketch_quantile(sketch, 0.9) / 3600 if sketch else 0.0,
+                'breach_probability': 100.0 * step_breaches[index] / count if thresholds[index] else 0.0,
+            })
+        self.write({
+            'state': 'done',
+            'target_hours': target_hours,
+            'end_to_end_breach': 100.0 * float((totals > target_hours * 3600).sum()) / count if target_hours else 0.0,
+            'any_step_breach': 100.0 * any_breach / count,
+            'end_to_end_p50_hours': float(p50),
+            'end_to_end_p90_hours': float(p90),
+            'elapsed_seconds': time.perf_counter() - start,
+        })
+        _logger.info("Threads BPM SLA simulation of %s: %s runs in %.2fs",
+                     self.template_id.name, self.simulation_count, self.elapsed_seconds)
+        return self._reopen()
+
+    def action_apply(self):
+        """Write the proposed SLAs on the template steps"""
+        self.ensure_one()
+        for line in self.line_ids.filtered(lambda l: l.proposed_hours != l.current_hours):
+            days, hours = divmod(int(line.proposed_hours), 24)
+            line.template_step_id.write({
+                'sla_enabled': bool(days or hours),
+                'sla_days': days,
+                'sla_hours': hours,
+            })
+            line.current_hours = line.template_step_id._get_sla_total_hours()
+        return self._reopen()
+
+    def _reopen(self):
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+
+class ThreadsBPMSlaSimulationLine(models.TransientModel):
+    _name = "threads_bpm.sla.simulation.line"
+    _description = "Threads BPM - SLA simulation step"
+    _order = "sequence, id"
+
+    simulation_id = fields.Many2one("threads_bpm.sla.simulation", required=True, ondelete="cascade")
+    template_step_id = fields.Many2one("threads_bpm.step", string="Etapa", required=True, ondelete="cascade")
+    sequence = fields.Integer(related="template_step_id.sequence")
+    current_hours = fields.Float(string="SLA atual (h)", readonly=True)
+    proposed_hours = fields.Float(string="SLA proposto (h)", help="0: sem SLA.")
+
+    history_count = fields.Integer(string="Amostras", readonly=True)
+    p50_hours = fields.Float(string="P50 (h)", readonly=True)
+    p90_hours = fields.Float(string="P90 (h)", readonly=True)
+    breach_probability = fields.Float(string="Violação (%)", readonly=True)
+
+    @api.constrains('proposed_hours')
+    def _check_proposed_hours(self):
+        # template SLAs are stored as whole days and hours
+        for line in self:
+            if line.proposed_hours < 0 or line.proposed_hours != int(line.proposed_hours):
+                raise ValidationError("O SLA proposto de %s deve ser um número inteiro de horas."
+                                      % line.template_step_id.name)
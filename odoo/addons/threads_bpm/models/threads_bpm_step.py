@@ -1,6 +1,17 @@
 from datetime import timedelta
 from odoo import api, fields, models
 from odoo.exceptions import ValidationError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+DONE_STATES = ('completed', 'skipped')
+
+# Fields whose change moves the execution step aggregates (counts, progress, current step)
+AGGREGATE_TRIGGER_FIELDS = {'execution_id', 'state', 'sequence'}
+
+# Fields whose change bumps the step lock_version (optimistic concurrency)
+VERSIONED_FIELDS = {'execution_id', 'state', 'user_ids'}
 
 
 class ThreadsBPStep(models.Model):
@@ -8,8 +19,12 @@ class ThreadsBPStep(models.Model):
     _description = "Threads BPM Step"
     _order = "sequence"
 
-    template_id = fields.Many2one("threads_bpm.template", string="Modelo", required=True, ondelete="cascade")
-    execution_id = fields.Many2one("threads_bpm.execution", string="Execução", ondelete="cascade")
+    # Template steps have template_id; execution steps have execution_id and point back
+    # to the template step they were instantiated from (via the compiled version)
+    template_id = fields.Many2one("threads_bpm.template", string="Modelo", ondelete="cascade", index=True)
+    execution_id = fields.Many2one("threads_bpm.execution", string="Execução", ondelete="cascade", index=True)
+    template_step_id = fields.Many2one("threads_bpm.step", string="Etapa do Modelo", ondelete="set null",
+                                       index=True, readonly=True)
 
     name = fields.Char(required=True, string="Nome da Etapa")
     sequence = fields.Integer(default=10, string="Ordem")
@@ -42,33 +57,132 @@ class ThreadsBPStep(models.Model):
     completed_at = fields.Datetime(string="Concluída em")
 
     # SLA tracking
-    sla_deadline = fields.Datetime(string="Prazo SLA", compute="_compute_sla_deadline")
-    is_overdue = fields.Boolean(string="Em Atraso", compute="_compute_sla_status")
-    is_at_risk = fields.Boolean(string="Em Risco", compute="_compute_sla_status")
+    # Stored so that overdue / at-risk lists are indexed range queries on sla_deadline.
+    # is_overdue / is_at_risk are set on change and then moved forward in time by
+    # _cron_sla_transitions, never recomputed on read.
+    sla_deadline = fields.Datetime(string="Prazo SLA", compute="_compute_sla_deadline", store=True, index=True)
+    is_overdue = fields.Boolean(string="Em Atraso", compute="_compute_sla_status", store=True)
+    is_at_risk = fields.Boolean(string="Em Risco", compute="_compute_sla_status", store=True)
 
     # Task integration
     task_id = fields.Many2one("project.task", string="Tarefa Vinculada")
 
+    # DAG dependencies: declared between template steps and copied between the steps of
+    # each execution; blocking_count is the in-degree of unfinished prerequisites
+    depends_on_ids = fields.Many2many("threads_bpm.step", relation="threads_bpm_step_dependency_rel",
+                                      column1="step_id", column2="depends_on_id", string="Depende de",
+                                      domain="[('id', '!=', id), ('template_id', '=', template_id), ('execution_id', '=', execution_id)]")
+    dependent_ids = fields.Many2many("threads_bpm.step", relation="threads_bpm_step_dependency_rel",
+                                     column1="depends_on_id", column2="step_id", string="Bloqueia", readonly=True)
+    blocking_count = fields.Integer(string="Dependências Pendentes", readonly=True, default=0)
+
+    # Optimistic concurrency: bumped in SQL by transitions and assignee changes
+    lock_version = fields.Integer(string="Versão", readonly=True, copy=False, default=0)
+
+    # Checklist counters: stored, maintained by SQL deltas from the checklist hooks
+    checklist_total_count = fields.Integer(string="Itens do Checklist", readonly=True, default=0)
+    checklist_completed_count = fields.Integer(string="Itens Concluídos", readonly=True, default=0)
     checklist_progress = fields.Float(compute="_compute_checklist_progress", string="Progresso Checklist (%)")
 
-    @api.depends("checklist_ids", "checklist_ids.is_completed")
+    _sla_open_deadline_idx = models.Index("(sla_deadline) WHERE completed_at IS NULL AND sla_deadline IS NOT NULL")
+
+    @api.depends("checklist_total_count", "checklist_completed_count", "state")
     def _compute_checklist_progress(self):
         for rec in self:
-            if not rec.checklist_ids:
+            if not rec.checklist_total_count:
                 rec.checklist_progress = 100.0 if rec.state == 'completed' else 0.0
             else:
-                completed = len(rec.checklist_ids.filtered(lambda c: c.is_completed))
-                total = len(rec.checklist_ids)
-                rec.checklist_progress = (completed / total) * 100 if total > 0 else 0.0
+                rec.checklist_progress = (rec.checklist_completed_count / rec.checklist_total_count) * 100
+
+    _CHECKLIST_COUNTER_FIELDS = ['checklist_total_count', 'checklist_completed_count']
 
-    @api.depends("execution_id.started_at", "sla_enabled", "sla_hours", "sla_days")
+    @api.model
+    def _apply_checklist_deltas(self, deltas):
+        """Apply checklist deltas {step_id: [total_delta, completed_delta]} in one UPDATE"""
+        if not deltas:
+            return
+        ids = list(deltas)
+        self.env.cr.execute("""
+            UPDATE threads_bpm_step s
+               SET checklist_total_count = s.checklist_total_count + d.total_delta,
+                   checklist_completed_count = s.checklist_completed_count + d.completed_delta
+              FROM unnest(%s::int[], %s::int[], %s::int[]) AS d(id, total_delta, completed_delta)
+             WHERE s.id = d.id
+        """, (ids, [deltas[i][0] for i in ids], [deltas[i][1] for i in ids]))
+        steps = self.browse(ids)
+        steps.invalidate_recordset(self._CHECKLIST_COUNTER_FIELDS)
+        steps.modified(self._CHECKLIST_COUNTER_FIELDS)
+
+    @api.model
+    def _close_skipped_steps(self):
+        """Stamp completed_at on skipped steps that lack it (skipped before it was set); return their ids"""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE threads_bpm_step
+               SET completed_at = COALESCE(write_date, now() AT TIME ZONE 'UTC'),
+                   is_overdue = FALSE,
+                   is_at_risk = FALSE
+             WHERE state = 'skipped' AND completed_at IS NULL
+         RETURNING id
+        """)
+        closed = [row[0] for row in self.env.cr.fetchall()]
+        if closed:
+            _logger.warning("Threads BPM: closed %s skipped steps", len(closed))
+            steps = self.browse(closed)
+            steps.invalidate_recordset(['completed_at', 'is_overdue', 'is_at_risk'])
+            steps.modified(['completed_at', 'is_overdue', 'is_at_risk'])
+        return closed
+
+    @api.model
+    def _rebuild_checklist_counters(self):
+        """Recompute the checklist counters of every step in one pass; return the drifted step ids"""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE threads_bpm_step s
+               SET checklist_total_count = agg.total,
+                   checklist_completed_count = agg.completed
+              FROM (
+                    SELECT x.id,
+                           COUNT(c.id) AS total,
+                           COUNT(c.id) FILTER (WHERE c.is_completed) AS completed
+                      FROM threads_bpm_step x
+                 LEFT JOIN threads_bpm_checklist c ON c.step_id = x.id
+                  GROUP BY x.id
+                   ) agg
+             WHERE s.id = agg.id
+               AND (s.checklist_total_count IS DISTINCT FROM agg.total
+                    OR s.checklist_completed_count IS DISTINCT FROM agg.completed)
+         RETURNING s.id
+        """)
+        drifted = [row[0] for row in self.env.cr.fetchall()]
+        if drifted:
+            _logger.warning("Threads BPM: rebuilt checklist counters of %s steps", len(drifted))
+            steps = self.browse(drifted)
+            steps.invalidate_recordset(self._CHECKLIST_COUNTER_FIELDS)
+            steps.modified(self._CHECKLIST_COUNTER_FIELDS)
+        return drifted
+
+    @api.depends("execution_id.started_at", "execution_id.sla_calendar_id", "sla_enabled", "sla_hours", "sla_days")
     def _compute_sla_deadline(self):
+        # one working-time index lookup per calendar for the whole batch
+        indexes = {}
         for rec in self:
             if not rec.execution_id or not rec.execution_id.started_at or not rec.sla_enabled:
                 rec.sla_deadline = False
                 continue
 
             start_date = rec.execution_id.started_at
+            calendar = rec.execution_id.sla_calendar_id
+            if calendar:
+                # Working time: one SLA day is one working day of the calendar
+                seconds = ((rec.sla_days or 0) * (calendar.hours_per_day or 8.0) + (rec.sla_hours or 0)) * 3600
+                if calendar.id not in indexes:
+                    indexes[calendar.id] = calendar._get_sla_working_index()
+                deadline = calendar._sla_add_working_time(start_date, seconds, index=indexes[calendar.id])
+                if deadline:
+                    rec.sla_deadline = deadline
+                    continue
+
             sla_delta = timedelta()
 
             if rec.sla_days:
@@ -78,11 +192,11 @@ class ThreadsBPStep(models.Model):
 
             rec.sla_deadline = start_date + sla_delta
 
-    @api.depends("sla_deadline", "completed_at")
+    @api.depends("sla_deadline", "completed_at", "state")
     def _compute_sla_status(self):
         now = fields.Datetime.now()
         for rec in self:
-            if not rec.sla_deadline:
+            if not rec.sla_deadline or rec.state == 'skipped':
                 rec.is_overdue = False
                 rec.is_at_risk = False
                 continue
@@ -97,83 +211,339 @@ class ThreadsBPStep(models.Model):
                 # At risk if within 24 hours of deadline
                 rec.is_at_risk = not rec.is_overdue and (rec.sla_deadline - now).total_seconds() < 86400
 
+    @api.model
+    def _cron_sla_transitions(self):
+        """Move open steps to at-risk / overdue as their thresholds pass.
+
+        Only rows crossing a threshold are touched (partial index on sla_deadline),
+        and only their executions get has_at_risk_steps / has_overdue_steps recomputed.
+        """
+        now = fields.Datetime.now()
+        cr = self.env.cr
+        self.env.flush_all()
+
+        cr.execute("""
+            UPDATE threads_bpm_step
+               SET is_overdue = TRUE, is_at_risk = FALSE
+             WHERE completed_at IS NULL
+               AND sla_deadline IS NOT NULL
+               AND sla_deadline < %s
+               AND is_overdue IS NOT TRUE
+         RETURNING id
+        """, (now,))
+        step_ids = [row[0] for row in cr.fetchall()]
+
+        cr.execute("""
+            UPDATE threads_bpm_step
+               SET is_at_risk = TRUE
+             WHERE completed_at IS NULL
+               AND sla_deadline IS NOT NULL
+               AND sla_deadline >= %s
+               AND sla_deadline < %s
+               AND is_at_risk IS NOT TRUE
+               AND is_overdue IS NOT TRUE
+         RETURNING id
+        """, (now, now + timedelta(hours=24)))
+        step_ids += [row[0] for row in cr.fetchall()]
+
+        if step_ids:
+            steps = self.browse(step_ids)
+            steps.invalidate_recordset(['is_overdue', 'is_at_risk'])
+            steps.modified(['is_overdue', 'is_at_risk'])
+            self.env.flush_all()
+        return len(step_ids)
+
+    def _schedule_sla_reminders(self, now=None):
+        """Trigger the SLA reminder cron at the next upcoming threshold.
+
+        With an empty recordset, look at every open step; otherwise only at self.
+        Both lookups are MIN() scans over the partial index on sla_deadline.
+        """
+        now = now or fields.Datetime.now()
+        if self:
+            self.env.flush_all()
+        scope = "AND id = ANY(%(ids)s)" if self else ""
+        query = """
+            SELECT MIN(sla_deadline)
+              FROM threads_bpm_step
+             WHERE completed_at IS NULL
+               AND sla_deadline > %(after)s
+               AND state IN ('pending', 'in_progress')
+               {}
+        """.format(scope)
+        # next "24h before" threshold, then next deadline
+        self.env.cr.execute(query, {'after': now + timedelta(hours=24), 'ids': self.ids})
+        next_risk = self.env.cr.fetchone()[0]
+        self.env.cr.execute(query, {'after': now, 'ids': self.ids})
+        next_deadline = self.env.cr.fetchone()[0]
+
+        candidates = [at for at in (next_risk and next_risk - timedelta(hours=24), next_deadline) if at]
+        if candidates:
+            cron = self.env.ref('threads_bpm.ir_cron_threads_bpm_sla_reminders', raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger(at=min(candidates))
+
+    @api.constrains('template_id', 'execution_id')
+    def _check_template_or_execution(self):
+        for rec in self:
+            if bool(rec.template_id) == bool(rec.execution_id):
+                raise ValidationError("A etapa deve pertencer a um modelo ou a uma execução.")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        steps = super().create(vals_list)
+        steps._compile_templates()
+        steps._update_execution_aggregates({}, steps._get_aggregate_snapshot())
+        return steps
+
+    def write(self, vals):
+        if 'depends_on_ids' in vals and self.filtered('execution_id'):
+            # the in-degrees (blocking_count) of an execution are set once, from its template
+            raise ValidationError("As dependências de uma execução em andamento não podem ser alteradas.")
+        executions = self.execution_id if AGGREGATE_TRIGGER_FIELDS & set(vals) else None
+        res = super().write(vals)
+        self._compile_templates()
+        if executions is not None:
+            # Deferred: transitions on the steps of one execution never write its row
+            self.env['threads_bpm.execution.refresh']._enqueue((executions | self.execution_id).ids)
+        if VERSIONED_FIELDS & set(vals):
+            self.env.cr.execute(
+                "UPDATE threads_bpm_step SET lock_version = lock_version + 1 WHERE id = ANY(%s)",
+                (self.ids,),
+            )
+            self.invalidate_recordset(['lock_version'])
+        return res
+
+    def unlink(self):
+        templates = self.filtered(lambda s: not s.execution_id).template_id
+        before = self._get_aggregate_snapshot()
+        res = super().unlink()
+        templates._mark_for_compile()
+        self.env['threads_bpm.step']._update_execution_aggregates(before, {})
+        return res
+
+    def _get_aggregate_snapshot(self):
+        """Return {step_id: (execution_id, is_done)} for the execution steps in self"""
+        return {
+            step.id: (step.execution_id.id, step.state in DONE_STATES)
+            for step in self if step.execution_id
+        }
+
+    @api.model
+    def _update_execution_aggregates(self, before, after):
+        """Turn two snapshots into per-execution count deltas and apply them"""
+        deltas = {}
+        for snapshot, sign in ((before, -1), (after, 1)):
+            for execution_id, is_done in snapshot.values():
+                delta = deltas.setdefault(execution_id, [0, 0])
+                delta[0] += sign
+                delta[1] += sign * is_done
+        if deltas:
+            # the delta query reads step rows for the current step
+            self.flush_model(['execution_id', 'state', 'sequence'])
+            self.env['threads_bpm.execution']._apply_step_deltas(deltas)
+
+    def _compile_templates(self):
+        """Queue the templates owning these (template) steps for a single recompilation"""
+        self.filtered(lambda s: s.template_id and not s.execution_id).template_id._mark_for_compile()
+
+    @api.constrains('depends_on_ids')
+    def _check_dependencies(self):
+        for step in self:
+            if step in step.depends_on_ids:
+                raise ValidationError("Uma etapa não pode depender de si mesma.")
+            if any(dep.template_id != step.template_id or dep.execution_id != step.execution_id
+                   for dep in step.depends_on_ids):
+                raise ValidationError("Uma etapa só pode depender de etapas do mesmo modelo ou execução.")
+        self.filtered(lambda s: s.template_id and not s.execution_id).template_id._check_step_dag()
+
+    def _release_dependents(self):
+        """Decrement the in-degree of the steps waiting on self; start those now unblocked.
+
+        Only the out-edges of self are touched (index on depends_on_id), so the cost
+        is O(out-edges) whatever the size of the execution.
+        """
+        if not self:
+            return
+        self.env.cr.execute("""
+            UPDATE threads_bpm_step s
+               SET blocking_count = GREATEST(s.blocking_count - d.released, 0)
+              FROM (
+                    SELECT step_id, COUNT(*) AS released
+                      FROM threads_bpm_step_dependency_rel
+                     WHERE depends_on_id = ANY(%s)
+                  GROUP BY step_id
+                   ) d
+             WHERE s.id = d.step_id
+         RETURNING s.id
+        """, (self.ids,))
+        dependents = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not dependents:
+            return
+        dependents.invalidate_recordset(['blocking_count'])
+        dependents.modified(['blocking_count'])
+        ready = dependents.filtered(
+            lambda s: not s.blocking_count and s.state == 'pending' and s.execution_id.state == 'in_progress'
+        )
+        ready.action_start_step()
+
+    @api.model
+    def _rebuild_blocking_counts(self):
+        """Recompute the in-degree of every execution step in one pass; return the drifted step ids"""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE threads_bpm_step s
+               SET blocking_count = agg.pending
+              FROM (
+                    SELECT x.id,
+                           COUNT(d.id) FILTER (WHERE d.state NOT IN ('completed', 'skipped')) AS pending
+                      FROM threads_bpm_step x
+                 LEFT JOIN threads_bpm_step_dependency_rel r ON r.step_id = x.id
+                 LEFT JOIN threads_bpm_step d ON d.id = r.depends_on_id
+                     WHERE x.execution_id IS NOT NULL
+                  GROUP BY x.id
+                   ) agg
+             WHERE s.id = agg.id
+               AND s.blocking_count IS DISTINCT FROM agg.pending
+         RETURNING s.id
+        """)
+        drifted = [row[0] for row in self.env.cr.fetchall()]
+        if drifted:
+            _logger.warning("Threads BPM: rebuilt dependency counters of %s steps", len(drifted))
+            self.browse(drifted).invalidate_recordset(['blocking_count'])
+        return drifted
+
     @api.constrains('sla_hours', 'sla_days')
     def _check_sla_values(self):
         for rec in self:
             if rec.sla_enabled and not (rec.sla_hours or rec.sla_days):
                 raise ValidationError("SLA deve ter pelo menos horas ou dias configurados.")
 
-    def action_start_step(self):
-        """Start this step"""
+    def _lock_for_transition(self):
+        """Lock the step rows of self, in id order.
+
+        The execution row is neither locked nor written by step transitions (its
+        aggregates are refreshed later), so transitions on different steps of one
+        execution run concurrently without serialization failures.
+        """
+        if self.ids:
+            self.env.cr.execute(
+                "SELECT id FROM threads_bpm_step WHERE id = ANY(%s) ORDER BY id FOR NO KEY UPDATE",
+                (sorted(self.ids),),
+            )
+
+    def _check_lock_versions(self, versions):
+        """Raise if a step changed since the client read it (``versions``: {step_id: lock_version})"""
+        versions = {int(step_id): version for step_id, version in (versions or {}).items()}
+        stale = self.filtered(lambda s: s.id in versions and s.lock_version != versions[s.id])
+        if stale:
+            raise ValidationError(
+                "As etapas abaixo foram alteradas por outro usuário. Recarregue e tente novamente.\n%s"
+                % "\n".join(stale.mapped('name'))
+            )
+
+    def _get_sla_total_hours(self):
         self.ensure_one()
-        if self.state == 'pending':
-            self.write({
-                'state': 'in_progress',
-                'started_at': fields.Datetime.now()
-            })
-            self._create_task_if_needed()
-            self.execution_id._log_action("step_started", "Etapa '%s' iniciada" % self.name)
+        return self.sla_hours + 24 * self.sla_days if self.sla_enabled else 0.0
 
-    def action_complete_step(self):
-        """Complete this step"""
-        self.ensure_one()
-        if self.state == 'in_progress':
-            # Check if checklist is complete for required steps
-            if self.is_required and self.checklist_ids and self.checklist_progress < 100:
-                raise ValidationError("Todos os itens do checklist devem ser concluídos antes de finalizar a etapa.")
+    def action_start_step(self):
+        """Start the pending steps in self"""
+        self._lock_for_transition()
+        steps = self.filtered(lambda s: s.state == 'pending')
+        if not steps:
+            return
+        blocked = steps.filtered('blocking_count')
+        if blocked:
+            raise ValidationError("Etapas aguardando dependências: %s" % ", ".join(blocked.mapped('name')))
+        steps.write({
+            'state': 'in_progress',
+            'started_at': fields.Datetime.now()
+        })
+        self.env['threads_bpm.task.sync']._create_tasks(steps)
+        steps._log_step_action("step_started", "Etapa '%s' iniciada")
 
-            self.write({
-                'state': 'completed',
-                'completed_at': fields.Datetime.now()
-            })
+    def action_complete_step(self):
+        """Complete the in-progress steps in self, all at once"""
+        self._lock_for_transition()
+        steps = self.filtered(lambda s: s.state == 'in_progress')
+        if not steps:
+            return
 
-            # Close related task
-            if self.task_id:
-                self.task_id.write({'stage_id': self.task_id.project_id.type_ids.filtered(lambda t: t.is_closed)[:1].id})
+        # Required steps need their whole checklist done (stored counters, no item reads)
+        steps._check_checklists_completed()
 
-            self.execution_id._log_action("step_completed", "Etapa '%s' concluída" % self.name)
+        steps.write({
+            'state': 'completed',
+            'completed_at': fields.Datetime.now()
+        })
+        self.env['threads_bpm.task.sync']._close_tasks(steps.task_id)
+        steps._log_step_action("step_completed", "Etapa '%s' concluída")
+        self.env['threads_bpm.step.rollup']._add_steps(steps)
 
-            # Check if execution is complete
-            self.execution_id._check_completion()
+        # Start every step this unblocks; completion and ETA follow with the execution refresh
+        steps._release_dependents()
 
     def action_skip_step(self):
-        """Skip this step (only for optional steps)"""
-        self.ensure_one()
-        if not self.is_required:
-            self.write({'state': 'skipped'})
-            self.execution_id._log_action("step_skipped", "Etapa '%s' pulada" % self.name)
-        else:
+        """Skip the steps in self (only for optional steps)"""
+        if any(step.is_required for step in self):
             raise ValidationError("Etapas obrigatórias não podem ser puladas.")
-
-    def _create_task_if_needed(self):
-        """Create a project task for this step if it has assignees"""
-        self.ensure_one()
-        if not self.user_ids or self.task_id:
+        if not self:
             return
-
-        # Find or create a project for BPM tasks
-        project = self.env['project.project'].search([('name', '=', 'BPM Tasks')], limit=1)
-        if not project:
-            project = self.env['project.project'].create({
-                'name': 'BPM Tasks',
-                'use_tasks': True,
-                'type': 'task',
-            })
-
-        # Calculate deadline
-        deadline = self.sla_deadline if self.sla_enabled and self.sla_deadline else False
-
-        task = self.env['project.task'].create({
-            'name': '%s - %s' % (self.execution_id.name, self.name),
-            'project_id': project.id,
-            'user_ids': [(6, 0, self.user_ids.ids)],
-            'date_deadline': deadline,
-            'description': """
-            <p><strong>Thread BPM:</strong> %s</p>
-            <p><strong>Etapa:</strong> %s</p>
-            <p><strong>Prazo:</strong> %s</p>
-            <p><a href="/web#id=%s&model=threads_bpm.execution&view_type=form" target="_blank">Abrir Thread</a></p>
-            """ % (self.execution_id.name, self.name, deadline or 'N/A', self.execution_id.id)
-        })
-
-        self.task_id = task
+        self._lock_for_transition()
+        closed = self.filtered(lambda s: s.state not in ('pending', 'in_progress'))
+        if closed:
+            raise ValidationError(
+                "Apenas etapas pendentes ou em andamento podem ser puladas.\n%s" % "\n".join(closed.mapped('name'))
+            )
+        # completed_at closes the step for the SLA crons and reminders (completed_at IS NULL)
+        self.write({'state': 'skipped', 'completed_at': fields.Datetime.now()})
+        self._log_step_action("step_skipped", "Etapa '%s' pulada")
+        self._release_dependents()
+
+    def _check_checklists_completed(self):
+        blocked = self.filtered(lambda s: s.is_required and s.checklist_completed_count < s.checklist_total_count)
+        if blocked:
+            raise ValidationError(
+                "Todos os itens do checklist devem ser concluídos antes de finalizar a etapa.\n%s"
+                % "\n".join(blocked.mapped('name'))
+            )
+
+    def _log_step_action(self, action, detail_pattern):
+        """Log one row per step (``detail_pattern`` gets the step name) in a single create"""
+        steps = self.filtered('execution_id')
+        if not steps:
+            return
+        self.env['threads_bpm.log'].sudo().create([{
+            'execution_id': step.execution_id.id,
+            'user_id': self.env.user.id,
+            'action': action,
+            'detail': detail_pattern % step.name,
+        } for step in steps])
+
+    def action_checklist_check_all(self):
+        """Mark every checklist item of these steps as done"""
+        self.checklist_ids.action_mark_completed()
+
+    def action_checklist_uncheck_all(self):
+        """Mark every checklist item of these steps as pending"""
+        self.checklist_ids.action_mark_pending()
+
+    @api.model
+    def transition_steps(self, step_ids, action, versions=None):
+        """Apply a transition ('start', 'complete' or 'skip') to many steps in one call.
+
+        With ``versions`` ({step_id: lock_version} as last read by the client), the call
+        fails instead of acting on steps changed concurrently by someone else.
+        """
+        methods = {
+            'start': 'action_start_step',
+            'complete': 'action_complete_step',
+            'skip': 'action_skip_step',
+        }
+        if action not in methods:
+            raise ValidationError("Ação inválida: %s" % action)
+        steps = self.browse(step_ids).exists()
+        steps._lock_for_transition()
+        steps._check_lock_versions(versions)
+        getattr(steps, methods[action])()
+        return steps.read(['state', 'started_at', 'completed_at', 'lock_version'])
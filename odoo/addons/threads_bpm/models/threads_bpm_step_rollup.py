@@ -0,0 +1,298 @@
+import json
+import math
+from collections import defaultdict
+
+from odoo import api, fields, models
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Duration sketch: log-spaced buckets (DDSketch-style) with a bounded relative error.
+# A sketch is {bucket: count}; merging two sketches is adding their counts, so daily
+# rollups combine into any period without going back to the steps.
+SKETCH_RELATIVE_ERROR = 0.01
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ERROR) / (1 - SKETCH_RELATIVE_ERROR)
+# Bucket of the durations under one second
+SKETCH_ZERO_BUCKET = "z"
+
+
+def sketch_bucket(seconds):
+    if seconds < 1:
+        return SKETCH_ZERO_BUCKET
+    return str(math.ceil(math.log(seconds) / math.log(SKETCH_GAMMA)))
+
+
+def sketch_merge(sketches):
+    merged = defaultdict(int)
+    for sketch in sketches:
+        for bucket, count in (sketch or {}).items():
+            merged[bucket] += count
+    return dict(merged)
+
+
+def sketch_quantile(sketch, quantile):
+    """Approximate quantile (seconds) of a sketch, within SKETCH_RELATIVE_ERROR"""
+    total = sum((sketch or {}).values())
+    if not total:
+        return 0.0
+    rank = quantile * (total - 1)
+    seen = sketch.get(SKETCH_ZERO_BUCKET, 0)
+    if seen > rank:
+        return 0.0
+    for bucket in sorted(int(key) for key in sketch if key != SKETCH_ZERO_BUCKET):
+        seen += sketch[str(bucket)]
+        if seen > rank:
+            break
+    # Bucket midpoint in the relative-error sense
+    return 2 * SKETCH_GAMMA ** bucket / (SKETCH_GAMMA + 1)
+
+
+class ThreadsBPMStepRollup(models.Model):
+    """
+    Daily cycle-time rollup per template step and business unit.
+
+    One row per (day, template step, business unit) with the count, total duration,
+    SLA breaches and a duration sketch of the steps completed that day. Rows are
+    upserted as steps complete (one statement per batch), so analytics never scan
+    steps or logs, and survive the archival of the executions they come from.
+    """
+    _name = "threads_bpm.step.rollup"
+    _description = "Threads BPM Step Cycle-Time Rollup"
+    _order = "day desc, template_id, step_key"
+
+    day = fields.Date(required=True, readonly=True, string="Dia")
+    # Template step id, kept as a plain integer so rows outlive the template step
+    step_key = fields.Integer(required=True, readonly=True, string="Chave da Etapa")
+    template_step_id = fields.Many2one("threads_bpm.step", readonly=True, ondelete="set null", string="Etapa do Modelo")
+    step_name = fields.Char(readonly=True, string="Etapa")
+    template_id = fields.Many2one("threads_bpm.template", readonly=True, ondelete="cascade", index=True, string="Modelo")
+    business_unit = fields.Selection(
+        selection=lambda self: self.env['threads_bpm.template']._fields['business_unit'].selection,
+        required=True, readonly=True, string="Unidade de Negócio",
+    )
+
+    count = fields.Integer(readonly=True, string="Concluídas")
+    duration_sum = fields.Float(readonly=True, string="Duração Total (h)")
+    breach_count = fields.Integer(readonly=True, string="Fora do SLA")
+    sketch = fields.Json(readonly=True, string="Distribuição")
+
+    mean_hours = fields.Float(compute="_compute_stats", store=True, aggregator="avg", string="Média (h)")
+    p50_hours = fields.Float(compute="_compute_stats", store=True, aggregator=None, string="P50 (h)")
+    p90_hours = fields.Float(compute="_compute_stats", store=True, aggregator=None, string="P90 (h)")
+    breach_rate = fields.Float(compute="_compute_stats", store=True, aggregator="avg", string="Taxa de Violação (%)")
+
+    _day_step_unit_uniq = models.UniqueIndex("(day, step_key, business_unit)")
+    _template_day_idx = models.Index("(template_id, day)")
+
+    @api.depends('count', 'duration_sum', 'breach_count', 'sketch')
+    def _compute_stats(self):
+        for rec in self:
+            stats = self._get_stats(rec.count, rec.duration_sum, rec.breach_count, rec.sketch)
+            rec.mean_hours = stats['mean_hours']
+            rec.p50_hours = stats['p50_hours']
+            rec.p90_hours = stats['p90_hours']
+            rec.breach_rate = stats['breach_rate']
+
+    @api.model
+    def _get_stats(self, count, duration_sum, breach_count, sketch):
+        return {
+            'count': count,
+            'mean_hours': duration_sum / count if count else 0.0,
+            'p50_hours': sketch_quantile(sketch, 0.5) / 3600,
+            'p90_hours': sketch_quantile(sketch, 0.9) / 3600,
+            'breach_rate': 100.0 * breach_count / count if count else 0.0,
+        }
+
+    @api.model
+    def _backfill(self):
+        """First install: backfill from the steps still in the hot tables"""
+        self.env.cr.execute("SELECT 1 FROM threads_bpm_step_rollup LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild_rollups()
+
+    # ------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------
+
+    _UPSERT_SQL = """
+        INSERT INTO threads_bpm_step_rollup AS r (
+            day, step_key, template_step_id, step_name, template_id, business_unit,
+            count, duration_sum, breach_count, sketch,
+            create_uid, create_date, write_uid, write_date
+        )
+        SELECT d.day, d.step_key, d.step_key, d.step_name, d.template_id, d.business_unit,
+               d.count, d.duration_sum, d.breach_count, d.sketch,
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM unnest(%(days)s::date[], %(keys)s::int[], %(names)s::varchar[], %(templates)s::int[],
+                      %(units)s::varchar[], %(counts)s::int[], %(sums)s::float8[], %(breaches)s::int[],
+                      %(sketches)s::jsonb[])
+               AS d(day, step_key, step_name, template_id, business_unit, count, duration_sum, breach_count, sketch)
+        ON CONFLICT (day, step_key, business_unit) DO UPDATE
+           SET count = r.count + EXCLUDED.count,
+               duration_sum = r.duration_sum + EXCLUDED.duration_sum,
+               breach_count = r.breach_count + EXCLUDED.breach_count,
+               sketch = (
+                   SELECT jsonb_object_agg(k, COALESCE((r.sketch ->> k)::int, 0) + COALESCE((EXCLUDED.sketch ->> k)::int, 0))
+                     FROM (SELECT jsonb_object_keys(r.sketch) UNION SELECT jsonb_object_keys(EXCLUDED.sketch)) AS keys(k)
+               ),
+               step_name = EXCLUDED.step_name,
+               write_uid = EXCLUDED.write_uid,
+               write_date = EXCLUDED.write_date
+     RETURNING r.id
+    """
+
+    @api.model
+    def _add_steps(self, steps):
+        """Fold newly completed execution steps into their daily rollups (one upsert)"""
+        rows = {}
+        for step in steps:
+            if not (step.execution_id and step.template_step_id and step.started_at and step.completed_at):
+                continue
+            key = (step.completed_at.date(), step.template_step_id.id, step.execution_id.business_unit)
+            row = rows.setdefault(key, {
+                'name': step.name, 'template_id': step.execution_id.template_id.id,
+                'count': 0, 'seconds': 0.0, 'breaches': 0, 'sketch': defaultdict(int),
+            })
+            seconds = max((step.completed_at - step.started_at).total_seconds(), 0.0)
+            row['count'] += 1
+            row['seconds'] += seconds
+            row['breaches'] += bool(step.sla_deadline and step.completed_at > step.sla_deadline)
+            row['sketch'][sketch_bucket(seconds)] += 1
+        if not rows:
+            return
+        keys = list(rows)
+        self.env.cr.execute(self._UPSERT_SQL, {
+            'uid': self.env.uid,
+            'days': [key[0] for key in keys],
+            'keys': [key[1] for key in keys],
+            'units': [key[2] for key in keys],
+            'names': [rows[key]['name'] for key in keys],
+            'templates': [rows[key]['template_id'] for key in keys],
+            'counts': [rows[key]['count'] for key in keys],
+            'sums': [rows[key]['seconds'] / 3600 for key in keys],
+            'breaches': [rows[key]['breaches'] for key in keys],
+            'sketches': [json.dumps(rows[key]['sketch']) for key in keys],
+        })
+        rollups = self.browse([row[0] for row in self.env.cr.fetchall()])
+        fnames = ['count', 'duration_sum', 'breach_count', 'sketch', 'step_name']
+        rollups.invalidate_recordset(fnames)
+        rollups.modified(fnames)
+
+    @api.model
+    def _rebuild_rollups(self):
+        """Recompute every rollup from the steps in the hot tables.
+
+        Executions already archived are not in the hot tables anymore: only use this
+        to backfill, not to repair rollups older than the archive retention.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("DELETE FROM threads_bpm_step_rollup")
+        self.env.cr.execute("""
+            WITH durations AS (
+                SELECT s.completed_at::date AS day,
+                       s.template_step_id AS step_key,
+                       s.name AS step_name,
+                       e.template_id,
+                       e.business_unit,
+                       GREATEST(EXTRACT(EPOCH FROM s.completed_at - s.started_at), 0)::float8 AS seconds,
+                       (s.sla_deadline IS NOT NULL AND s.completed_at > s.sla_deadline) AS breached
+                  FROM threads_bpm_step s
+                  JOIN threads_bpm_execution e ON e.id = s.execution_id
+                 WHERE s.state = 'completed'
+                   AND s.template_step_id IS NOT NULL
+                   AND s.started_at IS NOT NULL
+                   AND s.completed_at IS NOT NULL
+            ),
+            buckets AS (
+                SELECT day, step_key, business_unit,
+                       CASE WHEN seconds < 1 THEN %(zero)s
+                            ELSE CEIL(LN(seconds) / LN(%(gamma)s))::int::text END AS bucket,
+                       COUNT(*) AS n
+                  FROM durations
+              GROUP BY 1, 2, 3, 4
+            ),
+            sketches AS (
+                SELECT day, step_key, business_unit, jsonb_object_agg(bucket, n) AS sketch
+                  FROM buckets
+              GROUP BY 1, 2, 3
+            )
+            INSERT INTO threads_bpm_step_rollup (
+                day, step_key, template_step_id, step_name, template_id, business_unit,
+                count, duration_sum, breach_count, sketch,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT d.day, d.step_key, d.step_key, MAX(d.step_name), MAX(d.template_id), d.business_unit,
+                   COUNT(*), SUM(d.seconds) / 3600, COUNT(*) FILTER (WHERE d.breached), MAX(k.sketch::text)::jsonb,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM durations d
+              JOIN sketches k ON k.day = d.day AND k.step_key = d.step_key AND k.business_unit = d.business_unit
+          GROUP BY d.day, d.step_key, d.business_unit
+         RETURNING id
+        """, {'zero': SKETCH_ZERO_BUCKET, 'gamma': SKETCH_GAMMA, 'uid': self.env.uid})
+        rollups = self.browse([row[0] for row in self.env.cr.fetchall()])
+        self.env.invalidate_model(self._name)
+        # Derived statistics are computed in Python from the sketches
+        rollups.modified(['count', 'duration_sum', 'breach_count', 'sketch'])
+        _logger.info("Threads BPM: rebuilt %s step rollups", len(rollups))
+
+    @api.model
+    def _get_sketch_rows(self, step_keys=None, date_from=None):
+        """Return [(step_key, bucket, count)]: the sketches of each step merged over the period, in SQL"""
+        where = ["TRUE"]
+        if step_keys is not None:
+            where.append("r.step_key = ANY(%(keys)s)")
+        if date_from:
+            where.append("r.day >= %(since)s")
+        self.env.cr.execute("""
+            SELECT r.step_key, b.key, SUM(b.value::int)
+              FROM threads_bpm_step_rollup r, jsonb_each_text(r.sketch) AS b
+             WHERE {where}
+          GROUP BY r.step_key, b.key
+        """.format(where=" AND ".join(where)), {'keys': step_keys, 'since': date_from})
+        return self.env.cr.fetchall()
+
+    # ------------------------------------------------------------
+    # Dashboard
+    # ------------------------------------------------------------
+
+    @api.model
+    def get_step_analytics(self, template_id=None, business_unit=None, date_from=None, date_to=None):
+        """Cycle-time statistics per template step over a period, read from the rollups only.
+
+        Returns a list of {template_id, template_name, step_key, step_name, count,
+        mean_hours, p50_hours, p90_hours, breach_rate}, slowest P90 first.
+        """
+        domain = []
+        if template_id:
+            domain.append(('template_id', '=', int(template_id)))
+        if business_unit:
+            domain.append(('business_unit', '=', business_unit))
+        if date_from:
+            domain.append(('day', '>=', date_from))
+        if date_to:
+            domain.append(('day', '<=', date_to))
+
+        groups = defaultdict(lambda: {'count': 0, 'duration_sum': 0.0, 'breach_count': 0, 'sketches': []})
+        for row in self.search_read(domain, ['template_id', 'step_key', 'step_name', 'count',
+                                             'duration_sum', 'breach_count', 'sketch'], order='day'):
+            group = groups[row['template_id'] and row['template_id'][0], row['step_key']]
+            group['template'] = row['template_id']
+            group['step_name'] = row['step_name']
+            group['count'] += row['count']
+            group['duration_sum'] += row['duration_sum']
+            group['breach_count'] += row['breach_count']
+            group['sketches'].append(row['sketch'])
+
+        result = []
+        for (template, step_key), group in groups.items():
+            stats = self._get_stats(group['count'], group['duration_sum'], group['breach_count'],
+                                    sketch_merge(group['sketches']))
+            result.append(dict(
+                stats,
+                template_id=template or False,
+                template_name=group['template'] and group['template'][1],
+                step_key=step_key,
+                step_name=group['step_name'],
+            ))
+        result.sort(key=lambda row: row['p90_hours'], reverse=True)
+        return result
@@ -0,0 +1,94 @@
+from odoo import api, models
+
+BPM_PROJECT_NAME = "BPM Tasks"
+
+
+class ThreadsBPMTaskSync(models.AbstractModel):
+    """
+    Project task synchronisation for BPM steps.
+
+    Nothing is cached across requests: the BPM project is one lookup, and the
+    closing stages of every project involved are resolved with one search per
+    batch. Tasks are created with one multi-create and closed with one write per
+    closing stage, whatever the number of steps.
+    """
+    _name = "threads_bpm.task.sync"
+    _description = "Threads BPM - Project task synchronisation"
+
+    @api.model
+    def _get_project(self):
+        """Return the project holding BPM tasks, created on first use"""
+        project = self.env["project.project"].sudo().with_context(active_test=False).search(
+            [("name", "=", BPM_PROJECT_NAME)], limit=1,
+        )
+        if not project:
+            project = self.env["project.project"].sudo().create({
+                "name": BPM_PROJECT_NAME,
+                "use_tasks": True,
+                "type": "task",
+            })
+        return project
+
+    @api.model
+    def _get_closing_stage_ids(self, projects):
+        """{project_id: first folded stage id} for ``projects`` (projects without one are left out)"""
+        if not projects:
+            return {}
+        stages = self.env["project.task.type"].sudo().search(
+            [("project_ids", "in", projects.ids), ("fold", "=", True)], order="sequence, id",
+        )
+        closing = {}
+        for stage in stages:
+            for project_id in stage.project_ids.ids:
+                closing.setdefault(project_id, stage.id)
+        return closing
+
+    @api.model
+    def _create_tasks(self, steps):
+        """Create the missing tasks of ``steps`` (those with assignees) in one batch"""
+        steps = steps.filtered(lambda s: s.user_ids and not s.task_id)
+        if not steps:
+            return self.env["project.task"]
+        project = self._get_project()
+        vals_list = []
+        for step in steps:
+            # Calculate deadline
+            deadline = step.sla_deadline if step.sla_enabled and step.sla_deadline else False
+            vals_list.append({
+                "name": "%s - %s" % (step.execution_id.name, step.name),
+                "project_id": project.id,
+                "user_ids": [(6, 0, step.user_ids.ids)],
+                "date_deadline": deadline,
+                "description": """
+            <p><strong>Thread BPM:</strong> %s</p>
+            <p><strong>Etapa:</strong> %s</p>
+            <p><strong>Prazo:</strong> %s</p>
+            <p><a href="/web#id=%s&model=threads_bpm.execution&view_type=form" target="_blank">Abrir Thread</a></p>
+            """ % (step.execution_id.name, step.name, deadline or "N/A", step.execution_id.id),
+            })
+        tasks = self.env["project.task"].create(vals_list)
+
+        # Link every step to its task with one UPDATE
+        self.env.cr.execute("""
+            UPDATE threads_bpm_step s
+               SET task_id = d.task_id
+              FROM unnest(%s::int[], %s::int[]) AS d(step_id, task_id)
+             WHERE s.id = d.step_id
+        """, (steps.ids, tasks.ids))
+        steps.invalidate_recordset(["task_id"])
+        steps.modified(["task_id"])
+        return tasks
+
+    @api.model
+    def _close_tasks(self, tasks):
+        """Mark ``tasks`` done and move them to their project's closing stage"""
+        closing = self._get_closing_stage_ids(tasks.project_id)
+        tasks_by_stage = {}
+        for task in tasks:
+            stage_id = closing.get(task.project_id.id, False)
+            tasks_by_stage[stage_id] = tasks_by_stage.get(stage_id, tasks.browse()) | task
+        for stage_id, stage_tasks in tasks_by_stage.items():
+            vals = {"state": "1_done"}
+            if stage_id:
+                vals["stage_id"] = stage_id
+            stage_tasks.write(vals)
@@ -1,10 +1,35 @@
-from datetime import timedelta
+import json
+from datetime import datetime, time
+
+from dateutil import rrule
+
 from odoo import api, fields, models
 from odoo.exceptions import ValidationError
 import logging
 
 _logger = logging.getLogger(__name__)
 
+RRULE_FREQUENCIES = {
+    'days': rrule.DAILY,
+    'weeks': rrule.WEEKLY,
+    'months': rrule.MONTHLY,
+    'years': rrule.YEARLY,
+}
+RRULE_WEEKDAYS = [
+    ('recreate_mon', rrule.MO), ('recreate_tue', rrule.TU), ('recreate_wed', rrule.WE),
+    ('recreate_thu', rrule.TH), ('recreate_fri', rrule.FR), ('recreate_sat', rrule.SA),
+    ('recreate_sun', rrule.SU),
+]
+# Fields that define the recurrence; changing any of them reschedules next_run_at
+RECURRENCE_FIELDS = {
+    'auto_recreate', 'template_type', 'active', 'recreate_interval', 'recreate_unit',
+    'recreate_start', 'recreate_until',
+} | {name for name, _day in RRULE_WEEKDAYS}
+# Missed occurrences recreated per template and cron run (catch-up after downtime)
+MAX_BACKFILL = 50
+# Key of the templates waiting for compilation in cr.precommit.data
+PENDING_COMPILE_KEY = 'threads_bpm.template.pending_compile'
+
 
 class ThreadsBPMTemplate(models.Model):
     _name = "threads_bpm.template"
@@ -40,11 +65,39 @@ class ThreadsBPMTemplate(models.Model):
     recreate_unit = fields.Selection([
         ("days", "Dias"),
         ("weeks", "Semanas"),
-        ("months", "Meses")
+        ("months", "Meses"),
+        ("years", "Anos"),
     ], default="days", string="Unidade")
+    # Weekly rules: restrict to these weekdays (all unchecked = weekday of the start)
+    recreate_mon = fields.Boolean(string="Seg")
+    recreate_tue = fields.Boolean(string="Ter")
+    recreate_wed = fields.Boolean(string="Qua")
+    recreate_thu = fields.Boolean(string="Qui")
+    recreate_fri = fields.Boolean(string="Sex")
+    recreate_sat = fields.Boolean(string="Sáb")
+    recreate_sun = fields.Boolean(string="Dom")
+    recreate_start = fields.Datetime(string="Início da Recorrência",
+                                     help="Primeira ocorrência; define também o dia do mês e o horário (UTC). "
+                                          "Vazio: a partir da ativação.")
+    recreate_until = fields.Date(string="Recorrer Até")
+    # Next occurrence due; maintained on rule changes and by the recurrence cron
+    next_run_at = fields.Datetime(string="Próxima Execução", readonly=True, copy=False)
+
+    _recurrence_due_idx = models.Index("(next_run_at) WHERE auto_recreate AND active AND next_run_at IS NOT NULL")
+
+    # SLA calendar (business hours + holidays); wall-clock time when empty
+    resource_calendar_id = fields.Many2one("resource.calendar", string="Calendário de SLA",
+                                           help="Prazos de SLA contam apenas horas úteis deste calendário, "
+                                                "descontando feriados.")
 
     # Steps
-    step_ids = fields.One2many("threads_bpm.step", "template_id", string="Etapas")
+    step_ids = fields.One2many("threads_bpm.step", "template_id", string="Etapas",
+                               domain=[("execution_id", "=", False)])
+
+    # Compiled, immutable snapshots used to instantiate executions
+    version_ids = fields.One2many("threads_bpm.template.version", "template_id", string="Versões")
+    current_version_id = fields.Many2one("threads_bpm.template.version", string="Versão Atual",
+                                         readonly=True, copy=False)
 
     # Executions
     execution_ids = fields.One2many("threads_bpm.execution", "template_id", string="Execuções")
@@ -71,6 +124,176 @@ class ThreadsBPMTemplate(models.Model):
             if rec.recreate_interval and rec.recreate_interval < 1:
                 raise ValidationError("Intervalo de recriação deve ser maior que 0.")
 
+    @api.model
+    def _backfill_next_run(self):
+        """Schedule recurring templates created before next_run_at existed, continuing
+        from their last execution"""
+        templates = self.search([
+            ('auto_recreate', '=', True),
+            ('template_type', '=', 'process'),
+            ('next_run_at', '=', False),
+        ])
+        if not templates:
+            return
+        last_runs = dict(self.env['threads_bpm.execution']._read_group(
+            [('template_id', 'in', templates.ids)], ['template_id'], ['create_date:max'],
+        ))
+        for template in templates:
+            last_run = last_runs.get(template)
+            if last_run:
+                template._schedule_next_run(after=last_run, inclusive=False)
+            else:
+                template._schedule_next_run()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        templates = super().create(vals_list)
+        templates.filtered('auto_recreate')._schedule_next_run()
+        # steps and checklists created through the one2many are compiled once, here
+        templates._compile_pending()
+        return templates
+
+    def write(self, vals):
+        res = super().write(vals)
+        if RECURRENCE_FIELDS & set(vals):
+            self._schedule_next_run()
+        self._compile_pending()
+        return res
+
+    # ------------------------------------------------------------
+    # Recurrence
+    # ------------------------------------------------------------
+
+    def _get_recurrence_rule(self, dtstart):
+        """Return the dateutil rrule of this template, anchored at ``dtstart`` (naive UTC)"""
+        self.ensure_one()
+        kwargs = {
+            'dtstart': dtstart,
+            'interval': self.recreate_interval or 1,
+        }
+        if self.recreate_unit == 'weeks':
+            weekdays = [day for name, day in RRULE_WEEKDAYS if self[name]]
+            if weekdays:
+                kwargs['byweekday'] = weekdays
+        if self.recreate_until:
+            kwargs['until'] = datetime.combine(self.recreate_until, time.max)
+        # true calendar months: an anchor on the 31st skips shorter months, as in RFC 5545
+        return rrule.rrule(RRULE_FREQUENCIES.get(self.recreate_unit, rrule.DAILY), **kwargs)
+
+    def _get_recurrence_anchor(self, default):
+        """First occurrence of the rule: the configured start, else the pending occurrence"""
+        self.ensure_one()
+        return self.recreate_start or self.next_run_at or default
+
+    def _schedule_next_run(self, after=None, inclusive=True):
+        """Set next_run_at to the first occurrence after ``after`` (default: now)"""
+        after = after or fields.Datetime.now()
+        for template in self:
+            next_run = False
+            if template.auto_recreate and template.active and template.template_type == 'process':
+                rule = template._get_recurrence_rule(template._get_recurrence_anchor(after))
+                next_run = rule.after(after, inc=inclusive) or False
+            if template.next_run_at != next_run:
+                super(ThreadsBPMTemplate, template).write({'next_run_at': next_run})
+
+    def _get_missed_occurrences(self, now):
+        """Return {template: [occurrence datetimes]} due at ``now`` for the templates in self.
+
+        All occurrences missed since next_run_at (cron downtime) are returned, up to
+        MAX_BACKFILL each.
+        """
+        due = {}
+        for template in self.filtered('next_run_at'):
+            rule = template._get_recurrence_rule(template._get_recurrence_anchor(now))
+            occurrences = rule.between(template.next_run_at, now, inc=True)
+            if len(occurrences) > MAX_BACKFILL:
+                _logger.warning("Threads BPM: template %s missed %s occurrences, only the latest %s are created",
+                                template.id, len(occurrences), MAX_BACKFILL)
+                occurrences = occurrences[-MAX_BACKFILL:]
+            due[template] = occurrences
+        return due
+
+    def _check_step_dag(self):
+        """Raise if the step dependencies of a template contain a cycle (Kahn's algorithm)"""
+        for template in self:
+            steps = template.step_ids
+            indegree = {step.id: 0 for step in steps}
+            out_edges = {step.id: [] for step in steps}
+            for step in steps:
+                for dependency in step.depends_on_ids:
+                    if dependency.id in out_edges:
+                        out_edges[dependency.id].append(step.id)
+                        indegree[step.id] += 1
+            ready = [step_id for step_id, degree in indegree.items() if not degree]
+            while ready:
+                for step_id in out_edges[ready.pop()]:
+                    indegree[step_id] -= 1
+                    if not indegree[step_id]:
+                        ready.append(step_id)
+            cyclic = steps.filtered(lambda s: indegree[s.id] > 0)
+            if cyclic:
+                raise ValidationError("As dependências entre etapas formam um ciclo: %s"
+                                      % ", ".join(cyclic.mapped('name')))
+
+    def _build_plan(self):
+        """Serialize the template steps and their checklists into a compact plan"""
+        self.ensure_one()
+        return [{
+            'key': step.id,
+            'name': step.name,
+            'sequence': step.sequence,
+            'user_ids': step.user_ids.ids,
+            'sla_enabled': step.sla_enabled,
+            'sla_hours': step.sla_hours,
+            'sla_days': step.sla_days,
+            'is_required': step.is_required,
+            'depends_on': sorted(step.depends_on_ids.ids),
+            'checklist': [[item.name, item.sequence, item.is_required] for item in step.checklist_ids],
+        } for step in self.step_ids.sorted(lambda s: (s.sequence, s.id))]
+
+    def _mark_for_compile(self):
+        """Queue self for compilation: at the end of the template save, or before commit at the latest"""
+        data = self.env.cr.precommit.data
+        if PENDING_COMPILE_KEY not in data:
+            data[PENDING_COMPILE_KEY] = set()
+            self.env.cr.precommit.add(self.env['threads_bpm.template']._compile_pending)
+        data[PENDING_COMPILE_KEY].update(self.ids)
+
+    def _compile_pending(self):
+        """Compile the queued templates of self (all queued templates when self is empty)"""
+        pending = self.env.cr.precommit.data.get(PENDING_COMPILE_KEY)
+        if not pending:
+            return
+        ids = pending & set(self.ids) if self else set(pending)
+        pending -= ids
+        self.browse(ids).exists()._compile()
+
+    def _compile(self):
+        """Snapshot the current steps into a new immutable version when they changed"""
+        Version = self.env['threads_bpm.template.version'].sudo()
+        for template in self:
+            plan = template._build_plan()
+            plan_json = json.dumps(plan, separators=(',', ':'), sort_keys=True)
+            checksum = Version._checksum(plan_json)
+            if template.current_version_id.checksum == checksum:
+                continue
+            version = Version.create({
+                'template_id': template.id,
+                'version': max(template.version_ids.mapped('version'), default=0) + 1,
+                'plan': plan_json,
+                'checksum': checksum,
+                'step_count': len(plan),
+            })
+            template.sudo().current_version_id = version
+
+    def _get_current_version(self):
+        """Return the version to instantiate from, compiling on first use"""
+        self.ensure_one()
+        self._compile_pending()
+        if not self.current_version_id:
+            self._compile()
+        return self.current_version_id
+
     def action_create_execution(self):
         """Create a new execution from this template"""
         self.ensure_one()
@@ -0,0 +1,42 @@
+import hashlib
+import json
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import ormcache
+
+
+class ThreadsBPMTemplateVersion(models.Model):
+    _name = "threads_bpm.template.version"
+    _description = "Threads BPM Compiled Template Version"
+    _order = "template_id, version desc"
+
+    template_id = fields.Many2one("threads_bpm.template", string="Modelo", required=True,
+                                  ondelete="cascade", index=True, readonly=True)
+    version = fields.Integer(string="Versão", required=True, readonly=True)
+
+    # Compact serialized step/checklist plan (see ThreadsBPMTemplate._build_plan)
+    plan = fields.Text(string="Plano", required=True, readonly=True)
+    checksum = fields.Char(string="Checksum", required=True, readonly=True)
+    step_count = fields.Integer(string="Etapas", readonly=True)
+
+    _template_version_unique = models.Constraint(
+        "UNIQUE(template_id, version)",
+        "Já existe uma versão com este número para o modelo.",
+    )
+
+    def write(self, vals):
+        raise UserError("Versões compiladas de modelos são imutáveis.")
+
+    @api.model
+    def _checksum(self, plan_json):
+        return hashlib.sha1(plan_json.encode("utf-8")).hexdigest()
+
+    @api.model
+    @ormcache("version_id")
+    def _get_plan(self, version_id):
+        """Return the parsed plan of a version. The result is shared: never mutate it."""
+        # Versions are immutable, so the per-worker cache never needs invalidation
+        self.env.cr.execute("SELECT plan FROM threads_bpm_template_version WHERE id = %s", (version_id,))
+        row = self.env.cr.fetchone()
+        return json.loads(row[0]) if row else []
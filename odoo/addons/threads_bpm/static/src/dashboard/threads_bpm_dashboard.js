@@ -32,15 +32,16 @@ export class ThreadsBPMDashboard extends Component {
     _calculateStats() {
         if (!this.state.executions) return null;
 
-        const executions = this.state.executions;
-        const total = executions.on_track.length + executions.at_risk.length + executions.overdue.length + executions.completed.length;
+        // Totals come from the server: the bucket lists only hold the first page
+        const counts = this.state.executions.counts;
+        const total = counts.on_track + counts.at_risk + counts.overdue + counts.completed;
 
         return {
             total: total,
-            on_track: executions.on_track.length,
-            at_risk: executions.at_risk.length,
-            overdue: executions.overdue.length,
-            completed: executions.completed.length,
+            on_track: counts.on_track,
+            at_risk: counts.at_risk,
+            overdue: counts.overdue,
+            completed: counts.completed,
         };
     }
 
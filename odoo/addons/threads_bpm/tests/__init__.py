@@ -0,0 +1,5 @@
+from . import test_install
+from . import test_dashboard
+from . import test_step_dependencies
+from . import test_step_rollup
+from . import test_step_concurrency
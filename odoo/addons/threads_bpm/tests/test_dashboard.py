@@ -0,0 +1,35 @@
+from odoo.tests import TransactionCase, new_test_user, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDashboard(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = new_test_user(cls.env, login='threads_bpm_dashboard', groups='threads_bpm.threads_bpm_group_user')
+        cls.template = cls.env['threads_bpm.template'].create({
+            'name': 'Dashboard',
+            'template_type': 'thread',
+            'business_unit': 'platform',
+            'step_ids': [(0, 0, {'name': 'only', 'sequence': 1})],
+        })
+        # one create: every execution gets the same create_date, down to the microsecond
+        cls.executions = cls.env['threads_bpm.execution'].create([{
+            'name': 'Batch %s' % index,
+            'template_id': cls.template.id,
+            'creator_id': cls.user.id,
+        } for index in range(7)])
+
+    def test_batch_paging(self):
+        Execution = self.env['threads_bpm.execution'].with_user(self.user)
+        first = Execution.get_user_executions(limit=3)
+        # draft executions stay on the dashboard, as before the SQL buckets
+        self.assertEqual(first['counts']['on_track'], 7)
+        seen = [rec['id'] for rec in first['on_track']]
+        cursor = first['cursors']['on_track']
+        while cursor:
+            page = Execution.get_user_executions_page('on_track', cursor=cursor, limit=3)
+            seen += [rec['id'] for rec in page['records']]
+            cursor = page['cursor']
+        self.assertEqual(seen, sorted(self.executions.ids, reverse=True))
@@ -0,0 +1,16 @@
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.threads_bpm.hooks import repair_stored_data
+
+
+@tagged('at_install', '-post_install')
+class TestInstall(TransactionCase):
+    """Runs right after the module is installed from scratch (--test-enable -i threads_bpm)"""
+
+    def test_install_repairs(self):
+        # every table exists once the module is installed: the repairs run and find nothing to fix
+        repair_stored_data(self.env)
+        self.assertFalse(self.env['threads_bpm.execution']._rebuild_step_aggregates())
+        self.assertFalse(self.env['threads_bpm.step']._rebuild_checklist_counters())
+        self.assertFalse(self.env['threads_bpm.step']._rebuild_blocking_counts())
+        self.assertFalse(self.env['threads_bpm.step']._close_skipped_steps())
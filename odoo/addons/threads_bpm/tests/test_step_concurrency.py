@@ -0,0 +1,188 @@
+import random
+import threading
+import time
+
+from psycopg2 import OperationalError
+
+from odoo import SUPERUSER_ID, api
+from odoo.modules.registry import Registry
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from odoo.tests import BaseCase, get_db_name, tagged
+import logging
+
+_logger = logging.getLogger(__name__)
+
+WORKERS = 8
+STEPS = 32
+CHECKLIST_ITEMS = 3
+MAX_TRIES = 8
+# Upper bound of the first retry wait, doubled on each further try (seconds)
+RETRY_BACKOFF = 0.05
+
+
+@tagged('post_install', '-at_install', 'threads_bpm_stress')
+class TestStepConcurrency(BaseCase):
+    """
+    Concurrency stress test for step transitions.
+
+    A template with STEPS steps (each with a checklist) is instantiated once, then
+    WORKERS threads hammer that single execution: each one starts, checks and
+    completes its share of the steps, one transaction per operation, with its own
+    cursor and the same retry policy as the HTTP layer. Step transitions do not write
+    the execution row, so no operation may need a retry. Concurrency needs real
+    transactions, so this test commits (outside the test cursor) and removes its
+    data at the end.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.registry = Registry(get_db_name())
+
+    def _env(self, cr):
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        return env(user=env.ref('base.user_admin').id)
+
+    def _setup(self):
+        """Create and start the execution under test; return (template id, execution id, step ids)"""
+        tag = "stress-{}".format(int(time.time()))
+        with self.registry.cursor() as cr:
+            env = self._env(cr)
+            template = env["threads_bpm.template"].create({
+                "name": tag,
+                "template_type": "thread",
+                "business_unit": "platform",
+                "step_ids": [(0, 0, {
+                    "name": "{} step {}".format(tag, index),
+                    "sequence": index,
+                    "user_ids": [(6, 0, [env.uid])],
+                    "is_required": True,
+                    "checklist_ids": [(0, 0, {"name": "item {}".format(item), "sequence": item})
+                                      for item in range(CHECKLIST_ITEMS)],
+                }) for index in range(STEPS)],
+            })
+            execution = env["threads_bpm.execution"].create({"name": tag, "template_id": template.id})
+            execution.action_start_execution()
+            result = (template.id, execution.id, execution.step_ids.ids)
+        return result
+
+    def _worker(self, step_ids, stats, lock):
+        """Start, check and complete ``step_ids``, one retried transaction per operation"""
+        with self.registry.cursor() as cr:
+            env = self._env(cr)
+            Step = env["threads_bpm.step"]
+            for step_id in step_ids:
+                versions = {}
+
+                def start():
+                    step = Step.browse(step_id)
+                    if step.state == "pending":
+                        step.action_start_step()
+                    versions[step_id] = step.lock_version
+
+                def check():
+                    Step.browse(step_id).action_checklist_check_all()
+
+                def complete():
+                    Step.transition_steps([step_id], "complete", versions)
+
+                for operation in (start, check, complete):
+                    self._run_with_retry(env, operation, stats, lock)
+
+    def _run_with_retry(self, env, operation, stats, lock):
+        retries = 0
+        start = time.perf_counter()
+        for attempt in range(1, MAX_TRIES + 1):
+            try:
+                operation()
+                env.cr.commit()
+                break
+            except OperationalError as e:
+                env.cr.rollback()
+                env.invalidate_all()
+                if e.pgcode not in PG_CONCURRENCY_ERRORS_TO_RETRY or attempt == MAX_TRIES:
+                    with lock:
+                        stats["errors"].append(str(e))
+                    return
+                retries += 1
+                time.sleep(random.uniform(0, RETRY_BACKOFF * 2 ** (attempt - 1)))
+            except Exception as e:
+                env.cr.rollback()
+                env.invalidate_all()
+                with lock:
+                    stats["errors"].append(str(e))
+                return
+        with lock:
+            stats["operations"] += 1
+            stats["retries"] += retries
+            stats["latencies"].append(time.perf_counter() - start)
+
+    def _check_invariants(self, execution_id):
+        """Return the list of broken invariants of the final state (empty when consistent)"""
+        broken = []
+        with self.registry.cursor() as cr:
+            env = self._env(cr)
+            # what the refresh job does once the transitions are committed
+            env["threads_bpm.execution.refresh"]._process()
+            execution = env["threads_bpm.execution"].browse(execution_id)
+            if execution.state != "completed":
+                broken.append("execution state is {}".format(execution.state))
+            if (execution.total_step_count, execution.completed_step_count) != (STEPS, STEPS):
+                broken.append("step counters {}/{} instead of {}/{}".format(
+                    execution.completed_step_count, execution.total_step_count, STEPS, STEPS))
+            if execution.progress_percentage != 100.0:
+                broken.append("progress is {}".format(execution.progress_percentage))
+            if execution.current_step_id:
+                broken.append("current step still set")
+            for step in execution.step_ids:
+                if step.state != "completed":
+                    broken.append("step {} is {}".format(step.name, step.state))
+                if (step.checklist_completed_count, step.checklist_total_count) != (CHECKLIST_ITEMS, CHECKLIST_ITEMS):
+                    broken.append("checklist counters of {} are {}/{}".format(
+                        step.name, step.checklist_completed_count, step.checklist_total_count))
+            completed_logs = execution.log_ids.filtered(lambda log: log.action == "completed")
+            if len(completed_logs) != 1:
+                broken.append("execution completed {} times".format(len(completed_logs)))
+            if env["threads_bpm.execution"]._rebuild_step_aggregates():
+                broken.append("step aggregates drifted")
+            cr.rollback()
+        return broken
+
+    def _cleanup(self, template_id, execution_id):
+        with self.registry.cursor() as cr:
+            env = self._env(cr)
+            execution = env["threads_bpm.execution"].browse(execution_id)
+            tasks = execution.step_ids.task_id
+            rollups = env["threads_bpm.step.rollup"].search([("template_id", "=", template_id)])
+            execution.unlink()
+            tasks.unlink()
+            rollups.unlink()
+            env["threads_bpm.template"].browse(template_id).unlink()
+
+    def test_concurrent_transitions(self):
+        template_id, execution_id, step_ids = self._setup()
+        self.addCleanup(self._cleanup, template_id, execution_id)
+        stats = {"operations": 0, "retries": 0, "latencies": [], "errors": []}
+        lock = threading.Lock()
+        # Interleave the steps so that every worker hits the execution at the same time
+        threads = [
+            threading.Thread(target=self._worker, args=(step_ids[index::WORKERS], stats, lock),
+                             name="threads_bpm.stress-{}".format(index))
+            for index in range(WORKERS)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        latencies = sorted(stats["latencies"]) or [0.0]
+        _logger.info(
+            "threads_bpm stress: %s operations, %s retries in %.3fs, p50 %.1fms, p95 %.1fms",
+            stats["operations"], stats["retries"], wall,
+            1000 * latencies[len(latencies) // 2], 1000 * latencies[int(len(latencies) * 0.95)],
+        )
+        self.assertFalse(stats["errors"], "\n".join(stats["errors"][:20]))
+        self.assertEqual(stats["operations"], 3 * STEPS)
+        self.assertEqual(stats["retries"], 0)
+        self.assertEqual(self._check_invariants(execution_id), [])
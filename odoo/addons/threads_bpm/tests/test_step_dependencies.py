@@ -0,0 +1,102 @@
+import numpy as np
+
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestStepDependencies(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # a -> b, a -> c, (b, c) -> d
+        cls.template = cls.env['threads_bpm.template'].create({
+            'name': 'DAG',
+            'template_type': 'thread',
+            'business_unit': 'platform',
+            'step_ids': [(0, 0, {'name': name, 'sequence': index}) for index, name in enumerate('abcd')],
+        })
+        cls.steps = {step.name: step for step in cls.template.step_ids}
+        cls.steps['b'].depends_on_ids = cls.steps['a']
+        cls.steps['c'].depends_on_ids = cls.steps['a']
+        cls.steps['d'].depends_on_ids = cls.steps['b'] | cls.steps['c']
+
+    def _start_execution(self):
+        execution = self.env['threads_bpm.execution'].create({'name': 'DAG run', 'template_id': self.template.id})
+        execution.action_start_execution()
+        return execution, {step.template_step_id.name: step for step in execution.step_ids}
+
+    def test_cycle_rejected(self):
+        with self.assertRaisesRegex(ValidationError, 'ciclo'):
+            self.steps['a'].depends_on_ids = self.steps['d']
+
+    def test_self_dependency_rejected(self):
+        with self.assertRaises(ValidationError):
+            self.steps['a'].depends_on_ids = self.steps['a']
+
+    def test_ready_set_release(self):
+        execution, steps = self._start_execution()
+        self.assertTrue(execution.uses_dependencies)
+        self.assertEqual([steps[name].blocking_count for name in 'abcd'], [0, 1, 1, 2])
+        self.assertEqual([steps[name].state for name in 'abcd'], ['in_progress', 'pending', 'pending', 'pending'])
+
+        # a releases both b and c at once
+        steps['a'].action_complete_step()
+        self.assertEqual([steps[name].state for name in 'bcd'], ['in_progress', 'in_progress', 'pending'])
+        self.assertEqual(steps['d'].blocking_count, 2)
+
+        # d waits for its last dependency
+        steps['b'].action_complete_step()
+        self.assertEqual(steps['d'].state, 'pending')
+        self.assertEqual(steps['d'].blocking_count, 1)
+        steps['c'].action_complete_step()
+        self.assertEqual(steps['d'].state, 'in_progress')
+
+        steps['d'].action_complete_step()
+        self.assertEqual(execution.state, 'in_progress')
+        # completion is folded in by the refresh job
+        self.env['threads_bpm.execution.refresh']._process()
+        self.assertEqual(execution.state, 'completed')
+        self.assertEqual(execution.progress_percentage, 100.0)
+        self.assertFalse(self.env['threads_bpm.step']._rebuild_blocking_counts())
+
+    def test_blocked_step_cannot_start(self):
+        _execution, steps = self._start_execution()
+        with self.assertRaises(ValidationError):
+            steps['d'].action_start_step()
+
+    def test_execution_dependencies_readonly(self):
+        _execution, steps = self._start_execution()
+        with self.assertRaises(ValidationError):
+            steps['d'].depends_on_ids = steps['a']
+
+    def test_eta_follows_longest_path(self):
+        _execution, steps = self._start_execution()
+        step_col = np.array([steps[name].id for name in 'abcd'])
+        # a (1h) then b (2h) and c (5h) in parallel, then d (1h): 7h, not 9h
+        remaining = np.array([1.0, 2.0, 5.0, 1.0]) * 3600
+        expected, spread, planned = np.array([remaining.sum()]), np.array([0.0]), np.array([remaining.sum()])
+        self.env['threads_bpm.eta']._apply_critical_paths(
+            np.array([True]), np.zeros(4, dtype=np.int64), step_col, remaining, np.full(4, 3600.0 ** 2),
+            remaining, expected, spread, planned)
+        self.assertEqual(expected[0], 7 * 3600)
+        self.assertEqual(planned[0], 7 * 3600)
+        # variance along a -> c -> d only
+        self.assertAlmostEqual(spread[0], np.sqrt(3) * 3600)
+
+    def test_skip_closes_open_steps_only(self):
+        _execution, steps = self._start_execution()
+        (steps['b'] | steps['c']).write({'is_required': False})
+        steps['a'].action_complete_step()
+        steps['b'].action_skip_step()
+        self.assertEqual(steps['b'].state, 'skipped')
+        self.assertTrue(steps['b'].completed_at)
+        self.assertEqual(steps['d'].blocking_count, 1)
+
+        # already closed steps cannot be skipped again
+        steps['c'].action_complete_step()
+        with self.assertRaises(ValidationError):
+            steps['c'].action_skip_step()
+        with self.assertRaises(ValidationError):
+            steps['b'].action_skip_step()
@@ -0,0 +1,51 @@
+import random
+
+from odoo.tests import BaseCase, tagged
+
+from odoo.addons.threads_bpm.models.threads_bpm_step_rollup import (
+    SKETCH_RELATIVE_ERROR, SKETCH_ZERO_BUCKET, sketch_bucket, sketch_merge, sketch_quantile,
+)
+
+
+def _sketch(durations):
+    sketch = {}
+    for seconds in durations:
+        bucket = sketch_bucket(seconds)
+        sketch[bucket] = sketch.get(bucket, 0) + 1
+    return sketch
+
+
+def _exact_quantile(durations, quantile):
+    return sorted(durations)[int(quantile * (len(durations) - 1))]
+
+
+@tagged('post_install', '-at_install')
+class TestDurationSketch(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(47)
+        # log-normal cycle times, from seconds to weeks
+        self.durations = [rng.lognormvariate(9, 2) + 1 for _index in range(20000)]
+
+    def assertWithinRelativeError(self, approximate, exact):
+        self.assertLessEqual(abs(approximate - exact), SKETCH_RELATIVE_ERROR * exact + 1e-9,
+                             "%s is not within %s of %s" % (approximate, SKETCH_RELATIVE_ERROR, exact))
+
+    def test_quantiles(self):
+        sketch = _sketch(self.durations)
+        for quantile in (0.0, 0.5, 0.9, 0.99, 1.0):
+            self.assertWithinRelativeError(sketch_quantile(sketch, quantile),
+                                           _exact_quantile(self.durations, quantile))
+
+    def test_merge(self):
+        half = len(self.durations) // 2
+        merged = sketch_merge([_sketch(self.durations[:half]), _sketch(self.durations[half:]), None])
+        self.assertEqual(merged, _sketch(self.durations))
+
+    def test_zero_bucket_and_empty(self):
+        self.assertEqual(sketch_quantile({}, 0.5), 0.0)
+        self.assertEqual(sketch_bucket(0.2), SKETCH_ZERO_BUCKET)
+        sketch = _sketch([0.1, 0.5, 100.0])
+        self.assertEqual(sketch_quantile(sketch, 0.5), 0.0)
+        self.assertWithinRelativeError(sketch_quantile(sketch, 1.0), 100.0)